@@ -0,0 +1,644 @@
+import os
+import io
+import sys
+import json
+import time
+import shutil
+import platform
+import tempfile
+import threading
+import itertools
+import contextlib
+import resource
+import tracemalloc
+import numpy as np
+import cv2
+from tiles import TileGrid, get_tile_divisors, to_gray
+from version import get_version
+
+# Benchmarks for the capture/detect hot path. Everything runs on synthetic
+# frames so results are reproducible on headless build machines.
+
+
+def parse_resolution(text):
+    w, h = text.lower().split("x")
+    return int(w), int(h)
+
+
+def _synthetic_shots(width, height, count=2, seed=0):
+    # Raw BGRA bytearrays, laid out exactly like mss ScreenShot.raw. Each shot
+    # differs from the previous one by a small "typing" rectangle.
+    rng = np.random.default_rng(seed)
+    base = rng.integers(0, 256, (height, width, 4), dtype=np.uint8)
+    base[:, :, 3] = 255
+    shots = []
+    for i in range(count):
+        frame = base.copy()
+        x = (i * 40) % max(1, width - 40)
+        frame[100:120, x:x + 40, :3] = 255
+        shots.append(bytearray(frame.tobytes()))
+    return shots
+
+
+def _time_path(step, shots, frames):
+    # Warm up once so one-off allocations don't skew the numbers
+    state = {}
+    step(shots[0], state)
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    for i in range(frames):
+        step(shots[(i + 1) % len(shots)], state)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed / frames * 1000.0, peak
+
+
+def _copy_step(raw, state, width, height):
+    # Baseline path: np.array copy -> BGR conversion -> absdiff -> gray
+    frame = np.array(np.frombuffer(raw, dtype=np.uint8).reshape(height, width, 4))
+    frame_bgr = cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
+    prev = state.get("prev")
+    if prev is not None:
+        diff = cv2.absdiff(prev, frame_bgr)
+        gray_diff = cv2.cvtColor(diff, cv2.COLOR_BGR2GRAY)
+        cv2.mean(gray_diff)
+    state["prev"] = frame_bgr
+
+
+def _zero_copy_step(raw, state, width, height):
+    # Zero-copy path: view the BGRA buffer in place and diff all four channels
+    frame = np.frombuffer(raw, dtype=np.uint8).reshape(height, width, 4)
+    prev = state.get("prev")
+    if prev is not None:
+        diff = cv2.absdiff(prev, frame)
+        gray_diff = cv2.cvtColor(diff, cv2.COLOR_BGRA2GRAY)
+        cv2.mean(gray_diff)
+    state["prev"] = frame
+
+
+def run_capture_benchmark(resolution="3840x2160", frames=60):
+    width, height = parse_resolution(resolution)
+    n = width * height
+    shots = _synthetic_shots(width, height)
+
+    # Bytes read + written per frame by each stage, before any save decision
+    traffic = {
+        # copy 4N->4N, BGRA2BGR 4N->3N, absdiff 3N+3N->3N, BGR2GRAY 3N->N
+        "copy": (4 + 4) + (4 + 3) + (6 + 3) + (3 + 1),
+        # absdiff 4N+4N->4N, BGRA2GRAY 4N->N
+        "zero-copy": (8 + 4) + (4 + 1),
+    }
+    paths = {
+        "copy": lambda raw, state: _copy_step(raw, state, width, height),
+        "zero-copy": lambda raw, state: _zero_copy_step(raw, state, width, height),
+    }
+
+    print(f"Capture path benchmark: {width}x{height}, {frames} frames")
+    print(f"{'path':<12}{'ms/frame':>10}{'traffic MB/frame':>18}{'peak alloc MB':>15}")
+    results = {}
+    for name, step in paths.items():
+        ms, peak = _time_path(step, shots, frames)
+        mb = traffic[name] * n / 1e6
+        results[name] = {"ms_per_frame": ms, "traffic_mb": mb, "peak_alloc_mb": peak / 1e6}
+        print(f"{name:<12}{ms:>10.2f}{mb:>18.1f}{peak / 1e6:>15.1f}")
+    return results
+
+
+def _legacy_tile_score(reference, frame, div):
+    # The original INTER_AREA grid: full diff, full gray, resize, max
+    gray_diff = to_gray(cv2.absdiff(reference, frame))
+    return np.max(cv2.resize(gray_diff, (div, div), interpolation=cv2.INTER_AREA))
+
+
+def _time_call(fn, frames):
+    start = time.perf_counter()
+    for _ in range(frames):
+        fn()
+    return (time.perf_counter() - start) / frames * 1000.0
+
+
+def run_tile_benchmark(resolution="3840x2160", frames=20):
+    width, height = parse_resolution(resolution)
+    shots = _synthetic_shots(width, height, count=1)
+    reference = np.frombuffer(shots[0], dtype=np.uint8).reshape(height, width, 4)
+    # Idle: nothing changed, so the engine has to scan every band.
+    # Busy: a change in the top band, so early exit kicks in immediately.
+    idle = reference.copy()
+    busy = reference.copy()
+    busy[:8, :, :3] ^= 0xFF
+
+    print(f"Tile scoring benchmark: {width}x{height}, {frames} frames per divisor (ms/frame)")
+    print(f"{'divs':>5}{'tile':>12}{'INTER_AREA':>12}{'grid idle':>12}{'grid busy':>12}")
+    results = []
+    for div in get_tile_divisors(width, height):
+        grid = TileGrid(width, height, div)
+        tw, th = grid.tile_size()
+        legacy = _time_call(lambda: _legacy_tile_score(reference, idle, div), frames)
+        scan = _time_call(lambda: grid.exceeds(reference, idle, 1.0), frames)
+        early = _time_call(lambda: grid.exceeds(reference, busy, 1.0), frames)
+        results.append({"divisions": div, "tile": [tw, th], "inter_area_ms": legacy,
+                        "grid_idle_ms": scan, "grid_busy_ms": early})
+        print(f"{div:>5}{f'{tw}x{th}':>12}{legacy:>12.2f}{scan:>12.2f}{early:>12.2f}")
+    return results
+
+
+def _synthetic_screen(width, height, seed=0):
+    # Desktop-like content for encoder timing: flat panels, rows of
+    # text-like glyph strokes, a gradient and a photo-like noisy area.
+    # Random noise alone would make every encoder look far worse than it is.
+    rng = np.random.default_rng(seed)
+    frame = np.full((height, width, 4), 255, dtype=np.uint8)
+    frame[:, : width // 5, :3] = (48, 40, 36)               # sidebar
+    frame[: height // 20, :, :3] = (70, 62, 58)             # title bar
+    glyphs = rng.integers(0, 2, (height // 24, width // 8), dtype=np.uint8)
+    for row in range(height // 20 + 8, height - 24, 24):    # lines of "text"
+        for col in range(width // 5 + 16, width * 3 // 5, 8):
+            if glyphs[row // 24, col // 8]:
+                frame[row:row + 14, col:col + 5, :3] = (30, 30, 30)
+    ramp = np.linspace(0, 255, width - width * 3 // 5, dtype=np.uint8)
+    frame[height // 20:height // 2, width * 3 // 5:, 0] = ramp
+    frame[height // 20:height // 2, width * 3 // 5:, 1] = ramp[::-1]
+    frame[height // 2:, width * 3 // 5:, :3] = rng.integers(0, 256, (height - height // 2, width - width * 3 // 5, 3), dtype=np.uint8)
+    return frame
+
+
+def _recorded_frames(session_dir, count):
+    from export import session_frames
+    frames = []
+    for _, _, image in session_frames(session_dir):
+        frames.append(image.copy())
+        if len(frames) >= count:
+            break
+    return frames
+
+
+def _encode_throughput(encoder, frames, quality, workers, count):
+    # Frames per second with `workers` threads encoding in parallel, the way
+    # the FrameWriter pool does (OpenCV and Pillow release the GIL while encoding)
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        start = time.perf_counter()
+        list(pool.map(lambda i: encoder.encode(frames[i % len(frames)], quality), range(count)))
+        return count / (time.perf_counter() - start)
+
+
+def run_encode_benchmark(resolution="3840x2160", frames=10, quality=90, session=None, workers="1,2,4", target_fps=60):
+    from encoders import ENCODERS, get_encoder
+    width, height = parse_resolution(resolution)
+    sources = [("synthetic", [_synthetic_screen(width, height)])]
+    if session:
+        recorded = _recorded_frames(session, frames)
+        if recorded:
+            sources.append(("recorded", recorded))
+        else:
+            print(f"No frames found in {session}")
+    worker_counts = [int(n) for n in str(workers).split(",")]
+
+    print(f"Encoder benchmark: {width}x{height}, quality {quality}, {frames} frames per run")
+    header = f"{'source':<10}{'encoder':<15}{'ms/frame':>10}{'MB/frame':>10}{f'MB/s@{target_fps}':>10}"
+    header += "".join(f"{f'fps x{n}':>10}" for n in worker_counts)
+    print(header)
+    results = []
+    for source, images in sources:
+        for name in ENCODERS:
+            encoder = get_encoder(name)
+            encoder.encode(images[0], quality)  # warm up
+            sizes = []
+            start = time.perf_counter()
+            for i in range(frames):
+                sizes.append(len(encoder.encode(images[i % len(images)], quality)))
+            ms = (time.perf_counter() - start) / frames * 1000.0
+            mb = sum(sizes) / len(sizes) / 1e6
+            scaling = {n: _encode_throughput(encoder, images, quality, n, max(frames, 2 * n)) for n in worker_counts}
+            results.append({"source": source, "encoder": name, "ms_per_frame": ms, "mb_per_frame": mb,
+                            "mb_per_s_at_target": mb * target_fps, "fps_by_workers": scaling})
+            line = f"{source:<10}{name:<15}{ms:>10.1f}{mb:>10.2f}{mb * target_fps:>10.1f}"
+            line += "".join(f"{scaling[n]:>10.1f}" for n in worker_counts)
+            print(line)
+    return results
+
+
+def _parse_list(text, cast=int):
+    return [cast(v) for v in str(text).split(",") if v]
+
+
+def _rss_bytes():
+    # Current resident set size (Linux), 0 where /proc isn't available
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return 0
+
+
+def _sample_peak_rss(stop, peak, interval=0.02):
+    while not stop.wait(interval):
+        peak[0] = max(peak[0], _rss_bytes())
+
+
+def _dir_bytes(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(root, name))
+    return total
+
+
+# Everything but the benchmarked matrix, pinned so results compare across
+# machines and releases whatever the saved config or the defaults say
+BENCH_SETTINGS = {
+    "engine": "thread",
+    "pacing": "skip",
+    "adaptive_fps": False,
+    "encoder": "jpeg",
+    "jpeg_subsampling": "420",
+    "storage": "jpeg",
+    "writer_threads": 2,
+    "queue_size": 8,
+    "backpressure": "block",
+    "dedup": True,
+    "collect_stats": True,
+    "zero_copy": True,
+    "proxy_scale": 4,
+    "safety_check_ticks": 30,
+    "capture_on_keystroke": False,
+    "burst_frames": 0,
+    "preroll_seconds": 0,
+    "regions": [],
+    "ignore_regions": [],
+    "tile_sensitivity": {},
+    "show_cursor": False,
+}
+
+
+@contextlib.contextmanager
+def _scratch_home():
+    # Recorders made inside start from the default settings and never read
+    # or write the user's config.json: HOME points at a temp dir meanwhile.
+    # Engine workers started inside inherit it too.
+    home = tempfile.mkdtemp(prefix="gsr-bench-home-")
+    saved = os.environ.get("HOME")
+    os.environ["HOME"] = home
+    try:
+        yield home
+    finally:
+        if saved is None:
+            os.environ.pop("HOME", None)
+        else:
+            os.environ["HOME"] = saved
+        shutil.rmtree(home, ignore_errors=True)
+
+
+def _run_pipeline_case(case, duration, regions, keep=False):
+    # One recording of `duration` seconds from the synthetic source, with the
+    # recorder's own output suppressed; errors are passed through
+    from recorder import ScreenRecorder
+    from sources import SyntheticSource
+
+    width, height = case["resolution"]
+    out_dir = tempfile.mkdtemp(prefix="gsr-bench-")
+    recorder = ScreenRecorder(output_dir=out_dir, source=SyntheticSource(width, height, regions))
+    recorder.apply_settings(BENCH_SETTINGS)
+    recorder.set_fps(case["fps"])
+    recorder.set_sensitivity(case["sensitivity"])
+    recorder.set_tile_divisions(case["tiles"])
+    recorder.set_quality(case["quality"])
+
+    stop = threading.Event()
+    peak = [_rss_bytes()]
+    sampler = threading.Thread(target=_sample_peak_rss, args=(stop, peak), daemon=True)
+    sampler.start()
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    log = io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(log):
+        recorder.start_recording()
+        time.sleep(duration)
+        recorder.stop_recording()
+    elapsed = time.perf_counter() - start
+    after = resource.getrusage(resource.RUSAGE_SELF)
+    stop.set()
+    sampler.join()
+
+    for line in log.getvalue().splitlines():
+        if line.startswith("Error"):
+            print(f"  {line}")
+
+    cpu = (after.ru_utime - usage.ru_utime) + (after.ru_stime - usage.ru_stime)
+    written = _dir_bytes(recorder.current_session_dir)
+    result = dict(case)
+    result["resolution"] = f"{width}x{height}"
+    result.update({
+        "duration_s": elapsed,
+        "ticks": recorder.scheduler.ticks,
+        "late_ticks": recorder.scheduler.late,
+        "dropped_ticks": recorder.scheduler.dropped,
+        "saved_frames": recorder.frame_count,
+        "saved_fps": recorder.frame_count / elapsed,
+        "cpu_s": cpu,
+        "cpu_percent": cpu / elapsed * 100.0,
+        "peak_rss_mb": peak[0] / 1e6,
+        "bytes_written": written,
+        "stages": recorder.stats.summary(),
+        "config": {key: getattr(recorder, key) for key in BENCH_SETTINGS},
+    })
+    if keep:
+        print(f"  kept {recorder.current_session_dir}")
+    else:
+        shutil.rmtree(out_dir, ignore_errors=True)
+    return result
+
+
+def _case_key(case):
+    return (case["resolution"], case["tiles"], case["sensitivity"], case["quality"], case["fps"])
+
+
+def compare_pipeline_results(results, baseline_path, tolerance=10.0, floor_ms=0.5):
+    # Regressions against an earlier `gsr bench --json` run: saved fps down,
+    # or a stage p95 up, by more than tolerance percent. Stages faster than
+    # floor_ms in the baseline are too noisy to judge and are skipped.
+    with open(baseline_path) as f:
+        baseline = {_case_key(c): c for c in json.load(f).get("cases", [])}
+
+    regressions = []
+    for case in results:
+        old = baseline.get(_case_key(case))
+        if old is None:
+            continue
+        label = "{resolution} tiles={tiles} sens={sensitivity} q={quality} fps={fps}".format(**case)
+        if old.get("config") != case["config"]:
+            print(f"  {label}: baseline ran with other fixed settings, not compared")
+            continue
+        if old["saved_fps"] and case["saved_fps"] < old["saved_fps"] * (1 - tolerance / 100.0):
+            regressions.append(f"{label}: saved fps {old['saved_fps']:.1f} -> {case['saved_fps']:.1f}")
+        for stage, now in case["stages"].items():
+            before = old.get("stages", {}).get(stage)
+            if not before or before["p95_ms"] < floor_ms:
+                continue
+            if now["p95_ms"] > before["p95_ms"] * (1 + tolerance / 100.0):
+                regressions.append(f"{label}: {stage} p95 {before['p95_ms']:.2f} -> {now['p95_ms']:.2f} ms")
+    return regressions
+
+
+def run_pipeline_benchmark(resolutions="1920x1080,3840x2160", tiles="1,8", sensitivities="50,100",
+                           qualities="90", fps_list="30", duration=5.0, regions="typing,scrolling,video",
+                           json_path=None, baseline=None, tolerance=10.0, keep=False):
+    # Drives ScreenRecorder end to end (grab -> detect -> encode -> write) over
+    # a matrix of settings, using the synthetic source so runs are repeatable
+    # on headless machines. Settings outside the matrix are BENCH_SETTINGS,
+    # never the user's config.
+    from sources import SYNTHETIC_REGIONS
+    region_names = tuple(r for r in regions.split(",") if r in SYNTHETIC_REGIONS)
+    matrix = itertools.product(
+        [parse_resolution(r) for r in resolutions.split(",")],
+        _parse_list(tiles), _parse_list(sensitivities), _parse_list(qualities), _parse_list(fps_list))
+
+    print(f"Pipeline benchmark: {duration:.0f}s per case, synthetic {','.join(region_names)} (p95 ms per stage)")
+    print(f"{'resolution':<11}{'tiles':>6}{'sens':>5}{'q':>4}{'fps':>4}{'saved/s':>9}"
+          f"{'grab':>7}{'detect':>7}{'submit':>7}{'encode':>7}{'write':>7}{'cpu%':>6}{'rssMB':>7}{'MB out':>8}")
+    results = []
+    with _scratch_home():
+        for (w, h), div, sens, quality, fps in matrix:
+            case = {"resolution": (w, h), "tiles": div, "sensitivity": sens, "quality": quality, "fps": fps}
+            result = _run_pipeline_case(case, duration, region_names, keep)
+            results.append(result)
+            st = result["stages"]
+            print(f"{result['resolution']:<11}{div:>6}{sens:>5}{quality:>4}{fps:>4}{result['saved_fps']:>9.1f}"
+                  + "".join(f"{st[stage]['p95_ms']:>7.1f}" for stage in ("grab", "detect", "submit", "encode", "write"))
+                  + f"{result['cpu_percent']:>6.0f}{result['peak_rss_mb']:>7.0f}{result['bytes_written'] / 1e6:>8.1f}")
+
+    if json_path:
+        report = {
+            "gsr_version": get_version(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "platform": platform.platform(),
+            "python": sys.version.split()[0],
+            "opencv": cv2.__version__,
+            "cpus": os.cpu_count(),
+            "duration_s": duration,
+            "regions": list(region_names),
+            "cases": results,
+        }
+        with open(json_path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {json_path}")
+
+    regressions = []
+    if baseline:
+        regressions = compare_pipeline_results(results, baseline, tolerance)
+        if regressions:
+            print(f"{len(regressions)} regressions against {baseline} (tolerance {tolerance:.0f}%):")
+            for line in regressions:
+                print(f"  {line}")
+        else:
+            print(f"No regressions against {baseline} (tolerance {tolerance:.0f}%)")
+    return results, regressions
+
+
+def _sample_memory(stop, samples, interval):
+    # (rss, traced bytes, transient peak since the previous sample); the
+    # transient peak is how far temporary allocations rose above what stayed
+    while not stop.wait(interval):
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        samples.append((_rss_bytes(), current, peak - current))
+
+
+def _quarter_means(values):
+    # Mean of the first and the last quarter, so a single spike doesn't
+    # register as growth
+    n = max(1, len(values) // 4)
+    return sum(values[:n]) / n, sum(values[-n:]) / n
+
+
+def run_memory_benchmark(resolution="1920x1080", frames=3000, scenarios="idle,typing",
+                         max_growth_mb=16.0, max_transient_mb=None, interval=0.1):
+    # Records `frames` synthetic frames as fast as the pipeline takes them,
+    # under tracemalloc, and checks that memory stays flat once warmed up.
+    # "idle" never changes (every tick is examined and skipped: the steady
+    # state); the other scenarios are synthetic regions that keep saving.
+    # Runs on default settings, not the user's config.
+    with _scratch_home():
+        return _run_memory_benchmark(resolution, frames, scenarios, max_growth_mb, max_transient_mb, interval)
+
+
+def _run_memory_benchmark(resolution, frames, scenarios, max_growth_mb, max_transient_mb, interval):
+    from recorder import ScreenRecorder
+    from sources import SyntheticSource, SYNTHETIC_REGIONS
+
+    width, height = parse_resolution(resolution)
+    frame_mb = width * height * 4 / 1e6
+    print(f"Memory benchmark: {width}x{height} ({frame_mb:.1f} MB/frame), {frames} frames per scenario")
+    print(f"{'scenario':<18}{'ticks':>7}{'saved':>7}{'rss MB':>8}{'rss +MB':>9}{'traced +MB':>12}{'transient MB':>14}")
+
+    results = {}
+    failures = []
+    for scenario in scenarios.split(","):
+        regions = tuple(r for r in scenario.split("+") if r in SYNTHETIC_REGIONS)
+        source = SyntheticSource(width, height, regions, frames=frames)
+        source.paced = False
+        out_dir = tempfile.mkdtemp(prefix="gsr-bench-")
+        recorder = ScreenRecorder(output_dir=out_dir, source=source)
+        recorder.set_sensitivity(100) # every changed frame is saved
+
+        samples = []
+        stop = threading.Event()
+        tracemalloc.start()
+        sampler = threading.Thread(target=_sample_memory, args=(stop, samples, interval), daemon=True)
+        with contextlib.redirect_stdout(io.StringIO()):
+            recorder.start_recording()
+            sampler.start()
+            while recorder.running:
+                time.sleep(interval)
+            # Sampling ends with the source, before the writer shuts down
+            stop.set()
+            sampler.join()
+            recorder.stop_recording()
+        tracemalloc.stop()
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+        # The first fifth is warm-up: buffers, grids and encoder state
+        steady = samples[len(samples) // 5:] or samples
+        rss_start, rss_end = _quarter_means([s[0] for s in steady])
+        traced_start, traced_end = _quarter_means([s[1] for s in steady])
+        transient = sorted(s[2] for s in steady)[int(len(steady) * 0.95)] if steady else 0
+        result = {
+            "ticks": recorder.scheduler.ticks,
+            "saved": recorder.frame_count,
+            "rss_mb": rss_end / 1e6,
+            "rss_growth_mb": (rss_end - rss_start) / 1e6,
+            "traced_growth_mb": (traced_end - traced_start) / 1e6,
+            "transient_p95_mb": transient / 1e6,
+        }
+        results[scenario] = result
+        print(f"{scenario:<18}{result['ticks']:>7}{result['saved']:>7}{result['rss_mb']:>8.0f}"
+              f"{result['rss_growth_mb']:>9.1f}{result['traced_growth_mb']:>12.1f}{result['transient_p95_mb']:>14.1f}")
+
+        if result["rss_growth_mb"] > max_growth_mb:
+            failures.append(f"{scenario}: RSS grew {result['rss_growth_mb']:.1f} MB (limit {max_growth_mb:g})")
+        if result["traced_growth_mb"] > max_growth_mb:
+            failures.append(f"{scenario}: Python allocations grew {result['traced_growth_mb']:.1f} MB (limit {max_growth_mb:g})")
+        if max_transient_mb is not None and result["transient_p95_mb"] > max_transient_mb:
+            failures.append(f"{scenario}: transient allocations {result['transient_p95_mb']:.1f} MB (limit {max_transient_mb:g})")
+
+    for line in failures:
+        print(f"  FAIL {line}")
+    if not failures:
+        print("Memory stayed flat")
+    return results, failures
+
+
+# Startup cases: what runs, the modules it must not import, and whether its
+# import time counts against the budget. The gsr commands are run through
+# main.main() exactly as the `gsr` entry point does.
+HEAVY_MODULES = ("cv2", "numpy", "PIL", "mss", "pynput", "tkinter", "customtkinter")
+STARTUP_CASES = (
+    # Installed, --version reads the package metadata: importlib.metadata
+    # alone is about 45 ms, and that lookup is what the command is for
+    ("gsr --version", ["--version"], HEAVY_MODULES, False),
+    ("gsr --help", ["--help"], HEAVY_MODULES, True),
+    ("gsr ctl status", ["ctl", "--socket", "{tmp}/missing.sock", "status"], HEAVY_MODULES, True),
+    # The capture stack itself is expected, but not the screen or the input
+    # listeners: creating a recorder must not probe the display
+    ("ScreenRecorder()", "import recorder; recorder.ScreenRecorder(output_dir={tmp!r})",
+     ("mss", "pynput", "PIL", "tkinter", "customtkinter"), False),
+)
+
+
+def _importtime_run(code, args, env):
+    # Wall time of one interpreter run, and {module: (self us, cumulative us,
+    # imported at top level)} from its -X importtime report
+    import subprocess
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code] + list(args),
+                          env=env, capture_output=True, text=True)
+    wall_ms = (time.perf_counter() - start) * 1000.0
+    modules = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue # the column header
+        name = fields[2].rstrip()
+        modules[name.strip()] = (int(fields[0]), int(fields[1]), len(name) - len(name.lstrip()) <= 1)
+    return wall_ms, modules
+
+
+def run_startup_benchmark(runs=5, budget_ms=50.0, json_path=None):
+    # Runs each startup case `runs` times under -X importtime and reports
+    # median wall time and import time over a bare interpreter. Fails when a
+    # budgeted case imports more than budget_ms, or any case pulls in a
+    # module it must not.
+    src_dir = os.path.dirname(os.path.abspath(__file__))
+    tmp = tempfile.mkdtemp(prefix="gsr-bench-")
+    env = dict(os.environ)
+    env["HOME"] = tmp # no saved settings, and nothing written to the real config
+    env["PYTHONPATH"] = os.pathsep.join(p for p in (src_dir, env.get("PYTHONPATH")) if p)
+
+    def median(values):
+        return sorted(values)[len(values) // 2]
+
+    def measure(code, args):
+        walls, imports, loaded = [], [], {}
+        for _ in range(max(1, runs)):
+            wall_ms, modules = _importtime_run(code, args, env)
+            walls.append(wall_ms)
+            imports.append(sum(self_us for self_us, _, _ in modules.values()) / 1000.0)
+            loaded = modules
+        return median(walls), median(imports), loaded
+
+    print(f"Startup benchmark: median of {runs} runs, import budget {budget_ms:g} ms over bare python")
+    print(f"{'case':<20}{'wall ms':>9}{'import ms':>11}{'modules':>9}  heavy imports")
+    results = {}
+    failures = []
+    try:
+        base_wall, base_import, base_modules = measure("pass", [])
+        print(f"{'python (baseline)':<20}{base_wall:>9.1f}{0.0:>11.1f}{len(base_modules):>9}")
+        for name, command, forbidden, budgeted in STARTUP_CASES:
+            if isinstance(command, str):
+                code, args = command.format(tmp=tmp), []
+            else:
+                code, args = "import main; main.main()", [a.format(tmp=tmp) for a in command]
+            wall_ms, import_ms, modules = measure(code, args)
+            import_ms = max(0.0, import_ms - base_import)
+            heavy = sorted({m.split(".")[0] for m in modules} & set(forbidden))
+            # Slowest imports made by gsr itself, to show where the time goes
+            slowest = sorted(((cum_us, m) for m, (_, cum_us, top) in modules.items()
+                              if top and m not in base_modules), reverse=True)[:5]
+            results[name] = {
+                "wall_ms": wall_ms,
+                "import_ms": import_ms,
+                "modules": len(modules),
+                "heavy": heavy,
+                "slowest": [{"module": m, "cumulative_ms": us / 1000.0} for us, m in slowest],
+            }
+            print(f"{name:<20}{wall_ms:>9.1f}{import_ms:>11.1f}{len(modules):>9}  {', '.join(heavy) or '-'}")
+            if heavy:
+                failures.append(f"{name}: imports {', '.join(heavy)}")
+            if budgeted and import_ms > budget_ms:
+                top = ", ".join(f"{m} {us / 1000.0:.1f}" for us, m in slowest)
+                failures.append(f"{name}: {import_ms:.1f} ms of imports (budget {budget_ms:g}; slowest {top})")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    if json_path:
+        report = {
+            "python": platform.python_version(),
+            "runs": runs,
+            "budget_ms": budget_ms,
+            "baseline": {"wall_ms": base_wall, "import_ms": base_import},
+            "cases": results,
+        }
+        with open(json_path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {json_path}")
+
+    for line in failures:
+        print(f"  FAIL {line}")
+    if not failures:
+        print("Startup within budget")
+    return results, failures
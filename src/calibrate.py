@@ -0,0 +1,120 @@
+import time
+import numpy as np
+from tiles import TileGrid
+
+# The watch is split into this many equal slices of time; a tile is noise
+# only if it changed in several of them, not in one burst
+SLICES = 10
+
+# More of the screen than this learned as noise means something was playing
+# or animating during calibration, not idle flicker: refuse to save it
+MAX_NOISY_FRACTION = 0.1
+
+
+def learn_noise(source, seconds=30.0, fps=5, tiles=32, min_changes=3):
+    # Watches an idle screen and counts, per tile of a fine grid, how many
+    # ticks changed anything in it. Clocks, blinking carets, spinners and
+    # badges keep changing with nobody at the keyboard, spread over the whole
+    # watch; a notification sliding in changes a lot once. Tiles that changed
+    # in at least min_changes of the SLICES slices of the watch are returned
+    # as [x, y, w, h] ignore areas, merged into as few rectangles as possible.
+    # Also returns the noisy tile mask, the change counts and the number of
+    # frames watched.
+    source.open()
+    try:
+        w, h = source.resolution
+        grid = TileGrid(w, h, tiles)
+        counts = np.zeros((grid.rows, grid.cols), dtype=np.int64)
+        spread = np.zeros((grid.rows, grid.cols), dtype=np.int64)  # slices with a change
+        last_slice = np.full((grid.rows, grid.cols), -1, dtype=np.int64)
+        slices = max(SLICES, min_changes)
+        interval = 1.0 / max(1, fps)
+        previous = None
+        frames = 0
+        start = deadline = time.monotonic()
+        end = deadline + seconds
+        while deadline < end:
+            frame = source.grab()
+            if frame is None:
+                break
+            if previous is not None:
+                current = min(slices - 1, int((deadline - start) / max(seconds, 1e-9) * slices))
+                for r, c in grid.changed_tiles(previous, frame):
+                    counts[r, c] += 1
+                    if last_slice[r, c] != current:
+                        last_slice[r, c] = current
+                        spread[r, c] += 1
+            previous = frame
+            frames += 1
+            deadline += interval
+            delay = deadline - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+    finally:
+        source.close()
+    noisy = spread >= max(1, min_changes)
+    return noisy_areas(grid, noisy), noisy, counts, frames
+
+
+def noisy_areas(grid, noisy):
+    # Runs of noisy tiles within a row, then identical runs stacked over
+    # consecutive rows, as [x, y, w, h] in frame pixels
+    open_runs = {} # (c0, c1) -> [x, y, w, h] still growing downwards
+    areas = []
+    for r in range(grid.rows):
+        runs = []
+        c = 0
+        while c < grid.cols:
+            if noisy[r, c]:
+                c0 = c
+                while c < grid.cols and noisy[r, c]:
+                    c += 1
+                runs.append((c0, c))
+            else:
+                c += 1
+        y0, y1 = grid.row_edges[r], grid.row_edges[r + 1]
+        grown = {}
+        for run in runs:
+            area = open_runs.pop(run, None)
+            if area is None:
+                x0, x1 = grid.col_edges[run[0]], grid.col_edges[run[1]]
+                area = [x0, y0, x1 - x0, 0]
+            area[3] = y1 - area[1]
+            grown[run] = area
+        areas.extend(open_runs.values())
+        open_runs = grown
+    areas.extend(open_runs.values())
+    return sorted(areas, key=lambda a: (a[1], a[0]))
+
+
+def run_calibration(recorder, seconds=30.0, fps=5, tiles=32, min_changes=3, save=False, force=False):
+    print(f"Watching the screen for {seconds:g}s: leave it idle (don't type or move the mouse)...")
+    areas, noisy, counts, frames = learn_noise(recorder.source, seconds, fps, tiles, min_changes)
+    if frames < 2:
+        print("Error: not enough frames to calibrate")
+        return []
+    changing = int(np.count_nonzero(counts))
+    print(f"{frames} frames watched, {changing} of {counts.size} tiles changed at least once")
+    if not areas:
+        print(f"No tile kept changing across {min_changes} or more slices of the watch; nothing to ignore")
+        return []
+    print("Tiles that kept changing (ignore areas):")
+    for x, y, w, h in areas:
+        print(f"  --ignore {x},{y},{w},{h}")
+    fraction = np.count_nonzero(noisy) / noisy.size
+    if fraction > MAX_NOISY_FRACTION:
+        print(f"Warning: {fraction:.0%} of the screen kept changing; something was playing or animating, "
+              "which is not idle noise and would hide real changes")
+        if save and not force:
+            print("Not saved: calibrate again on an idle screen, or add --force to save these areas anyway")
+            return areas
+    if save:
+        known = [list(area) for area in recorder.ignore_regions]
+        added = [area for area in areas if area not in known]
+        recorder.set_ignore_regions(known + added)
+        recorder.save_settings()
+        recorder.flush_settings()
+        print(f"Added {len(added)} ignore areas to {recorder.config_file}")
+    else:
+        print("Run again with --save to add them to the saved settings")
+    return areas
@@ -0,0 +1,244 @@
+import os
+import mmap
+import struct
+import collections
+import numpy as np
+import cv2
+
+# Session container: one append-only payload file plus a fixed-size binary
+# index, instead of one file per frame.
+#
+#   frames.gsr  concatenated encoded payloads (JPEG by default), no framing
+#   frames.idx  INDEX_MAGIC, then one INDEX_RECORD per payload
+#
+# Both files only ever grow, so a crash loses at most the records that were
+# still in the write buffers; a trailing partial index record is ignored.
+CONTAINER_NAME = "frames.gsr"
+INDEX_NAME = "frames.idx"
+INDEX_MAGIC = b"GSRIDX1\0"
+
+# offset, length, t_ns, frame, reason, kind, x, y
+INDEX_RECORD = struct.Struct("<QIqIBBHH")
+_FRAME_FIELD_OFFSET = struct.calcsize("<QIq")
+
+# Trigger reasons, stored by position in the index: new ones go at the end,
+# or older sessions read back with the wrong reason
+REASONS = ("change", "initial", "key", "mouse", "preroll", "burst")
+
+# Record kinds
+KIND_FRAME = 0  # a complete frame (keyframe in tile-delta sessions)
+KIND_TILE = 1   # one changed tile at (x, y); a frame may have several, or a
+                # single empty one when nothing changed since the previous frame
+KIND_REF = 2    # repeats an earlier frame exactly; offset holds that frame's number
+
+IndexEntry = collections.namedtuple("IndexEntry", "offset length t_ns frame reason kind x y")
+
+
+def is_container(session_dir):
+    return os.path.exists(os.path.join(session_dir, INDEX_NAME))
+
+
+def jpeg_size(payload):
+    # (width, height) from the JPEG SOF marker, without decoding the image
+    data = bytes(payload[:65536])
+    i = 2
+    while i + 9 < len(data):
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            h, w = struct.unpack_from(">HH", data, i + 5)
+            return w, h
+        i += 2 + struct.unpack_from(">H", data, i + 2)[0]
+    return None
+
+
+class ContainerWriter:
+    def __init__(self, session_dir, buffer_size=4 * 1024 * 1024):
+        data_path = os.path.join(session_dir, CONTAINER_NAME)
+        index_path = os.path.join(session_dir, INDEX_NAME)
+        new_index = not os.path.exists(index_path)
+
+        # Large buffers turn thousands of small frame writes into a few big appends
+        self._data = open(data_path, "ab", buffering=buffer_size)
+        self._index = open(index_path, "ab", buffering=64 * 1024)
+        if new_index:
+            self._index.write(INDEX_MAGIC)
+        self._offset = self._data.tell()
+        self.frame_count = 0
+
+    def append(self, payload, t_ns=0, reason="change", kind=KIND_FRAME, x=0, y=0):
+        # Adds one record to the current frame; call end_frame() once it's complete
+        length = len(payload)
+        if length:
+            self._data.write(payload)
+        self._index.write(INDEX_RECORD.pack(
+            self._offset, length, int(t_ns), self.frame_count,
+            REASONS.index(reason) if reason in REASONS else 0, kind, x, y))
+        self._offset += length
+
+    def end_frame(self):
+        self.frame_count += 1
+
+    # FrameWriter sink interface: data is an encoded frame, or a list of
+    # (x, y, payload) tiles for a tile-delta frame
+    def write(self, data, meta):
+        meta = meta or {}
+        t_ns = meta.get("t_ns", 0)
+        reason = meta.get("reason", "change")
+        offset = self._offset
+        frame = self.frame_count
+        if isinstance(data, list):
+            if not data:
+                self.append(b"", t_ns, reason, KIND_TILE)
+            for x, y, payload in data:
+                self.append(payload, t_ns, reason, KIND_TILE, x, y)
+            location = {"offset": offset, "tiles": len(data)}
+        else:
+            self.append(data, t_ns, reason)
+            location = {"offset": offset}
+        self.end_frame()
+        return frame, location
+
+    def write_duplicate(self, target, meta):
+        # target is (frame, location, size) of the frame this one repeats
+        meta = meta or {}
+        frame = self.frame_count
+        self._index.write(INDEX_RECORD.pack(
+            target[0], 0, int(meta.get("t_ns", 0)), frame,
+            REASONS.index(meta.get("reason")) if meta.get("reason") in REASONS else 0, KIND_REF, 0, 0))
+        self.end_frame()
+        return frame, {"duplicate_of": target[0]}
+
+    def close(self):
+        self._data.close()
+        self._index.close()
+
+
+class ContainerReader:
+    def __init__(self, session_dir):
+        self.session_dir = session_dir
+        with open(os.path.join(session_dir, INDEX_NAME), "rb") as f:
+            index = f.read()
+        if not index.startswith(INDEX_MAGIC):
+            raise ValueError(f"Not a GSR session index: {session_dir}")
+        body = memoryview(index)[len(INDEX_MAGIC):]
+        self._count = len(body) // INDEX_RECORD.size
+        self._index = body
+
+        self._file = open(os.path.join(session_dir, CONTAINER_NAME), "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        self._frames = None
+
+    def __len__(self):
+        return self._count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def entry(self, i):
+        offset, length, t_ns, frame, reason, kind, x, y = INDEX_RECORD.unpack_from(self._index, i * INDEX_RECORD.size)
+        reason = REASONS[reason] if reason < len(REASONS) else "change"
+        return IndexEntry(offset, length, t_ns, frame, reason, kind, x, y)
+
+    def payload(self, entry):
+        # Zero-copy view into the mapped container
+        return memoryview(self._map)[entry.offset:entry.offset + entry.length]
+
+    def entries(self):
+        for i in range(self._count):
+            yield self.entry(i)
+
+    @property
+    def frame_count(self):
+        return len(self._frame_table())
+
+    def has_deltas(self):
+        return any(entry.kind == KIND_TILE for entry in self.entries())
+
+    def frame_entries(self, n):
+        start, end = self._frame_table()[n]
+        return [self.entry(i) for i in range(start, end)]
+
+    def frames(self, region=None):
+        # Reconstructs every frame in order, yielding (entries, BGR image).
+        # region=(x, y, w, h) crops the output and skips tiles outside it.
+        # The yielded image is updated in place by later frames; copy it to keep it.
+        image = None
+        for n in range(self.frame_count):
+            entries = self.frame_entries(n)
+            image = self._apply(image, entries, region)
+            yield entries, self._crop(image, region)
+
+    def read_frame(self, n, region=None):
+        return self._crop(self._reconstruct(n, region), region)
+
+    def _reconstruct(self, n, region=None):
+        # Random access: decode the closest keyframe (or reference) at or
+        # before n and replay the tile deltas up to n
+        key = n
+        while key > 0 and self.frame_entries(key)[0].kind == KIND_TILE:
+            key -= 1
+        image = None
+        for i in range(key, n + 1):
+            image = self._apply(image, self.frame_entries(i), region)
+        return image
+
+    def _frame_table(self):
+        # Frame number -> [start, end) range of its index records
+        if self._frames is None:
+            frames = []
+            current = None
+            for i in range(self._count):
+                frame = struct.unpack_from("<I", self._index, i * INDEX_RECORD.size + _FRAME_FIELD_OFFSET)[0]
+                if frame != current:
+                    frames.append([i, i + 1])
+                    current = frame
+                else:
+                    frames[-1][1] = i + 1
+            self._frames = frames
+        return self._frames
+
+    def _decode(self, entry):
+        return cv2.imdecode(np.frombuffer(self.payload(entry), dtype=np.uint8), cv2.IMREAD_COLOR)
+
+    def _apply(self, image, entries, region):
+        for entry in entries:
+            if entry.kind == KIND_FRAME:
+                image = self._decode(entry)
+            elif entry.kind == KIND_REF:
+                # Always points back at a stored frame, never at another reference
+                image = self._reconstruct(entry.offset, region)
+            elif entry.length and image is not None:
+                if region is not None and not self._overlaps(entry, region):
+                    # Outside the requested region, no need to decode it
+                    continue
+                tile = self._decode(entry)
+                th, tw = tile.shape[:2]
+                image[entry.y:entry.y + th, entry.x:entry.x + tw] = tile
+        return image
+
+    def _overlaps(self, entry, region):
+        size = jpeg_size(self.payload(entry))
+        if size is None:
+            return True
+        x, y, w, h = region
+        tw, th = size
+        return entry.x < x + w and entry.x + tw > x and entry.y < y + h and entry.y + th > y
+
+    @staticmethod
+    def _crop(image, region):
+        if image is None or region is None:
+            return image
+        x, y, w, h = region
+        return image[y:y + h, x:x + w]
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
@@ -0,0 +1,309 @@
+import os
+import json
+import time
+import socket
+import threading
+import socketserver
+
+# Control protocol: one JSON object per line in each direction over a Unix
+# socket. Every request has a "cmd"; every reply has "ok", and "error" when
+# ok is false. A connection may send any number of requests; "stats" turns it
+# into a stream of status objects until the client hangs up.
+#   start                           start a session
+#   stop                            stop it, reply with its directory and frames
+#   pause / resume                  stop and restart saving within the session
+#   marker [label]                  add a chapter marker to markers.jsonl
+#   set {settings} [save]           change settings, live if recording
+#   status                          one status object
+#   stats [interval]                status objects every interval seconds
+#   shutdown                        stop any session and exit the daemon
+COMMANDS = ("start", "stop", "pause", "resume", "marker", "set", "status", "stats", "shutdown")
+
+SOCKET_NAME = "gsr.sock"
+
+# Seconds between status objects of a stats stream
+STATS_INTERVAL_S = 1.0
+
+
+def default_socket_path():
+    # Per-user runtime directory when there is one, else next to config.json
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir and os.path.isdir(runtime_dir):
+        return os.path.join(runtime_dir, SOCKET_NAME)
+    return os.path.join(os.path.expanduser("~/.config/gsr"), SOCKET_NAME)
+
+
+def _set_tile_rows(recorder, rows):
+    recorder.set_tile_divisions(recorder.tile_divisions, rows)
+
+
+# Settings the "set" command accepts, applied through the recorder's setters
+# so values are validated the same way as on the command line and in the GUI
+SETTERS = {
+    "fps": lambda r, v: r.set_fps(int(v)),
+    "adaptive_fps": lambda r, v: r.set_adaptive_fps(bool(v)),
+    "min_fps": lambda r, v: r.set_min_fps(int(v)),
+    "boost_window": lambda r, v: r.set_boost_window(v),
+    "pacing": lambda r, v: r.set_pacing(v),
+    "sensitivity": lambda r, v: r.set_sensitivity(max(0, min(int(v), 100))),
+    "quality": lambda r, v: r.set_quality(int(v)),
+    "tile_divisions": lambda r, v: r.set_tile_divisions(v, r.tile_rows),
+    "tile_rows": _set_tile_rows,
+    "ignore_regions": lambda r, v: r.set_ignore_regions(v or ["none"]),
+    "tile_sensitivity": lambda r, v: r.set_tile_sensitivity([f"{k}={s}" for k, s in v.items()] or ["none"]),
+    "capture_on_keystroke": lambda r, v: r.set_capture_on_keystroke(bool(v)),
+    "capture_mouse_click": lambda r, v: r.set_mouse_triggers(click=bool(v)),
+    "capture_mouse_move": lambda r, v: r.set_mouse_triggers(move=bool(v)),
+    "capture_mouse_scroll": lambda r, v: r.set_mouse_triggers(scroll=bool(v)),
+    "burst_frames": lambda r, v: r.set_burst(frames=v),
+    "burst_fps": lambda r, v: r.set_burst(fps=v),
+    "show_cursor": lambda r, v: r.set_cursor(show=bool(v)),
+    "cursor_style": lambda r, v: r.set_cursor(style=v),
+    "cursor_size": lambda r, v: r.set_cursor(size=v),
+    "proxy_scale": lambda r, v: r.set_proxy_scale(v),
+    "safety_check_ticks": lambda r, v: r.set_safety_check(v),
+    # Take effect with the next session
+    "engine": lambda r, v: r.set_engine(v),
+    "output_dir": lambda r, v: r.set_output_dir(v),
+    "regions": lambda r, v: r.set_regions(v or ["none"]),
+    "preroll_seconds": lambda r, v: r.set_preroll(seconds=v),
+    "encoder": lambda r, v: r.set_encoder(v),
+    "storage": lambda r, v: r.set_storage(v),
+    "cursor_mode": lambda r, v: r.set_cursor_mode(v),
+    "zero_copy": lambda r, v: r.set_zero_copy(bool(v)),
+}
+
+
+class RecorderDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    # Keeps one ScreenRecorder (and its frame source) alive between sessions
+    # and serves the control protocol, one thread per connection. Commands
+    # that change the recorder run one at a time.
+    daemon_threads = True
+
+    def __init__(self, recorder, path):
+        self.recorder = recorder
+        self.path = path
+        self.lock = threading.Lock()
+        self.closing = False
+        _claim_socket(path)
+        socketserver.UnixStreamServer.__init__(self, path, ControlHandler)
+        os.chmod(path, 0o600) # only this user can drive the recorder
+
+    def service_actions(self):
+        # Runs between polls of serve_forever: a session whose source ended
+        # (replay) is stopped and its writers drained, as the CLI does
+        recorder = self.recorder
+        if recorder.current_session_dir and not recorder.running and recorder._writers():
+            with self.lock:
+                if not recorder.running and recorder._writers():
+                    recorder.stop_recording()
+
+    def server_close(self):
+        super().server_close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    def handle_command(self, message):
+        cmd = message.get("cmd")
+        if cmd not in COMMANDS:
+            return {"ok": False, "error": f"unknown command {cmd!r}"}
+        recorder = self.recorder
+        with self.lock:
+            if cmd == "start":
+                if recorder.running:
+                    return {"ok": False, "error": "already recording"}
+                recorder.start_recording()
+                return {"ok": True, "session": recorder.current_session_dir}
+            if cmd == "stop":
+                if not recorder.running and not recorder._writers():
+                    return {"ok": False, "error": "not recording"}
+                recorder.stop_recording()
+                return {"ok": True, "session": recorder.current_session_dir, "frames": recorder.frame_count}
+            if cmd == "pause":
+                if not recorder.pause_recording():
+                    return {"ok": False, "error": "not recording" if not recorder.running else "already paused"}
+                return {"ok": True}
+            if cmd == "resume":
+                if not recorder.resume_recording():
+                    return {"ok": False, "error": "not recording" if not recorder.running else "not paused"}
+                return {"ok": True}
+            if cmd == "marker":
+                record = recorder.add_marker(message.get("label"))
+                if record is None:
+                    return {"ok": False, "error": "not recording"}
+                return {"ok": True, "marker": record}
+            if cmd == "set":
+                return self._set(message.get("settings") or {}, message.get("save", False))
+            if cmd == "shutdown":
+                if recorder.running or recorder._writers():
+                    recorder.stop_recording()
+                self.closing = True
+                # shutdown() waits for serve_forever, so not from this thread
+                threading.Thread(target=self.shutdown, daemon=True).start()
+                return {"ok": True}
+        return {"ok": True, "status": recorder.live_stats()}
+
+    def _set(self, settings, save):
+        recorder = self.recorder
+        unknown = [key for key in settings if key not in SETTERS]
+        if unknown:
+            return {"ok": False, "error": f"unknown settings: {', '.join(unknown)}"}
+        rejected = []
+        try:
+            for key, value in settings.items():
+                # Setters that validate return False when they keep the old value
+                if SETTERS[key](recorder, value) is False:
+                    rejected.append(key)
+        except (TypeError, ValueError, AttributeError) as e:
+            return {"ok": False, "error": f"invalid value: {e}"}
+        if save:
+            recorder.save_settings()
+        # What the setters made of the values (they clamp and reject)
+        current = recorder.settings_dict()
+        reply = {"ok": not rejected, "settings": {key: current[key] for key in settings}}
+        if rejected:
+            reply["error"] = "invalid value for " + ", ".join(f"{key}={settings[key]!r}" for key in rejected)
+        return reply
+
+
+class ControlHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        server = self.server
+        for line in self.rfile:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                message = json.loads(line)
+                if not isinstance(message, dict):
+                    raise ValueError("expected a JSON object")
+            except ValueError as e:
+                self._reply({"ok": False, "error": f"bad request: {e}"})
+                continue
+            if message.get("cmd") == "stats":
+                self._stream(message.get("interval", STATS_INTERVAL_S))
+                return
+            if not self._reply(server.handle_command(message)):
+                return
+
+    def _stream(self, interval):
+        try:
+            interval = max(0.05, float(interval))
+        except (TypeError, ValueError):
+            interval = STATS_INTERVAL_S
+        server = self.server
+        while not server.closing:
+            if not self._reply({"ok": True, "status": server.recorder.live_stats()}):
+                return
+            time.sleep(interval)
+
+    def _reply(self, reply):
+        try:
+            self.wfile.write((json.dumps(reply) + "\n").encode())
+            self.wfile.flush()
+            return True
+        except OSError:
+            return False # client went away
+
+
+def _claim_socket(path):
+    # A socket file left by a daemon that died is removed; one that still
+    # answers belongs to a running daemon
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except OSError:
+        os.remove(path)
+        return
+    finally:
+        probe.close()
+    raise OSError(f"a daemon is already listening on {path}")
+
+
+def serve(recorder, path=None):
+    path = path or default_socket_path()
+    try:
+        server = RecorderDaemon(recorder, path)
+    except OSError as e:
+        print(f"Error starting daemon: {e}")
+        return 1
+    print(f"Listening on {path}")
+    try:
+        server.serve_forever(poll_interval=0.2)
+    finally:
+        if recorder.running or recorder._writers():
+            recorder.stop_recording()
+        server.server_close()
+    return 0
+
+
+def connect(path=None, timeout=5.0):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    sock.connect(path or default_socket_path())
+    return sock
+
+
+def request(message, path=None, timeout=5.0):
+    # One request, one reply
+    with connect(path, timeout) as sock:
+        sock.sendall((json.dumps(message) + "\n").encode())
+        with sock.makefile("r") as f:
+            line = f.readline()
+    if not line:
+        return {"ok": False, "error": "daemon closed the connection"}
+    return json.loads(line)
+
+
+def stream(message, path=None):
+    # Yields replies until the daemon closes the connection
+    with connect(path, timeout=None) as sock:
+        sock.sendall((json.dumps(message) + "\n").encode())
+        with sock.makefile("r") as f:
+            for line in f:
+                yield json.loads(line)
+
+
+def parse_value(text):
+    # Command line values of "set": JSON where it parses (numbers, booleans,
+    # lists), a plain string otherwise
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+
+def run_client(cmd, params, path=None, interval=STATS_INTERVAL_S, save=False):
+    # `gsr ctl`: sends one command and prints the reply as JSON lines.
+    # Returns the exit status.
+    message = {"cmd": cmd}
+    if cmd == "marker" and params:
+        message["label"] = " ".join(params)
+    elif cmd == "set":
+        settings = {}
+        for param in params:
+            key, sep, value = param.partition("=")
+            if not sep:
+                print(f"Error: expected KEY=VALUE, got {param!r}")
+                return 2
+            settings[key] = parse_value(value)
+        message["settings"] = settings
+        message["save"] = save
+    elif cmd == "stats":
+        message["interval"] = interval
+    try:
+        if cmd == "stats":
+            for reply in stream(message, path):
+                print(json.dumps(reply), flush=True)
+            return 0
+        reply = request(message, path)
+    except OSError as e:
+        print(f"Error: no daemon on {path or default_socket_path()}: {e}")
+        return 1
+    print(json.dumps(reply))
+    return 0 if reply.get("ok") else 1
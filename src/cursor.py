@@ -0,0 +1,125 @@
+import os
+import json
+import bisect
+import numpy as np
+import cv2
+
+# How a cursor is recorded when show_cursor is on:
+# overlay  -> drawn into every frame before change detection
+# metadata -> positions are logged to a sidecar and drawn at export time;
+#             frames stay cursor-free, so pointer motion alone saves nothing
+CURSOR_MODES = ("overlay", "metadata")
+
+# Cursor sidecar, one JSON value per line: a {"style", "size"} object whenever
+# the style changes, then [t_ns, x, y] each time the pointer position changes
+CURSOR_NAME = "cursor.jsonl"
+
+
+def draw_cursor(image, x, y, style="dot", size=10):
+    cx, cy = int(x), int(y)
+    radius = size
+    color = (0, 255, 255, 255) # Yellow/Cyan (BGR + opaque alpha)
+    thickness = 2
+
+    if style == "dot":
+        cv2.circle(image, (cx, cy), radius, color, -1)
+
+    elif style == "target":
+        # Circle
+        cv2.circle(image, (cx, cy), radius, color, thickness)
+        # Crosshair
+        cv2.line(image, (cx - radius - 5, cy), (cx + radius + 5, cy), color, thickness)
+        cv2.line(image, (cx, cy - radius - 5), (cx, cy + radius + 5), color, thickness)
+
+    elif style == "pointer":
+        # Simple Triangle
+        pts = np.array([
+            [cx, cy],
+            [cx, cy + int(radius * 1.5)],
+            [cx + int(radius * 1.2), cy + int(radius * 1.2)]
+        ], np.int32)
+        pts = pts.reshape((-1, 1, 2))
+        cv2.fillPoly(image, [pts], color)
+
+
+class CursorLog:
+    # Appends to a session's cursor sidecar from the capture thread. Only
+    # changes are written, so a still pointer costs nothing per tick.
+    def __init__(self, session_dir):
+        self._file = open(os.path.join(session_dir, CURSOR_NAME), "a")
+        self._style = None
+        self._position = None
+
+    def log(self, t_ns, x, y, style, size):
+        if (style, size) != self._style:
+            self._style = (style, size)
+            self._file.write(json.dumps({"style": style, "size": size}) + "\n")
+            self._position = None # a style applies from the position written after it
+        position = (int(x), int(y))
+        if position != self._position:
+            self._position = position
+            self._file.write(f"[{t_ns},{position[0]},{position[1]}]\n")
+
+    def close(self):
+        self._file.close()
+
+
+class CursorTrack:
+    # A cursor sidecar loaded for export: where the pointer was, and how it
+    # was drawn, at any session time. style/size override the recorded ones.
+    def __init__(self, session_dir, style=None, size=None):
+        self._times = []
+        self._points = []
+        self._styles = [] # (t_ns, style, size) from each style record on
+        pending = None
+        with open(os.path.join(session_dir, CURSOR_NAME)) as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                record = json.loads(line)
+                if isinstance(record, dict):
+                    pending = (record.get("style", "dot"), record.get("size", 10))
+                    continue
+                t_ns, x, y = record
+                if pending is not None:
+                    self._styles.append((t_ns, pending[0], pending[1]))
+                    pending = None
+                self._times.append(t_ns)
+                self._points.append((x, y))
+        self.style = style
+        self.size = size
+
+    @staticmethod
+    def exists(session_dir):
+        return os.path.exists(os.path.join(session_dir, CURSOR_NAME))
+
+    def __len__(self):
+        return len(self._times)
+
+    def at(self, t_ns):
+        # (x, y, style, size) of the last record at or before t_ns, or None
+        # before the first one
+        i = bisect.bisect_right(self._times, t_ns) - 1
+        if i < 0:
+            return None
+        x, y = self._points[i]
+        style, size = "dot", 10
+        for start, recorded_style, recorded_size in self._styles:
+            if start > t_ns:
+                break
+            style, size = recorded_style, recorded_size
+        return x, y, self.style or style, self.size or size
+
+    def draw(self, image, t_ns, origin=(0, 0)):
+        # Draws onto a copy, since the image may be shared with later frames.
+        # origin: where the image sits in the recorded area (an export crop)
+        if t_ns is None:
+            return image
+        cursor = self.at(t_ns)
+        if cursor is None:
+            return image
+        x, y, style, size = cursor
+        image = image.copy()
+        draw_cursor(image, x - origin[0], y - origin[1], style, size)
+        return image
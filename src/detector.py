@@ -0,0 +1,199 @@
+import numpy as np
+import cv2
+from tiles import TileGrid, to_gray
+
+
+class ChangeDetector:
+    # Two-level change detection:
+    # 1. Proxy: a strided 1/scale luma sample of each frame is diffed against
+    #    the proxy of the reference frame. This touches a tiny fraction of the
+    #    frame and flags the tiles that might have changed.
+    # 2. Confirmation: only flagged tiles are diffed at full resolution, and
+    #    the exact full-res TileGrid score decides whether to save.
+    # A scale of 1 disables the proxy and scores every tile at full resolution.
+    #
+    # A clean proxy is trusted on its own (the fast path), except that every
+    # safety_interval-th clean tick runs the full scorer anyway, to catch
+    # changes that fall between lattice points. Those checks are counted on
+    # `stats`, along with the misses they find.
+    #
+    # Ignore areas and per-tile thresholds are folded into the grid (and the
+    # proxy lattice) when it is built, not applied to each frame.
+    #
+    # Proxies live in buffers preallocated per frame shape: one for the
+    # reference, one for the latest frame, swapped when that frame becomes the
+    # reference, so steady-state ticks allocate nothing frame-sized.
+    def __init__(self, proxy_scale=4, safety_interval=30, stats=None):
+        self.proxy_scale = proxy_scale
+        self.safety_interval = safety_interval # 0 = never
+        self.stats = stats
+        self._clean_ticks = 0
+        self._ignore = ()
+        self._tile_thresholds = ()
+        self._proxy_ignore = []
+        self.tile_cols = None
+        self.tile_rows = None
+        self.grid = None
+        self._shape = None
+        self._effective_scale = 1
+        self.reference = None
+        self._reference_valid = False # _reference_proxy holds the reference's proxy
+        self._reference_proxy = None
+        self._last_proxy = None
+        self._last_frame = None       # the frame whose proxy is in _last_proxy
+        self._sample = None
+        self._proxy_diff = None
+
+    def reset(self):
+        self.reference = None
+        self._reference_valid = False
+        self._last_frame = None
+
+    def configure(self, tile_cols, tile_rows=None, proxy_scale=None, safety_interval=None,
+                  ignore=None, tile_thresholds=None):
+        # ignore: (x, y, w, h) areas of the frame whose changes never count.
+        # tile_thresholds: {(row, col): threshold} overrides for single tiles.
+        if safety_interval is not None:
+            self.safety_interval = safety_interval
+        ignore = tuple(tuple(area) for area in ignore or ())
+        tile_thresholds = tuple(sorted((tile_thresholds or {}).items()))
+        if ignore != self._ignore or tile_thresholds != self._tile_thresholds:
+            self._ignore = ignore
+            self._tile_thresholds = tile_thresholds
+            self._shape = None
+        if proxy_scale is not None and proxy_scale != self.proxy_scale:
+            self.proxy_scale = proxy_scale
+            self._shape = None
+        if tile_cols != self.tile_cols or tile_rows != self.tile_rows:
+            self.tile_cols = tile_cols
+            self.tile_rows = tile_rows
+            self._shape = None
+
+    def set_reference(self, frame, copy_of=None):
+        # The reference is the last saved frame; changes are measured against it.
+        # copy_of: the frame just checked, when `frame` is a copy of it, so
+        # its proxy can still be reused
+        self.reference = frame
+        if (frame if copy_of is None else copy_of) is self._last_frame:
+            self._reference_proxy, self._last_proxy = self._last_proxy, self._reference_proxy
+            self._reference_valid = True
+        else:
+            self._reference_valid = False
+        self._last_frame = None
+
+    def last_proxy(self):
+        # Luma proxy of the frame checked last, while it is still the current
+        # one; None when the proxy is off or nothing was checked this tick
+        if self._last_frame is None or self._effective_scale <= 1:
+            return None
+        return self._last_proxy
+
+    def reference_proxy(self):
+        if not self._reference_valid or self._effective_scale <= 1:
+            return None
+        return self._reference_proxy
+
+    def release(self, frame):
+        # The caller is about to refill this frame's buffer with a new frame
+        if frame is self._last_frame:
+            self._last_frame = None
+
+    def is_changed(self, frame, sensitivity, threshold):
+        if self.reference is None:
+            return True
+        if self._shape != frame.shape:
+            self._build_grid(frame.shape)
+
+        if self._effective_scale <= 1:
+            tiles = None
+        else:
+            proxy = self._proxy(frame, self._last_proxy)
+            self._last_frame = frame
+            if not self._reference_valid:
+                self._proxy(self.reference, self._reference_proxy)
+                self._reference_valid = True
+            tiles = self._flagged_tiles(proxy)
+            if tiles:
+                # The safety check counts clean ticks in a row
+                self._clean_ticks = 0
+
+            if sensitivity == 100:
+                # Single-pixel mode must stay exact: a clean proxy only means the
+                # sampled lattice is unchanged. NORM_INF compares in place without
+                # allocating a diff, so an idle screen still costs a single pass.
+                if tiles and self._score(frame, sensitivity, threshold, tiles):
+                    return True
+                if cv2.norm(frame, self.reference, cv2.NORM_INF) == 0:
+                    return False
+                tiles = None
+            elif not tiles:
+                return self._clean_lattice(frame, sensitivity, threshold)
+
+        # Per-tile confirmation pays off while few tiles are flagged; past that a
+        # banded full-frame pass is cheaper than many small ones.
+        if tiles is not None and len(tiles) * 4 > self.grid.tile_count:
+            tiles = None
+        return self._score(frame, sensitivity, threshold, tiles)
+
+    def _clean_lattice(self, frame, sensitivity, threshold):
+        self._clean_ticks += 1
+        if not self.safety_interval or self._clean_ticks < self.safety_interval:
+            self._count("prefiltered")
+            return False
+        self._clean_ticks = 0
+        self._count("safety_checks")
+        if self._score(frame, sensitivity, threshold):
+            self._count("prefilter_misses")
+            return True
+        return False
+
+    def _count(self, counter):
+        if self.stats is not None:
+            self.stats.count(counter)
+
+    def _build_grid(self, shape):
+        h, w = shape[:2]
+        self.grid = TileGrid(w, h, self.tile_cols, self.tile_rows)
+        self.grid.set_masks(self._ignore, dict(self._tile_thresholds))
+        # Every tile needs at least one proxy sample in each direction
+        tw, th = self.grid.tile_size()
+        self._effective_scale = max(1, min(int(self.proxy_scale), tw, th))
+        s = self._effective_scale
+        # Map tile edges onto the proxy lattice (sample i covers full-res row i*s)
+        self._proxy_row_starts = [-(-e // s) for e in self.grid.row_edges[:-1]]
+        self._proxy_col_starts = [-(-e // s) for e in self.grid.col_edges[:-1]]
+        self._shape = shape
+        self._reference_valid = False
+        self._last_frame = None
+        # Ignore areas on the lattice: the samples inside them never flag a tile
+        self._proxy_ignore = [(-(-y0 // s), -(-y1 // s), -(-x0 // s), -(-x1 // s))
+                              for x0, y0, x1, y1 in self.grid.ignore_pieces()]
+        if s > 1:
+            sample_shape = (-(-h // s), -(-w // s)) + tuple(shape[2:])
+            self._sample = np.empty(sample_shape, dtype=np.uint8)
+            self._reference_proxy = np.empty(sample_shape[:2], dtype=np.uint8)
+            self._last_proxy = np.empty(sample_shape[:2], dtype=np.uint8)
+            self._proxy_diff = np.empty(sample_shape[:2], dtype=np.uint8)
+
+    def _proxy(self, frame, out):
+        s = self._effective_scale
+        np.copyto(self._sample, frame[::s, ::s])
+        return to_gray(self._sample, dst=out)
+
+    def _flagged_tiles(self, proxy):
+        proxy_diff = cv2.absdiff(self._reference_proxy, proxy, dst=self._proxy_diff)
+        for y0, y1, x0, x1 in self._proxy_ignore:
+            proxy_diff[y0:y1, x0:x1] = 0
+        if not proxy_diff.any():
+            return []
+        tile_max = np.maximum.reduceat(
+            np.maximum.reduceat(proxy_diff, self._proxy_row_starts, axis=0),
+            self._proxy_col_starts, axis=1)
+        rows, cols = np.nonzero(tile_max)
+        return list(zip(rows.tolist(), cols.tolist()))
+
+    def _score(self, frame, sensitivity, threshold, tiles=None):
+        if sensitivity == 100:
+            # Captures single pixel changes regardless of tile size
+            return self.grid.exceeds(self.reference, frame, 0, reduction="max", tiles=tiles)
+        return self.grid.exceeds(self.reference, frame, threshold, reduction="mean", tiles=tiles)
@@ -0,0 +1,116 @@
+import io
+import cv2
+
+# Frame encoder backends. Every encoder takes a BGR or raw BGRA frame plus
+# the 1-100 quality setting and returns the encoded bytes (None on failure);
+# backends without a quality knob ignore it.
+ENCODERS = ("jpeg", "jpeg-pil", "webp", "webp-lossless", "png")
+
+JPEG_SUBSAMPLING = ("444", "422", "420")
+
+
+def _to_bgr(frame):
+    if frame.ndim == 3 and frame.shape[2] == 4:
+        return cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
+    return frame
+
+
+def _to_rgb(frame):
+    if frame.ndim == 3 and frame.shape[2] == 4:
+        return cv2.cvtColor(frame, cv2.COLOR_BGRA2RGB)
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+
+class OpenCVJpegEncoder:
+    # libjpeg(-turbo) through OpenCV, the historical default
+    name = "jpeg"
+    extension = ".jpg"
+
+    def __init__(self, subsampling="420", optimize=False, progressive=False):
+        self.params = []
+        # The sampling factor flag only exists in OpenCV 4.5.5+
+        factor = getattr(cv2, f"IMWRITE_JPEG_SAMPLING_FACTOR_{subsampling}", None)
+        if factor is not None and hasattr(cv2, "IMWRITE_JPEG_SAMPLING_FACTOR"):
+            self.params += [cv2.IMWRITE_JPEG_SAMPLING_FACTOR, factor]
+        if optimize:
+            self.params += [cv2.IMWRITE_JPEG_OPTIMIZE, 1]
+        if progressive:
+            self.params += [cv2.IMWRITE_JPEG_PROGRESSIVE, 1]
+
+    def encode(self, frame, quality):
+        ok, buf = cv2.imencode(".jpg", _to_bgr(frame), [cv2.IMWRITE_JPEG_QUALITY, quality] + self.params)
+        return buf if ok else None
+
+
+class PillowJpegEncoder:
+    name = "jpeg-pil"
+    extension = ".jpg"
+
+    def __init__(self, subsampling="420", optimize=False, progressive=False):
+        from PIL import Image # only this backend needs Pillow
+        self._image = Image
+        # Pillow numbers subsampling 0 = 4:4:4, 1 = 4:2:2, 2 = 4:2:0
+        self.subsampling = JPEG_SUBSAMPLING.index(subsampling) if subsampling in JPEG_SUBSAMPLING else 2
+        self.optimize = optimize
+        self.progressive = progressive
+
+    def encode(self, frame, quality):
+        out = io.BytesIO()
+        self._image.fromarray(_to_rgb(frame)).save(
+            out, "JPEG", quality=quality, subsampling=self.subsampling,
+            optimize=self.optimize, progressive=self.progressive)
+        return out.getvalue()
+
+
+class WebPEncoder:
+    extension = ".webp"
+
+    def __init__(self, lossless=False):
+        self.lossless = lossless
+        self.name = "webp-lossless" if lossless else "webp"
+
+    def encode(self, frame, quality):
+        if self.lossless:
+            # Quality 101+ switches OpenCV's WebP encoder to lossless
+            params = [cv2.IMWRITE_WEBP_QUALITY, 101]
+        else:
+            params = [cv2.IMWRITE_WEBP_QUALITY, max(1, quality)]
+        ok, buf = cv2.imencode(".webp", _to_bgr(frame), params)
+        return buf if ok else None
+
+
+class PngEncoder:
+    # Lossless, tuned for speed: low zlib level, and the RLE strategy suits
+    # the large flat areas of desktop content
+    name = "png"
+    extension = ".png"
+
+    def __init__(self, level=1):
+        self.params = [cv2.IMWRITE_PNG_COMPRESSION, level,
+                       cv2.IMWRITE_PNG_STRATEGY, cv2.IMWRITE_PNG_STRATEGY_RLE]
+
+    def encode(self, frame, quality):
+        ok, buf = cv2.imencode(".png", _to_bgr(frame), self.params)
+        return buf if ok else None
+
+
+def get_encoder(name="jpeg", subsampling="420", optimize=False, progressive=False):
+    if name == "jpeg-pil":
+        return PillowJpegEncoder(subsampling, optimize, progressive)
+    if name == "webp":
+        return WebPEncoder()
+    if name == "webp-lossless":
+        return WebPEncoder(lossless=True)
+    if name == "png":
+        return PngEncoder()
+    return OpenCVJpegEncoder(subsampling, optimize, progressive)
+
+
+def payload_extension(payload):
+    # File extension for an encoded payload, from its magic bytes
+    head = bytes(payload[:12])
+    if head.startswith(b"\x89PNG"):
+        return ".png"
+    if head.startswith(b"RIFF") and head[8:12] == b"WEBP":
+        return ".webp"
+    return ".jpg"
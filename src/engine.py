@@ -0,0 +1,318 @@
+import time
+import queue
+import signal
+import threading
+import numpy as np
+import cv2
+from dedup import DUPLICATE_PREVIOUS, frame_key
+from preroll import EncodedFrame
+
+# Where the capture loop runs:
+# thread  -> a thread of the recording process (default)
+# process -> a separate worker process, so the GUI mainloop and the input
+#            listeners can't take the GIL away from capture and detection
+ENGINES = ("thread", "process")
+
+# Frames in flight between the worker and the writer. When every slot is
+# taken the worker blocks, the same backpressure the writer queue applies.
+RING_SLOTS = 4
+
+# How often the worker ships stage timings and pacing counters
+STATS_INTERVAL_S = 0.2
+
+
+class FrameRing:
+    # Fixed-size frame slots in one shared memory block
+    def __init__(self, slots, slot_bytes, name=None):
+        # Imported here, like multiprocessing below: only the process engine
+        # needs them, and the thread engine shouldn't pay for the import
+        from multiprocessing import shared_memory
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=slots * slot_bytes)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def view(self, slot, shape):
+        return np.ndarray(shape, dtype=np.uint8, buffer=self.shm.buf, offset=slot * self.slot_bytes)
+
+    def close(self, unlink=False):
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+class StatsForwarder:
+    # Stands in for PipelineStats in the worker: samples and counters are
+    # batched and replayed into the recorder's PipelineStats on the other side
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._adds = []
+        self._counts = []
+
+    def add(self, stage, ns):
+        if self.enabled:
+            self._adds.append((stage, ns))
+
+    def count(self, counter, reason=None):
+        if self.enabled:
+            self._counts.append((counter, reason))
+
+    def take(self):
+        # List swaps are atomic, so the capture thread never waits on this
+        adds, self._adds = self._adds, []
+        counts, self._counts = self._counts, []
+        return adds, counts
+
+
+def replay_stats(stats, adds, counts):
+    for stage, ns in adds:
+        stats.add(stage, ns)
+    for counter, reason in counts:
+        stats.count(counter, reason)
+
+
+class SchedulerSnapshot:
+    # The worker's pacing counters as last reported, with the attributes the
+    # recorder reads from a FrameScheduler
+    def __init__(self, fps, min_fps=None):
+        self.fps = fps
+        self.min_fps = min_fps
+        self.rate = fps
+        self.ticks = 0
+        self.late = 0
+        self.dropped = 0
+        self._effective_fps = 0.0
+        # Replaced by the worker's own start with its first report; the
+        # monotonic clock is shared between processes
+        self.start_ns = time.monotonic_ns()
+
+    def update(self, values):
+        (self.ticks, self.late, self.dropped, self.fps, self.min_fps, self.rate, self._effective_fps,
+         start_ns) = values
+        if start_ns is not None:
+            self.start_ns = start_ns
+
+    def elapsed_ns(self, timestamp_ns=None):
+        if timestamp_ns is None:
+            timestamp_ns = time.monotonic_ns()
+        return timestamp_ns - self.start_ns
+
+    def effective_fps(self):
+        return self._effective_fps
+
+
+class RingWriter:
+    # Stands in for FrameWriter in the worker: saved frames are copied into a
+    # free ring slot and announced over the pipe; the real writer runs in the
+    # recording process. Repeats of the previous frame are detected here
+    # (that needs the pixels); the hash index lookup happens on the other side.
+    def __init__(self, ring, send, dedup):
+        self.ring = ring
+        self._send = send
+        self.dedup = dedup
+        self.free = queue.Queue()
+        for slot in range(ring.slots):
+            self.free.put(slot)
+        self._last = None
+        self.hash_ns = 0
+        self.queue_depth = 0
+        self.dropped = 0
+
+    def find_duplicate(self, frame):
+        if not self.dedup:
+            return None, None
+        start = time.perf_counter_ns()
+        try:
+            last = self._last
+            if last is not None and last.shape == frame.shape and cv2.norm(last, frame, cv2.NORM_INF) == 0:
+                return DUPLICATE_PREVIOUS, None
+            return None, frame_key(frame)
+        finally:
+            self.hash_ns += time.perf_counter_ns() - start
+
+    def submit(self, frame, quality, meta=None, content_key=None, duplicate_of=None):
+        if isinstance(frame, EncodedFrame):
+            # Pre-roll: the JPEG bytes go over the pipe, no ring slot needed
+            self._send(("preroll", frame.payload, frame.size, frame.channels, quality, meta))
+            self._last = None
+            return
+        if frame.nbytes > self.ring.slot_bytes:
+            print(f"Error: frame of {frame.shape} doesn't fit the frame ring")
+            return
+        slot = self.free.get()
+        self.queue_depth = self.ring.slots - self.free.qsize()
+        self.ring.view(slot, frame.shape)[...] = frame
+        self._send(("frame", slot, frame.shape, quality, meta, content_key, duplicate_of))
+        self._last = frame
+
+
+def _worker_main(conn, ring_name, slots, slot_bytes, settings, source, output_dir, session_dir):
+    # Entry point of the worker process: the recorder's own capture loop,
+    # with the ring standing in for the writer
+    signal.signal(signal.SIGINT, signal.SIG_IGN) # the recording process decides when to stop
+    from recorder import ScreenRecorder
+
+    ring = FrameRing(slots, slot_bytes, ring_name)
+    send_lock = threading.Lock()
+
+    def send(message):
+        with send_lock:
+            conn.send(message)
+
+    recorder = ScreenRecorder(output_dir, source)
+    recorder.apply_settings(settings)
+    recorder.current_session_dir = session_dir # for sidecars the capture loop writes itself
+    recorder.running = True
+    recorder.stats = StatsForwarder(recorder.collect_stats)
+    recorder.writer = RingWriter(ring, send, recorder.dedup)
+    recorder.scheduler = recorder._make_scheduler()
+
+    loop = threading.Thread(target=recorder._record_loop, name="gsr-capture")
+    loop.start()
+    if source.interactive:
+        recorder._start_input_listeners()
+
+    def ship_stats():
+        scheduler = recorder.scheduler
+        adds, counts = recorder.stats.take()
+        send(("stats", adds, counts, recorder.writer.hash_ns,
+              (scheduler.ticks, scheduler.late, scheduler.dropped, scheduler.fps,
+               scheduler.min_fps, scheduler.rate, scheduler.effective_fps(), scheduler.start_ns)))
+
+    try:
+        next_stats = time.monotonic() + STATS_INTERVAL_S
+        while loop.is_alive():
+            if conn.poll(0.05):
+                message = conn.recv()
+                kind = message[0]
+                if kind == "release":
+                    recorder.writer.free.put(message[1])
+                elif kind == "settings":
+                    recorder.apply_settings(message[1])
+                elif kind == "pause":
+                    recorder.paused = message[1]
+                elif kind == "stop":
+                    recorder.running = False
+            if time.monotonic() >= next_stats:
+                ship_stats()
+                next_stats = time.monotonic() + STATS_INTERVAL_S
+        loop.join()
+    except (EOFError, OSError):
+        # The recording process went away
+        recorder.running = False
+        loop.join()
+        return
+    finally:
+        for listener in (recorder.key_listener, recorder.mouse_listener):
+            if listener:
+                listener.stop()
+    ship_stats()
+    send(("done",))
+    ring.close()
+
+
+class ProcessEngine:
+    # Runs the capture loop of `recorder` in a worker process. Saved frames
+    # come back through a shared memory ring and are handed to the recorder's
+    # FrameWriter by a pump thread, which also keeps the worker's settings in
+    # step with the recorder's (GUI sliders keep working mid-session) and
+    # replays the worker's stage timings into recorder.stats.
+    def __init__(self, recorder, slots=RING_SLOTS):
+        self.recorder = recorder
+        self.slots = slots
+        self.ring = None
+        self.process = None
+        self.scheduler = SchedulerSnapshot(recorder.fps, recorder.min_fps if recorder.adaptive_fps else None)
+        self._conn = None
+        self._pump = None
+        self._send_lock = threading.Lock()
+        self._sent_settings = None
+
+    def start(self):
+        recorder = self.recorder
+        w, h = recorder.get_screen_resolution()
+        self.ring = FrameRing(self.slots, w * h * 4)
+        import multiprocessing
+        ctx = multiprocessing.get_context("spawn") # never fork the GUI and listener threads
+        self._conn, child_conn = ctx.Pipe()
+        self._sent_settings = recorder.settings
+        self.process = ctx.Process(
+            target=_worker_main, name="gsr-engine", daemon=True,
+            args=(child_conn, self.ring.name, self.slots, self.ring.slot_bytes,
+                  self._sent_settings.as_dict(), recorder.source, recorder.output_dir, recorder.current_session_dir))
+        self.process.start()
+        child_conn.close()
+        self._pump = threading.Thread(target=self._pump_loop, name="gsr-engine-pump", daemon=True)
+        self._pump.start()
+
+    def _send(self, message):
+        with self._send_lock:
+            try:
+                self._conn.send(message)
+            except (OSError, ValueError):
+                pass # worker already gone
+
+    def set_paused(self, paused):
+        self._send(("pause", paused))
+
+    def stop(self):
+        self._send(("stop",))
+        if self._pump is not None:
+            self._pump.join()
+            self._pump = None
+        if self.process is not None:
+            self.process.join(timeout=5)
+            if self.process.is_alive():
+                self.process.terminate()
+            self.process = None
+        self._conn.close()
+        self.ring.close(unlink=True)
+
+    def _pump_loop(self):
+        recorder = self.recorder
+        writer = recorder.writer
+        try:
+            while True:
+                # Every setter swaps in a new snapshot, so an identity check
+                # is enough to tell that something changed
+                settings = recorder.settings
+                if settings is not self._sent_settings:
+                    self._sent_settings = settings
+                    self._send(("settings", settings.as_dict()))
+                if not self._conn.poll(0.05):
+                    if not self.process.is_alive():
+                        print("Error: capture engine exited unexpectedly")
+                        break
+                    continue
+                message = self._conn.recv()
+                kind = message[0]
+                if kind == "frame":
+                    _, slot, shape, quality, meta, content_key, duplicate_of = message
+                    # Copied out so the slot goes straight back to the worker;
+                    # the writer keeps frames until they are encoded
+                    frame = self.ring.view(slot, shape).copy()
+                    self._send(("release", slot))
+                    if duplicate_of is None and content_key is not None and writer.hashes is not None:
+                        duplicate_of = writer.hashes.get(content_key)
+                    writer.submit(frame, quality, meta, content_key, duplicate_of)
+                elif kind == "preroll":
+                    _, payload, size, channels, quality, meta = message
+                    writer.submit(EncodedFrame(payload, size, channels), quality, meta)
+                elif kind == "stats":
+                    _, adds, counts, hash_ns, pacing = message
+                    if recorder.stats is not None:
+                        replay_stats(recorder.stats, adds, counts)
+                    writer.hash_ns = hash_ns
+                    self.scheduler.update(pacing)
+                elif kind == "done":
+                    break
+        except (EOFError, OSError) as e:
+            print(f"Error in capture engine: {e}")
+        # Source finished (or the worker died): the session is over
+        recorder.running = False
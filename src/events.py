@@ -0,0 +1,44 @@
+import time
+import collections
+
+# Input events pushed by the pynput callbacks. Only the kind, time and pointer
+# position are kept: which key was pressed is never recorded.
+EVENT_KINDS = ("key", "click", "scroll", "move")
+
+
+class InputEvents:
+    # Timestamped input events from the listener threads to the capture
+    # thread. deque append and popleft are atomic, so the listeners never
+    # block on the capture loop and no event is lost between a check and a
+    # clear. Bounded, so a stalled loop drops the oldest events instead of
+    # growing without limit.
+    def __init__(self, capacity=4096):
+        self._events = collections.deque(maxlen=max(1, int(capacity)))
+
+    def push(self, kind, x=None, y=None):
+        self._events.append((time.monotonic_ns(), kind, x, y))
+
+    def drain(self):
+        # Everything pushed since the last drain, oldest first
+        events = []
+        popleft = self._events.popleft
+        while True:
+            try:
+                events.append(popleft())
+            except IndexError:
+                return events
+
+    def clear(self):
+        self._events.clear()
+
+
+def coalesce_moves(events):
+    # Runs of pointer moves collapse into their last position; everything
+    # else is kept as is
+    result = []
+    for event in events:
+        if event[1] == "move" and result and result[-1][1] == "move":
+            result[-1] = event
+        else:
+            result.append(event)
+    return result
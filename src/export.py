@@ -0,0 +1,276 @@
+import os
+import json
+import glob
+import cv2
+from container import ContainerReader, KIND_REF, is_container
+from writer import SIDECAR_NAME
+from encoders import payload_extension
+from cursor import CursorTrack
+
+# Container codec per video file extension; anything else gets mp4v
+VIDEO_CODECS = {".mp4": "mp4v", ".avi": "MJPG", ".mkv": "XVID"}
+
+CONCAT_NAME = "frames.ffconcat"
+
+
+def parse_region(text):
+    x, y, w, h = (int(v) for v in text.split(","))
+    return x, y, w, h
+
+
+def load_cursor(session_dir, enabled=None, style=None, size=None):
+    # The session's cursor log for compositing: used when present unless
+    # enabled is False; style and size override the recorded ones
+    if enabled is False:
+        return None
+    if not CursorTrack.exists(session_dir):
+        if enabled:
+            print(f"No cursor log in {session_dir}")
+        return None
+    try:
+        return CursorTrack(session_dir, style, size)
+    except Exception as e:
+        print(f"Error reading cursor log: {e}")
+        return None
+
+
+def _region_origin(region):
+    return (0, 0) if region is None else region[:2]
+
+
+def _name_width(frame_count):
+    # Keep names sortable past 99,999 frames
+    return max(5, len(str(max(0, frame_count - 1))))
+
+
+def _copies_payloads(reader, region, cursor=None):
+    return region is None and cursor is None and not reader.has_deltas()
+
+
+def export_sequence(session_dir, out_dir=None, region=None, quality=95, cursor=None):
+    # Expand a container session back into the numbered JPEG sequence NLEs
+    # expect. With a cursor track, JPEG sessions are re-rendered too.
+    if not is_container(session_dir):
+        if cursor is None:
+            print(f"Not a container session: {session_dir}")
+            return 0
+        return _render_sequence(session_dir, out_dir, region, quality, cursor)
+
+    out_dir = out_dir or session_dir
+    os.makedirs(out_dir, exist_ok=True)
+
+    count = 0
+    origin = _region_origin(region)
+    with ContainerReader(session_dir) as reader:
+        width = _name_width(reader.frame_count)
+
+        if _copies_payloads(reader, region, cursor):
+            # Every record is a complete encoded frame: copy payloads straight out
+            for entry in reader.entries():
+                # A reference gets its own file, holding the frame it repeats
+                source = reader.frame_entries(entry.offset)[0] if entry.kind == KIND_REF else entry
+                name = f"frame_{entry.frame:0{width}d}{payload_extension(reader.payload(source))}"
+                with open(os.path.join(out_dir, name), "wb") as f:
+                    f.write(reader.payload(source))
+                count += 1
+        else:
+            # Tile deltas (or a crop, or a cursor) need the frames rebuilt and re-encoded
+            for entries, image in reader.frames(region):
+                if image is None:
+                    continue
+                if cursor is not None:
+                    image = cursor.draw(image, entries[0].t_ns, origin)
+                name = f"frame_{entries[0].frame:0{width}d}.jpg"
+                ok, buf = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+                if ok:
+                    with open(os.path.join(out_dir, name), "wb") as f:
+                        f.write(buf)
+                    count += 1
+
+    print(f"Exported {count} frames to {out_dir}")
+    return count
+
+
+def _render_sequence(session_dir, out_dir, region, quality, cursor):
+    # A JPEG session with the cursor drawn in, as a new numbered sequence
+    if not out_dir or os.path.abspath(out_dir) == os.path.abspath(session_dir):
+        print("Drawing the cursor into a JPEG session needs a separate -o directory")
+        return 0
+    os.makedirs(out_dir, exist_ok=True)
+    origin = _region_origin(region)
+    count = 0
+    for t_ns, _, image in session_frames(session_dir, region):
+        image = cursor.draw(image, t_ns, origin)
+        ok, buf = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        if ok:
+            with open(os.path.join(out_dir, f"frame_{count:05d}.jpg"), "wb") as f:
+                f.write(buf)
+            count += 1
+    print(f"Exported {count} frames to {out_dir}")
+    return count
+
+
+def _sidecar_records(session_dir):
+    # Streams the per-frame sidecar; sessions recorded before it existed fall
+    # back to the frame files in name order, without timestamps
+    path = os.path.join(session_dir, SIDECAR_NAME)
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+    else:
+        for name in sorted(glob.glob(os.path.join(session_dir, "frame_*.*"))):
+            yield {"file": os.path.basename(name)}
+
+
+def _container_records(session_dir, region=None, cursor=None):
+    # Same shape as the sidecar records, named the way export_sequence names them
+    with ContainerReader(session_dir) as reader:
+        width = _name_width(reader.frame_count)
+        copies = _copies_payloads(reader, region, cursor)
+        for n in range(reader.frame_count):
+            entry = reader.frame_entries(n)[0]
+            extension = ".jpg"
+            if copies:
+                source = reader.frame_entries(entry.offset)[0] if entry.kind == KIND_REF else entry
+                extension = payload_extension(reader.payload(source))
+            yield {"file": f"frame_{n:0{width}d}{extension}", "t_ns": entry.t_ns}
+
+
+def session_frames(session_dir, region=None):
+    # Yields (t_ns, next_t_ns, image) one frame at a time. Only the next
+    # frame's timestamp is looked up ahead, never its pixels, so memory use
+    # doesn't grow with the session. Timestamps are None when unknown.
+    if is_container(session_dir):
+        with ContainerReader(session_dir) as reader:
+            total = reader.frame_count
+            for entries, image in reader.frames(region):
+                n = entries[0].frame
+                t_next = reader.frame_entries(n + 1)[0].t_ns if n + 1 < total else None
+                if image is not None:
+                    yield entries[0].t_ns, t_next, image
+        return
+
+    records = _sidecar_records(session_dir)
+    current = next(records, None)
+    while current is not None:
+        following = next(records, None)
+        image = cv2.imread(os.path.join(session_dir, current["file"]))
+        if image is not None:
+            if region is not None:
+                x, y, w, h = region
+                image = image[y:y + h, x:x + w]
+            yield current.get("t_ns"), following.get("t_ns") if following else None, image
+        current = following
+
+
+def _hold_ns(t_ns, next_t_ns, default_ns, max_hold_ns):
+    # How long a frame stays on screen: until the next capture, capped so an
+    # idle stretch doesn't turn into minutes of a frozen frame
+    if t_ns is None or next_t_ns is None:
+        return default_ns
+    return max(0, min(next_t_ns - t_ns, max_hold_ns))
+
+
+def export_video(session_dir, out_path=None, fps=30, max_hold=2.0, region=None, cursor=None):
+    # Streams a session into a constant-rate video file, repeating each saved
+    # frame for as long as it was on screen. Frames that fall between two
+    # output ticks are merged into the earlier tick. A cursor track is drawn
+    # per output tick, so the pointer moves even while the frame is held.
+    out_path = out_path or os.path.join(session_dir, "session.mp4")
+    interval_ns = int(1_000_000_000 / max(1, fps))
+    max_hold_ns = int(max_hold * 1_000_000_000)
+    fourcc = cv2.VideoWriter_fourcc(*VIDEO_CODECS.get(os.path.splitext(out_path)[1].lower(), "mp4v"))
+    origin = _region_origin(region)
+
+    video = None
+    size = None
+    clock_ns = 0
+    written = 0
+    frames = 0
+    merged = 0
+    try:
+        for t_ns, next_t_ns, image in session_frames(session_dir, region):
+            if video is None:
+                size = (image.shape[1], image.shape[0])
+                video = cv2.VideoWriter(out_path, fourcc, fps, size)
+                if not video.isOpened():
+                    print(f"Error opening video writer for {out_path}")
+                    return 0
+            if (image.shape[1], image.shape[0]) != size:
+                image = cv2.resize(image, size)
+
+            frames += 1
+            clock_ns += _hold_ns(t_ns, next_t_ns, interval_ns, max_hold_ns)
+            # Output ticks this frame covers on the capped timeline; at least one
+            # for the very first frame so the video never starts empty
+            repeats = max(1 if written == 0 else 0, round(clock_ns / interval_ns) - written)
+            if repeats == 0:
+                merged += 1
+            for k in range(repeats):
+                if cursor is not None and t_ns is not None:
+                    video.write(cursor.draw(image, t_ns + k * interval_ns, origin))
+                else:
+                    video.write(image)
+            written += repeats
+    finally:
+        if video is not None:
+            video.release()
+
+    if video is None:
+        print(f"No frames to export in {session_dir}")
+        return 0
+    print(f"Exported {frames} frames as {written / fps:.1f}s of video to {out_path}"
+          + (f" ({merged} frames merged into the previous tick)" if merged else ""))
+    return frames
+
+
+def export_concat(session_dir, out_path=None, fps=30, max_hold=2.0, region=None, quality=95, cursor=None):
+    # Writes an ffmpeg concat-demuxer file with each frame's real on-screen
+    # duration, for an exact variable-frame-rate encode:
+    #   ffmpeg -f concat -safe 0 -i frames.ffconcat -fps_mode vfr out.mp4
+    # Container sessions are expanded to a JPEG sequence next to it first,
+    # since the demuxer needs one file per frame.
+    if is_container(session_dir):
+        frames_dir = os.path.dirname(os.path.abspath(out_path)) if out_path else session_dir
+        if export_sequence(session_dir, frames_dir, region, quality, cursor) == 0:
+            return 0
+        records = _container_records(session_dir, region, cursor)
+    elif region is not None:
+        print("--region needs --format video for JPEG sessions")
+        return 0
+    elif cursor is not None:
+        print("Drawing the cursor into a JPEG session needs --format video or jpeg (use --no-cursor for timing only)")
+        return 0
+    else:
+        frames_dir = session_dir
+        records = _sidecar_records(session_dir)
+
+    out_path = out_path or os.path.join(frames_dir, CONCAT_NAME)
+    base = os.path.dirname(os.path.abspath(out_path))
+    default_ns = int(1_000_000_000 / max(1, fps))
+    max_hold_ns = int(max_hold * 1_000_000_000)
+
+    count = 0
+    with open(out_path, "w") as f:
+        f.write("ffconcat version 1.0\n")
+        current = next(records, None)
+        last = None
+        while current is not None:
+            following = next(records, None)
+            path = os.path.relpath(os.path.join(frames_dir, current["file"]), base)
+            hold = _hold_ns(current.get("t_ns"), following.get("t_ns") if following else None, default_ns, max_hold_ns)
+            f.write(f"file '{path}'\n")
+            f.write(f"duration {hold / 1e9:.6f}\n")
+            last = path
+            count += 1
+            current = following
+        if last is not None:
+            # The demuxer ignores the duration of the final entry unless the
+            # file is listed once more
+            f.write(f"file '{last}'\n")
+
+    print(f"Wrote timing for {count} frames to {out_path}")
+    return count
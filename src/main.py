@@ -2,19 +2,21 @@
 import signal
 import sys
 import os
-import urllib.request
 import time
 import argparse
-from recorder import ScreenRecorder
+from version import get_version
 
-# GUI imports inside main check to allow faster CLI startup or optional deps
-# content of ui.py will be imported only if needed
+# Only the standard library is imported up front. OpenCV, numpy, mss, PIL and
+# pynput come in with recorder (or ui, export, bench...) on the code path
+# that needs them, so --help, --version and `gsr ctl` start in milliseconds.
+# `gsr bench-startup` checks that this stays true.
 
-try:
-    from importlib.metadata import version
-    __version__ = version("gsr")
-except Exception:
-    __version__ = "1.0.3"
+class VersionAction(argparse.Action):
+    def __init__(self, option_strings, dest=argparse.SUPPRESS, default=argparse.SUPPRESS, help=None):
+        super().__init__(option_strings, dest=dest, default=default, nargs=0, help=help)
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        parser.exit(message=f"{parser.prog} {get_version()}\n")
 
 recorder_instance = None
 app_instance = None
@@ -32,6 +34,7 @@ def signal_handler(sig, frame):
     sys.exit(0)
 
 def setup_desktop_entry():
+    import urllib.request
     icon_url = "https://raw.githubusercontent.com/geraldsnyman/gsr/master/assets/icon.png"
     icon_path = os.path.expanduser("~/.local/share/icons/gsr-icon.png")
     desktop_path = os.path.expanduser("~/.local/share/applications/gsr.desktop")
@@ -62,11 +65,72 @@ StartupWMClass=GSR
     except Exception as e:
         print(f"Failed to create desktop entry: {e}")
 
+def apply_overrides(recorder, args):
+    # The recording options given on the command line, over the saved settings
+    # Apply numerical/string overrides (only if explicitly passed)
+    if args.fps is not None: recorder.set_fps(args.fps)
+    if args.adaptive is not None: recorder.set_adaptive_fps(args.adaptive)
+    if args.min_fps is not None: recorder.set_min_fps(args.min_fps)
+    if args.boost_window is not None: recorder.set_boost_window(args.boost_window)
+    if args.pacing is not None: recorder.set_pacing(args.pacing)
+    if args.engine is not None: recorder.set_engine(args.engine)
+    if args.sens is not None: recorder.set_sensitivity(args.sens)
+    if args.tiles is not None or args.tile_rows is not None:
+        cols = args.tiles if args.tiles is not None else recorder.tile_divisions
+        rows = args.tile_rows if args.tile_rows is not None else recorder.tile_rows
+        recorder.set_tile_divisions(cols, rows)
+    if args.ignore_regions is not None: recorder.set_ignore_regions(args.ignore_regions)
+    if args.tile_sensitivity is not None: recorder.set_tile_sensitivity(args.tile_sensitivity)
+    if args.quality is not None: recorder.set_quality(args.quality)
+    if args.output is not None: recorder.set_output_dir(args.output)
+    if args.regions is not None: recorder.set_regions(args.regions)
+    if args.encoder is not None: recorder.set_encoder(args.encoder)
+    if args.jpeg_subsampling is not None or args.jpeg_optimize is not None or args.jpeg_progressive is not None:
+        recorder.set_jpeg_options(args.jpeg_subsampling, args.jpeg_optimize, args.jpeg_progressive)
+    if args.writers is not None: recorder.set_writer_threads(args.writers)
+    if args.queue_size is not None: recorder.set_queue_size(args.queue_size)
+    if args.backpressure is not None: recorder.set_backpressure(args.backpressure)
+    if args.storage is not None: recorder.set_storage(args.storage)
+    if args.keyframe_interval is not None: recorder.set_keyframe_interval(args.keyframe_interval)
+    if args.delta_tiles is not None: recorder.set_delta_tiles(args.delta_tiles)
+    if args.dedup is not None: recorder.set_dedup(args.dedup)
+    if args.stats is not None: recorder.set_collect_stats(args.stats)
+    if args.zero_copy is not None: recorder.set_zero_copy(args.zero_copy)
+    if args.proxy_scale is not None: recorder.set_proxy_scale(args.proxy_scale)
+    if args.safety_check is not None: recorder.set_safety_check(args.safety_check)
+    
+    # Apply boolean toggles (True/False allowed via --feature and --no-feature)
+    if args.keystroke is not None: recorder.set_capture_on_keystroke(args.keystroke)
+    recorder.set_mouse_triggers(args.mouse_click, args.mouse_move, args.mouse_scroll)
+    if args.burst is not None or args.burst_fps is not None: recorder.set_burst(args.burst, args.burst_fps)
+    if args.preroll is not None or args.preroll_mb is not None or args.preroll_scale is not None:
+        recorder.set_preroll(args.preroll, args.preroll_mb, args.preroll_scale)
+    
+    # Apply Cursor settings
+    recorder.set_cursor(args.show_cursor, args.cursor_style, args.cursor_size)
+    if args.cursor_mode is not None: recorder.set_cursor_mode(args.cursor_mode)
+
+def run_daemon(args):
+    # Keeps one recorder alive and takes commands over the control socket
+    import control
+    from recorder import ScreenRecorder
+    global recorder_instance
+    source = None
+    if args.source is not None:
+        import sources
+        source = sources.make_source(args.source)
+    recorder_instance = ScreenRecorder(source=source)
+    apply_overrides(recorder_instance, args)
+    if args.save:
+        recorder_instance.save_settings()
+        recorder_instance.flush_settings()
+    return control.serve(recorder_instance, args.socket)
+
 def main():
     signal.signal(signal.SIGINT, signal_handler)
 
     parser = argparse.ArgumentParser(prog="gsr", description="Gerald's Screen Recorder (GSR)")
-    parser.add_argument("-v", "--version", action="version", version=f"%(prog)s {__version__}")
+    parser.add_argument("-v", "--version", action=VersionAction, help="show program's version number and exit")
     
     # Core Operations
     parser.add_argument("--setup-desktop", action="store_true", help="Install Linux desktop entry and icon")
@@ -74,21 +138,126 @@ def main():
     
     # Capture Overrides
     parser.add_argument("-f", "--fps", type=int, help="Override FPS (1-60)")
+    parser.add_argument("--source", type=str, metavar="SPEC", help="Frame source: screen[:MONITOR], synthetic[:WxH[:typing,scrolling,video]] or replay:SESSION[:recorded|:max]")
+    parser.add_argument("--adaptive", action=argparse.BooleanOptionalAction, help="Adaptive frame rate: --fps is the maximum, held after changes and input, decaying toward --min-fps while idle")
+    parser.add_argument("--min-fps", type=int, help="Idle frame rate for --adaptive (1-60)")
+    parser.add_argument("--boost-window", type=float, metavar="SECONDS", help="How long --adaptive stays at the maximum rate after a change or input")
+    parser.add_argument("--engine", type=str, choices=["thread", "process"], help="Run capture and detection in a thread of this process or in a separate worker process")
+    parser.add_argument("--pacing", type=str, choices=["skip", "catchup"], help="What to do with frame slots missed when the loop overruns")
     parser.add_argument("-s", "--sens", type=int, help="Override Sensitivity (0-100)")
     parser.add_argument("-t", "--tiles", type=int, help="Override Tile Divisions (1 = Full Screen)")
-    parser.add_argument("-q", "--quality", type=int, help="Override JPEG Output Quality (1-100)")
+    parser.add_argument("--tile-rows", type=int, help="Override Tile Rows for a non-square grid (default: same as --tiles)")
+    parser.add_argument("--ignore", dest="ignore_regions", action="append", metavar="X,Y,W,H", help="Never save because of changes in this screen area (a clock, a spinner); repeat for more, 'none' to clear")
+    parser.add_argument("--tile-sens", dest="tile_sensitivity", action="append", metavar="ROW,COL=SENS", help="Sensitivity of one tile of the detection grid; repeat for more, 'none' to clear")
+    parser.add_argument("-q", "--quality", type=int, help="Override Output Quality of the frame encoder (1-100)")
     parser.add_argument("-o", "--output", type=str, help="Override Output Directory")
+    parser.add_argument("--region", dest="regions", action="append", metavar="SPEC", help="Record a named area as its own stream: NAME=X,Y,W,H[:SENSITIVITY], or a preset (quadrants, halves, thirds); repeat for more, 'none' for the whole screen")
+    
+    # Encode/Write Stage
+    parser.add_argument("--encoder", type=str, choices=["jpeg", "jpeg-pil", "webp", "webp-lossless", "png"], help="Frame encoder backend")
+    parser.add_argument("--jpeg-subsampling", type=str, choices=["444", "422", "420"], help="JPEG chroma subsampling (444 keeps colored text sharp)")
+    parser.add_argument("--jpeg-optimize", action=argparse.BooleanOptionalAction, help="Optimize JPEG Huffman tables (smaller files, slower)")
+    parser.add_argument("--jpeg-progressive", action=argparse.BooleanOptionalAction, help="Write progressive JPEGs")
+    parser.add_argument("--writers", type=int, help="Override number of encoder threads (1-16)")
+    parser.add_argument("--queue-size", type=int, help="Override max frames waiting for an encoder")
+    parser.add_argument("--backpressure", type=str, choices=["block", "drop", "degrade"], help="Policy when the disk can't keep up")
+    parser.add_argument("--storage", type=str, choices=["jpeg", "container", "tiles"], help="Save one JPEG per frame, a single append-only session container, or a container of changed tiles")
+    parser.add_argument("--keyframe-interval", type=int, help="Tiles storage: save a full keyframe every N frames")
+    parser.add_argument("--delta-tiles", type=int, help="Tiles storage: grid divisions used for tile deltas")
+    parser.add_argument("--dedup", action=argparse.BooleanOptionalAction, help="Store trigger-forced frames that repeat a saved frame as references instead of re-encoding them")
+    parser.add_argument("--stats", action=argparse.BooleanOptionalAction, help="Time each pipeline stage, show a live status line and write stats.json at stop")
+    parser.add_argument("--zero-copy", action=argparse.BooleanOptionalAction, help="Detect changes directly on the captured BGRA buffer")
+    parser.add_argument("--proxy-scale", type=int, help="Decimation of the change detection proxy (1 = full resolution only)")
+    parser.add_argument("--safety-check", type=int, metavar="TICKS", help="Score the TICKS-th consecutive tick the proxy shows no change on in full (0 = never, 1 = every tick)")
     
     # Boolean Triggers (Automatically supports --feature and --no-feature)
     parser.add_argument("--keystroke", action=argparse.BooleanOptionalAction, help="Capture on Keystroke")
     parser.add_argument("--mouse-click", action=argparse.BooleanOptionalAction, help="Capture on Mouse Click")
     parser.add_argument("--mouse-scroll", action=argparse.BooleanOptionalAction, help="Capture on Mouse Scroll")
     parser.add_argument("--mouse-move", action=argparse.BooleanOptionalAction, help="Capture on Mouse Move")
+    parser.add_argument("--burst", type=int, metavar="N", help="After a trigger, save up to N more frames that show any change (0 = off)")
+    parser.add_argument("--burst-fps", type=int, help="Frame rate of the ticks after a trigger (1-60)")
+    parser.add_argument("--preroll", type=float, metavar="SECONDS", help="Keep the last SECONDS of unsaved frames in memory and write them out before a trigger or change (0 = off)")
+    parser.add_argument("--preroll-mb", type=int, help="Memory cap of the pre-roll buffer in MB")
+    parser.add_argument("--preroll-scale", type=int, help="Keep pre-roll frames at 1/N resolution (1 = full)")
     
     # Cursor Settings
     parser.add_argument("--show-cursor", action=argparse.BooleanOptionalAction, help="Draw Cursor Overlay")
     parser.add_argument("--cursor-size", type=int, help="Override Cursor Size (5-50)")
     parser.add_argument("--cursor-style", type=str, choices=["dot", "target", "pointer"], help="Override Cursor Style")
+    parser.add_argument("--cursor-mode", type=str, choices=["overlay", "metadata"], help="Draw the cursor into frames, or log its position to cursor.jsonl and draw it at export")
+    
+    # Subcommands (tools that don't record)
+    subparsers = parser.add_subparsers(dest="command", metavar="COMMAND")
+    bench_pipeline = subparsers.add_parser("bench", help="Benchmark the whole grab/detect/encode/write pipeline over a matrix of settings")
+    bench_pipeline.add_argument("--resolution", type=str, default="1920x1080,3840x2160", help="Comma-separated synthetic screen sizes (WxH)")
+    bench_pipeline.add_argument("--tiles", dest="bench_tiles", type=str, default="1,8", help="Comma-separated tile divisions")
+    bench_pipeline.add_argument("--sens", dest="bench_sens", type=str, default="50,100", help="Comma-separated sensitivities")
+    bench_pipeline.add_argument("--quality", dest="bench_quality", type=str, default="90", help="Comma-separated qualities")
+    bench_pipeline.add_argument("--fps", dest="bench_fps", type=str, default="30", help="Comma-separated frame rates")
+    bench_pipeline.add_argument("--duration", type=float, default=5.0, help="Seconds recorded per case")
+    bench_pipeline.add_argument("--regions", type=str, default="typing,scrolling,video", help="Synthetic activity to generate")
+    bench_pipeline.add_argument("--json", dest="json_path", type=str, help="Write machine-readable results to this file")
+    bench_pipeline.add_argument("--compare", type=str, help="Flag regressions against an earlier --json result (exit status 1)")
+    bench_pipeline.add_argument("--tolerance", type=float, default=10.0, help="Allowed slowdown in percent for --compare")
+    bench_pipeline.add_argument("--keep", action="store_true", help="Keep the recorded sessions for inspection")
+    
+    bench_capture = subparsers.add_parser("bench-capture", help="Benchmark memory traffic of the capture/detect path")
+    bench_capture.add_argument("--resolution", type=str, default="3840x2160", help="Synthetic frame size (WxH)")
+    bench_capture.add_argument("--frames", type=int, default=60, help="Frames to process per path")
+    
+    bench_tiles = subparsers.add_parser("bench-tiles", help="Benchmark tile scoring across every Tile Size divisor")
+    bench_tiles.add_argument("--resolution", type=str, default="3840x2160", help="Synthetic frame size (WxH)")
+    bench_tiles.add_argument("--frames", type=int, default=20, help="Frames to score per divisor")
+    
+    bench_encode = subparsers.add_parser("bench-encode", help="Benchmark every frame encoder backend")
+    bench_encode.add_argument("--resolution", type=str, default="3840x2160", help="Synthetic frame size (WxH)")
+    bench_encode.add_argument("--frames", type=int, default=10, help="Frames to encode per backend")
+    bench_encode.add_argument("--quality", dest="bench_quality", type=int, default=90, help="Encoder quality (1-100)")
+    bench_encode.add_argument("--session", type=str, help="Also encode frames from this recorded session")
+    bench_encode.add_argument("--workers", type=str, default="1,2,4", help="Comma-separated encoder thread counts for the scaling columns")
+    
+    bench_memory = subparsers.add_parser("bench-memory", help="Check that memory stays flat over a long synthetic recording")
+    bench_memory.add_argument("--resolution", type=str, default="1920x1080", help="Synthetic frame size (WxH)")
+    bench_memory.add_argument("--frames", type=int, default=3000, help="Frames to record per scenario")
+    bench_memory.add_argument("--scenarios", type=str, default="idle,typing", help="Comma-separated scenarios: idle, or synthetic regions joined with + (e.g. typing+scrolling)")
+    bench_memory.add_argument("--max-growth", type=float, default=16.0, help="Fail if RSS or traced memory grows by more than this many MB once warmed up")
+    bench_memory.add_argument("--max-transient", type=float, help="Fail if per-tick temporary allocations exceed this many MB (p95)")
+    
+    bench_startup = subparsers.add_parser("bench-startup", help="Check that --help, --version and ctl start without the heavy imports, within an import-time budget")
+    bench_startup.add_argument("--runs", type=int, default=5, help="Runs per case (the median is reported)")
+    bench_startup.add_argument("--budget", type=float, default=50.0, metavar="MS", help="Import time allowed over a bare interpreter, in ms")
+    bench_startup.add_argument("--json", dest="json_path", type=str, help="Write machine-readable results to this file")
+    
+    calibrate_cmd = subparsers.add_parser("calibrate", help="Watch an idle screen and learn which areas keep changing on their own")
+    calibrate_cmd.add_argument("--seconds", type=float, default=30.0, help="How long to watch")
+    calibrate_cmd.add_argument("--fps", dest="calibrate_fps", type=int, default=5, help="Frames per second to compare")
+    calibrate_cmd.add_argument("--tiles", dest="calibrate_tiles", type=int, default=32, help="Grid divisions to learn noise on (finer = tighter areas)")
+    calibrate_cmd.add_argument("--min-changes", type=int, default=3, help="Slices of the watch (of 10) an area must change in to count as noise")
+    calibrate_cmd.add_argument("--save", dest="calibrate_save", action="store_true", help="Add the learned areas to the saved ignore areas")
+    calibrate_cmd.add_argument("--force", dest="calibrate_force", action="store_true", help="Save even when a large part of the screen was learned as noise")
+    
+    daemon_cmd = subparsers.add_parser("daemon", help="Stay running and take start/stop/pause/marker/settings commands over a Unix socket")
+    daemon_cmd.add_argument("--socket", type=str, metavar="PATH", help="Control socket (default: $XDG_RUNTIME_DIR/gsr.sock)")
+    
+    ctl_cmd = subparsers.add_parser("ctl", help="Send a command to a running gsr daemon")
+    ctl_cmd.add_argument("ctl_command", metavar="CMD", choices=["start", "stop", "pause", "resume", "marker", "set", "status", "stats", "shutdown"], help="start, stop, pause, resume, marker [LABEL], set KEY=VALUE..., status, stats or shutdown")
+    ctl_cmd.add_argument("params", nargs="*", metavar="ARG", help="Marker label, or KEY=VALUE settings for set (e.g. fps=30 sensitivity=80)")
+    ctl_cmd.add_argument("--socket", type=str, metavar="PATH", help="Control socket of the daemon")
+    ctl_cmd.add_argument("--interval", type=float, default=1.0, help="Seconds between stats updates")
+    ctl_cmd.add_argument("--save", dest="ctl_save", action="store_true", help="With set: also save the settings as the defaults")
+    
+    export_cmd = subparsers.add_parser("export", help="Export a session as a JPEG sequence, a video or an ffmpeg timing file")
+    export_cmd.add_argument("session", type=str, help="Session directory to export")
+    export_cmd.add_argument("-o", "--output", dest="export_dir", metavar="PATH", type=str, help="Destination directory (jpeg) or file (video, concat)")
+    export_cmd.add_argument("--format", dest="export_format", choices=["jpeg", "video", "concat"], default="jpeg", help="jpeg sequence, video file via OpenCV, or ffmpeg concat timing file")
+    export_cmd.add_argument("--region", type=str, help="Only export this area, as X,Y,W,H (e.g. one quadrant)")
+    export_cmd.add_argument("--quality", dest="export_quality", type=int, default=95, help="JPEG quality for reconstructed frames (1-100)")
+    export_cmd.add_argument("--fps", dest="export_fps", type=int, default=30, help="Video frame rate; frames are repeated to match their real on-screen time")
+    export_cmd.add_argument("--max-hold", type=float, default=2.0, help="Longest time in seconds a single frame is held on screen")
+    export_cmd.add_argument("--cursor", dest="export_cursor", action=argparse.BooleanOptionalAction, help="Draw the cursor logged with --cursor-mode metadata (default: whenever the session has a cursor log)")
+    export_cmd.add_argument("--cursor-style", dest="export_cursor_style", choices=["dot", "target", "pointer"], help="Draw the cursor in this style instead of the recorded one")
+    export_cmd.add_argument("--cursor-size", dest="export_cursor_size", type=int, help="Draw the cursor at this size instead of the recorded one")
     
     args = parser.parse_args()
 
@@ -96,47 +265,120 @@ def main():
         setup_desktop_entry()
         sys.exit(0)
 
+    if args.command == "export":
+        import export
+        region = export.parse_region(args.region) if args.region else None
+        cursor = export.load_cursor(args.session, args.export_cursor, args.export_cursor_style, args.export_cursor_size)
+        if args.export_format == "video":
+            export.export_video(args.session, args.export_dir, args.export_fps, args.max_hold, region, cursor)
+        elif args.export_format == "concat":
+            export.export_concat(args.session, args.export_dir, args.export_fps, args.max_hold, region, args.export_quality, cursor)
+        else:
+            export.export_sequence(args.session, args.export_dir, region, args.export_quality, cursor)
+        sys.exit(0)
+
+    if args.command == "bench":
+        import bench
+        _, regressions = bench.run_pipeline_benchmark(
+            args.resolution, args.bench_tiles, args.bench_sens, args.bench_quality, args.bench_fps,
+            args.duration, args.regions, args.json_path, args.compare, args.tolerance, args.keep)
+        sys.exit(1 if regressions else 0)
+
+    if args.command == "bench-capture":
+        import bench
+        bench.run_capture_benchmark(args.resolution, args.frames)
+        sys.exit(0)
+
+    if args.command == "bench-tiles":
+        import bench
+        bench.run_tile_benchmark(args.resolution, args.frames)
+        sys.exit(0)
+
+    if args.command == "bench-encode":
+        import bench
+        bench.run_encode_benchmark(args.resolution, args.frames, args.bench_quality, args.session, args.workers)
+        sys.exit(0)
+
+    if args.command == "bench-memory":
+        import bench
+        _, failures = bench.run_memory_benchmark(args.resolution, args.frames, args.scenarios, args.max_growth, args.max_transient)
+        sys.exit(1 if failures else 0)
+
+    if args.command == "bench-startup":
+        import bench
+        _, failures = bench.run_startup_benchmark(args.runs, args.budget, args.json_path)
+        sys.exit(1 if failures else 0)
+
+    if args.command == "daemon":
+        sys.exit(run_daemon(args))
+
+    if args.command == "ctl":
+        import control
+        sys.exit(control.run_client(args.ctl_command, args.params, args.socket, args.interval, args.ctl_save))
+
+    if args.command == "calibrate":
+        import calibrate
+        from recorder import ScreenRecorder
+        source = None
+        if args.source is not None:
+            import sources
+            source = sources.make_source(args.source)
+        calibrate.run_calibration(ScreenRecorder(source=source), args.seconds, args.calibrate_fps,
+                                  args.calibrate_tiles, args.min_changes, args.calibrate_save, args.calibrate_force)
+        sys.exit(0)
+
     # Automatically run in CLI mode if any arguments are passed
     if len(sys.argv) > 1:
         print("Starting in CLI Mode...")
         global recorder_instance
-        recorder_instance = ScreenRecorder()
-        
-        # Apply numerical/string overrides (only if explicitly passed)
-        if args.fps is not None: recorder_instance.set_fps(args.fps)
-        if args.sens is not None: recorder_instance.set_sensitivity(args.sens)
-        if args.tiles is not None: recorder_instance.set_tile_divisions(args.tiles)
-        if args.quality is not None: recorder_instance.set_quality(args.quality)
-        if args.output is not None: recorder_instance.set_output_dir(args.output)
-        
-        # Apply boolean toggles (True/False allowed via --feature and --no-feature)
-        if args.keystroke is not None: recorder_instance.set_capture_on_keystroke(args.keystroke)
-        if args.mouse_click is not None: recorder_instance.capture_mouse_click = args.mouse_click
-        if args.mouse_move is not None: recorder_instance.capture_mouse_move = args.mouse_move
-        if args.mouse_scroll is not None: recorder_instance.capture_mouse_scroll = args.mouse_scroll
-        
-        # Apply Cursor settings
-        if args.show_cursor is not None: recorder_instance.show_cursor = args.show_cursor
-        if args.cursor_size is not None: recorder_instance.cursor_size = args.cursor_size
-        if args.cursor_style is not None: recorder_instance.cursor_style = args.cursor_style
+        from recorder import ScreenRecorder
+        source = None
+        if args.source is not None:
+            import sources
+            source = sources.make_source(args.source)
+        recorder_instance = ScreenRecorder(source=source)
+        apply_overrides(recorder_instance, args)
         
         if args.save:
             print("Saving CLI overrides to permanent settings...")
             recorder_instance.save_settings()
+            recorder_instance.flush_settings()
         
         print("\n=== Active Configuration ===")
-        print(f"Capture  : FPS={recorder_instance.fps}, Sensitivity={recorder_instance.sensitivity}, Tiles={recorder_instance.tile_divisions}, Quality={recorder_instance.quality}")
-        print(f"Triggers : Keys={recorder_instance.capture_on_keystroke}, Click={recorder_instance.capture_mouse_click}, Scroll={recorder_instance.capture_mouse_scroll}, Move={recorder_instance.capture_mouse_move}")
-        print(f"Cursor   : Overlay={recorder_instance.show_cursor}, Style={recorder_instance.cursor_style}, Size={recorder_instance.cursor_size}")
+        fps_text = str(recorder_instance.fps)
+        if recorder_instance.adaptive_fps:
+            fps_text = f"{recorder_instance.min_fps}-{recorder_instance.fps} adaptive, boost {recorder_instance.boost_window:g}s"
+        print(f"Capture  : FPS={fps_text} ({recorder_instance.pacing}), Sensitivity={recorder_instance.sensitivity}, Tiles={recorder_instance.tile_divisions}x{recorder_instance.tile_rows or recorder_instance.tile_divisions}, Quality={recorder_instance.quality}")
+        print(f"Detect   : Proxy=1/{recorder_instance.proxy_scale}, SafetyCheck={recorder_instance.safety_check_ticks}, ZeroCopy={recorder_instance.zero_copy}, Engine={recorder_instance.engine}, Ignore={len(recorder_instance.ignore_regions)} areas, TileSens={len(recorder_instance.tile_sensitivity)} tiles")
+        print(f"Triggers : Keys={recorder_instance.capture_on_keystroke}, Click={recorder_instance.capture_mouse_click}, Scroll={recorder_instance.capture_mouse_scroll}, Move={recorder_instance.capture_mouse_move}, Burst={recorder_instance.burst_frames}@{recorder_instance.burst_fps}fps, Preroll={recorder_instance.preroll_seconds:g}s")
+        print(f"Cursor   : Overlay={recorder_instance.show_cursor}, Mode={recorder_instance.cursor_mode}, Style={recorder_instance.cursor_style}, Size={recorder_instance.cursor_size}")
+        print(f"Writer   : Encoder={recorder_instance.encoder}, Threads={recorder_instance.writer_threads}, Queue={recorder_instance.queue_size}, Backpressure={recorder_instance.backpressure}, Storage={recorder_instance.storage}, Dedup={recorder_instance.dedup}")
+        print(f"Source   : {args.source or 'screen'} ({'x'.join(map(str, recorder_instance.get_screen_resolution()))})")
+        if recorder_instance.regions:
+            names = [r if isinstance(r, str) else f"{r['name']}={r['x']},{r['y']},{r['w']},{r['h']}" for r in recorder_instance.regions]
+            print(f"Regions  : {', '.join(names)}")
         print(f"Output   : {recorder_instance.output_dir}")
         print("============================\n")
         print("Press Ctrl+C to stop recording (or Ctrl+Z to send to background).")
         
         recorder_instance.start_recording()
         
-        # Keep main thread alive to receive signals
-        while True:
+        # Keep main thread alive to receive signals, refreshing the status
+        # line in place (every 10 s as a plain line when output is a log);
+        # a replayed session ends on its own
+        interactive = sys.stdout.isatty()
+        seconds = 0
+        while recorder_instance.running:
             time.sleep(1)
+            seconds += 1
+            status = recorder_instance.status_line()
+            if status and interactive:
+                print(f"\r\033[K{status}", end="", flush=True)
+            elif status and seconds % 10 == 0:
+                print(status, flush=True)
+        if interactive:
+            print()
+        recorder_instance.stop_recording()
     else:
         # GUI Mode
         import customtkinter as ctk
@@ -0,0 +1,134 @@
+import queue
+import threading
+import collections
+import numpy as np
+import cv2
+
+# Samples waiting for the pre-roll encoder. When it falls behind, newer
+# frames are skipped instead of holding up the capture thread.
+PENDING_SAMPLES = 2
+
+
+class EncodedFrame:
+    # A pre-roll frame handed to the writer still as its downscaled JPEG.
+    # The encoder thread decodes it, so flushing the buffer never holds
+    # more than one full-size frame per encoder.
+    __slots__ = ("payload", "size", "channels")
+
+    def __init__(self, payload, size, channels):
+        self.payload = payload
+        self.size = size
+        self.channels = channels
+
+    def decode(self):
+        # Back to full size and the original channel layout; None if unreadable
+        image = cv2.imdecode(np.frombuffer(self.payload, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            return None
+        if (image.shape[1], image.shape[0]) != self.size:
+            image = cv2.resize(image, self.size, interpolation=cv2.INTER_LINEAR)
+        if self.channels == 4:
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2BGRA)
+        return image
+
+
+class PrerollBuffer:
+    # The last few seconds of frames that weren't saved, kept in memory as
+    # downscaled JPEG bytes so a trigger can still write out what was on
+    # screen just before it (a hover state, a menu about to close). Bounded
+    # both by age and by total size; the oldest frames go first.
+    #
+    # The capture thread only downscales the frame into a spare buffer; the
+    # colour conversion and JPEG encode run on a background thread.
+    def __init__(self, seconds=2.0, max_mb=64, scale=2, quality=90):
+        self.window_ns = int(max(0.0, seconds) * 1_000_000_000)
+        self.max_bytes = int(max(1, max_mb) * 1024 * 1024)
+        self.scale = max(1, int(scale))
+        self.quality = quality
+        self._frames = collections.deque()
+        self._lock = threading.Lock()
+        self._todo = queue.Queue(maxsize=PENDING_SAMPLES)
+        self._spare = []       # sample buffers the encoder is done with
+        self._generation = 0   # bumped by clear(): samples from before it are dropped
+        self._thread = None
+        self.bytes = 0
+        self.evicted = 0
+        self.skipped = 0
+
+    def __len__(self):
+        return len(self._frames) + self._todo.qsize()
+
+    def push(self, frame, t_ns, meta):
+        # Only called from the capture thread
+        h, w = frame.shape[:2]
+        shape = (h // self.scale, w // self.scale) + frame.shape[2:]
+        buf = self._spare.pop() if self._spare else None
+        if buf is None or buf.shape != shape:
+            buf = np.empty(shape, dtype=frame.dtype)
+        if self.scale > 1:
+            cv2.resize(frame, (shape[1], shape[0]), dst=buf, interpolation=cv2.INTER_AREA)
+        else:
+            np.copyto(buf, frame)
+        try:
+            self._todo.put_nowait((self._generation, t_ns, buf, (w, h), frame.shape[2] if frame.ndim == 3 else 1, meta))
+        except queue.Full:
+            self._spare.append(buf)
+            self.skipped += 1
+            return
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._encode_loop, name="gsr-preroll", daemon=True)
+            self._thread.start()
+
+    def _encode_loop(self):
+        while True:
+            item = self._todo.get()
+            try:
+                if item is None:
+                    return
+                generation, t_ns, sample, size, channels, meta = item
+                small = cv2.cvtColor(sample, cv2.COLOR_BGRA2BGR) if channels == 4 else sample
+                ok, buf = cv2.imencode(".jpg", small, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+                self._spare.append(sample)
+                if not ok:
+                    continue
+                with self._lock:
+                    if generation != self._generation:
+                        continue
+                    self._frames.append((t_ns, buf, size, channels, meta))
+                    self.bytes += len(buf)
+                    self._evict(t_ns)
+            finally:
+                self._todo.task_done()
+
+    def _evict(self, now_ns):
+        frames = self._frames
+        while frames and (now_ns - frames[0][0] > self.window_ns or self.bytes > self.max_bytes):
+            self.bytes -= len(frames.popleft()[1])
+            self.evicted += 1
+
+    def drain(self, now_ns):
+        # Yields the buffered frames still inside the window, oldest first, as
+        # (EncodedFrame, meta); nothing is decoded here
+        self._todo.join()
+        with self._lock:
+            self._evict(now_ns)
+            frames = list(self._frames)
+            self._clear()
+        for _, buf, size, channels, meta in frames:
+            yield EncodedFrame(buf.tobytes(), size, channels), meta
+
+    def clear(self):
+        with self._lock:
+            self._clear()
+
+    def _clear(self):
+        self._frames.clear()
+        self.bytes = 0
+        self._generation += 1
+
+    def close(self):
+        # Stops the encoder thread once it has finished what's queued
+        if self._thread is not None:
+            self._todo.put(None)
+            self._thread.join()
+            self._thread = None
@@ -3,18 +3,42 @@ import time
 import threading
 import datetime
 import cv2
-import mss
 import numpy as np
 import json
-from PIL import Image
-from pynput import keyboard, mouse
+from writer import FrameWriter, BACKPRESSURE_POLICIES
+from encoders import ENCODERS, JPEG_SUBSAMPLING, get_encoder
+from container import ContainerWriter
+from detector import ChangeDetector
+from tiles import TileGrid
+from scheduler import FrameScheduler, PACING_POLICIES
+from sources import MssSource
+from stats import PipelineStats, STATS_NAME
+from events import InputEvents, coalesce_moves
+from preroll import PrerollBuffer
+from engine import ENGINES, ProcessEngine
+from cursor import CURSOR_MODES, CursorLog, draw_cursor
+from regions import REGION_PRESETS, REGIONS_NAME, RegionStream, clip_region, parse_region, preset_regions
+from settings import ConfigWriter, Settings
+
+STORAGE_MODES = ("jpeg", "container", "tiles")
+
+# Input events kept for the next saved frame's sidecar record
+MAX_LOGGED_EVENTS = 256
+
+# Saves that write out the pre-roll buffer first; any other save just empties it
+PREROLL_REASONS = ("key", "mouse", "change")
+
+# Session sidecar of chapter markers and pauses, one JSON object per line:
+# {"t_ns", "kind": "marker" | "pause" | "resume", optional "label"}
+MARKERS_NAME = "markers.jsonl"
 
 class ScreenRecorder:
-    def __init__(self, output_dir=None):
+    def __init__(self, output_dir=None, source=None):
         # Base config paths - completely decoupled from install directory
         config_dir = os.path.expanduser("~/.config/gsr")
         os.makedirs(config_dir, exist_ok=True)
         self.config_file = os.path.join(config_dir, "config.json")
+        self._config_writer = ConfigWriter(self.config_file)
         
         # Output directory path
         if output_dir:
@@ -25,17 +49,62 @@ class ScreenRecorder:
         os.makedirs(self.output_dir, exist_ok=True)
 
         self.running = False
+        self.paused = False # ticks keep running, but nothing is grabbed or saved
         self.recording_thread = None
+        self.engine_worker = None
+        self.writer = None
+        self.region_writers = {} # region name -> FrameWriter while recording regions
+        self._region_layout = [] # (name, rect, region settings) of the running session
+        self.scheduler = None
+        self.stats = None
         self.key_listener = None
         self.mouse_listener = None
         self.mouse_controller =  None
         
         # Default settings
+        self.engine = "thread" # thread, process (capture and detection in a worker process)
         self.fps = 10
+        self.pacing = "skip" # skip, catchup
+        self.adaptive_fps = False # vary the rate between min_fps and fps with activity
+        self.min_fps = 2
+        self.boost_window = 2.0 # seconds at full rate after a change or input
         self.sensitivity = 50 
         self.quality = 100 
         self.tile_divisions = 1 
+        self.tile_rows = None # None = same as tile_divisions (square grid)
+        self.ignore_regions = [] # [x, y, w, h] screen areas whose changes never trigger a save
+        self.tile_sensitivity = {} # "row,col" -> sensitivity of that tile of the detection grid
         self.capture_on_keystroke = False
+        self.burst_frames = 0 # after a trigger, save up to N more frames that show any change
+        self.burst_fps = 30 # rate of those follow-up ticks
+        self.preroll_seconds = 0 # keep the last N seconds of unsaved frames for triggers (0 = off)
+        self.preroll_mb = 64 # memory cap of the pre-roll buffer
+        self.preroll_scale = 2 # pre-roll frames are kept at 1/N resolution
+        # Named areas recorded as separate streams instead of the whole screen:
+        # region dicts (name, x, y, w, h, optional sensitivity/tiles/triggers)
+        # and preset names, laid out when recording starts
+        self.regions = []
+        
+        # Encode/write stage
+        self.encoder = "jpeg" # jpeg, jpeg-pil, webp, webp-lossless, png
+        self.jpeg_subsampling = "420" # 444, 422, 420
+        self.jpeg_optimize = False
+        self.jpeg_progressive = False
+        self.writer_threads = 2
+        self.queue_size = 8
+        self.backpressure = "block" # block, drop, degrade
+        self.storage = "jpeg" # jpeg (one file per frame), container (single append-only file), tiles (container of tile deltas)
+        self.keyframe_interval = 30 # tiles storage: full frame every N saved frames
+        self.delta_tiles = 8 # tiles storage: grid divisions used for deltas
+        self.dedup = True # store trigger-forced repeats of a saved frame as references
+        self.collect_stats = True # per-stage timers, live status and stats.json
+        
+        # Wrap the mss buffer directly and only convert frames that get saved
+        self.zero_copy = True
+        # Change detection runs on a 1/N luma proxy first (1 = full resolution only)
+        self.proxy_scale = 4
+        # Every Nth tick the proxy calls clean is scored in full anyway (0 = never)
+        self.safety_check_ticks = 30
         
         # Mouse Settings
         self.capture_mouse_click = False
@@ -44,16 +113,24 @@ class ScreenRecorder:
         self.show_cursor = False
         self.cursor_size = 10
         self.cursor_style = "dot" # dot, target, pointer
+        self.cursor_mode = "overlay" # overlay (drawn into frames), metadata (logged, drawn at export)
         
-        self.key_pressed = False
-        self.mouse_triggered = False
+        # Filled by the input listeners, drained by the capture loop every tick
+        self.events = InputEvents()
         self.mouse_pos = (0, 0)
         
         self.current_session_dir = None
         self.frame_count = 0
         self.monitor_index = 1 
-        self._resolution = self.get_screen_resolution()
+        # Where frames come from: the live screen unless a synthetic or
+        # replay source is passed in (see sources.py)
+        self.source = source if source is not None else MssSource(self.monitor_index)
+        self._screen_size = None # probed on first use, see _resolution
         
+        # What the capture loop reads: an immutable copy of the settings,
+        # replaced as a whole by every setter (see _publish)
+        self._settings_lock = threading.Lock()
+        self.settings = None
         self.load_settings()
 
     def load_settings(self):
@@ -61,13 +138,44 @@ class ScreenRecorder:
             try:
                 with open(self.config_file, 'r') as f:
                     data = json.load(f)
+                    self.engine = data.get("engine", self.engine)
                     self.fps = data.get("fps", self.fps)
+                    self.pacing = data.get("pacing", self.pacing)
+                    self.adaptive_fps = data.get("adaptive_fps", self.adaptive_fps)
+                    self.min_fps = data.get("min_fps", self.min_fps)
+                    self.boost_window = data.get("boost_window", self.boost_window)
                     self.sensitivity = data.get("sensitivity", self.sensitivity)
                     self.quality = data.get("quality", self.quality)
                     self.tile_divisions = data.get("tile_divisions", self.tile_divisions)
+                    self.tile_rows = data.get("tile_rows", self.tile_rows)
+                    self.ignore_regions = data.get("ignore_regions", self.ignore_regions)
+                    self.tile_sensitivity = data.get("tile_sensitivity", self.tile_sensitivity)
                     self.capture_on_keystroke = data.get("capture_on_keystroke", self.capture_on_keystroke)
+                    self.burst_frames = data.get("burst_frames", self.burst_frames)
+                    self.burst_fps = data.get("burst_fps", self.burst_fps)
+                    self.preroll_seconds = data.get("preroll_seconds", self.preroll_seconds)
+                    self.preroll_mb = data.get("preroll_mb", self.preroll_mb)
+                    self.preroll_scale = data.get("preroll_scale", self.preroll_scale)
+                    self.regions = data.get("regions", self.regions)
                     self.output_dir = data.get("output_dir", self.output_dir)
                     
+                    # Encode/write stage
+                    self.encoder = data.get("encoder", self.encoder)
+                    self.jpeg_subsampling = data.get("jpeg_subsampling", self.jpeg_subsampling)
+                    self.jpeg_optimize = data.get("jpeg_optimize", self.jpeg_optimize)
+                    self.jpeg_progressive = data.get("jpeg_progressive", self.jpeg_progressive)
+                    self.writer_threads = data.get("writer_threads", self.writer_threads)
+                    self.queue_size = data.get("queue_size", self.queue_size)
+                    self.backpressure = data.get("backpressure", self.backpressure)
+                    self.storage = data.get("storage", self.storage)
+                    self.keyframe_interval = data.get("keyframe_interval", self.keyframe_interval)
+                    self.delta_tiles = data.get("delta_tiles", self.delta_tiles)
+                    self.dedup = data.get("dedup", self.dedup)
+                    self.collect_stats = data.get("collect_stats", self.collect_stats)
+                    self.zero_copy = data.get("zero_copy", self.zero_copy)
+                    self.proxy_scale = data.get("proxy_scale", self.proxy_scale)
+                    self.safety_check_ticks = data.get("safety_check_ticks", self.safety_check_ticks)
+                    
                     # Mouse
                     self.capture_mouse_click = data.get("capture_mouse_click", False)
                     self.capture_mouse_scroll = data.get("capture_mouse_scroll", False)
@@ -75,66 +183,122 @@ class ScreenRecorder:
                     self.show_cursor = data.get("show_cursor", False)
                     self.cursor_size = data.get("cursor_size", 10)
                     self.cursor_style = data.get("cursor_style", "dot")
+                    self.cursor_mode = data.get("cursor_mode", self.cursor_mode)
             except Exception as e:
                 print(f"Error loading config: {e}")
+        self._publish()
 
-    def save_settings(self):
-        data = {
+    def settings_dict(self):
+        return {
+            "engine": self.engine,
             "fps": self.fps,
+            "pacing": self.pacing,
+            "adaptive_fps": self.adaptive_fps,
+            "min_fps": self.min_fps,
+            "boost_window": self.boost_window,
             "sensitivity": self.sensitivity,
             "quality": self.quality,
             "tile_divisions": self.tile_divisions,
+            "tile_rows": self.tile_rows,
+            "ignore_regions": self.ignore_regions,
+            "tile_sensitivity": self.tile_sensitivity,
             "capture_on_keystroke": self.capture_on_keystroke,
+            "burst_frames": self.burst_frames,
+            "burst_fps": self.burst_fps,
+            "preroll_seconds": self.preroll_seconds,
+            "preroll_mb": self.preroll_mb,
+            "preroll_scale": self.preroll_scale,
+            "regions": self.regions,
             "output_dir": self.output_dir,
+            "encoder": self.encoder,
+            "jpeg_subsampling": self.jpeg_subsampling,
+            "jpeg_optimize": self.jpeg_optimize,
+            "jpeg_progressive": self.jpeg_progressive,
+            "writer_threads": self.writer_threads,
+            "queue_size": self.queue_size,
+            "backpressure": self.backpressure,
+            "storage": self.storage,
+            "keyframe_interval": self.keyframe_interval,
+            "delta_tiles": self.delta_tiles,
+            "dedup": self.dedup,
+            "collect_stats": self.collect_stats,
+            "zero_copy": self.zero_copy,
+            "proxy_scale": self.proxy_scale,
+            "safety_check_ticks": self.safety_check_ticks,
             "capture_mouse_click": self.capture_mouse_click,
             "capture_mouse_scroll": self.capture_mouse_scroll,
             "capture_mouse_move": self.capture_mouse_move,
             "show_cursor": self.show_cursor,
             "cursor_size": self.cursor_size,
-            "cursor_style": self.cursor_style
+            "cursor_style": self.cursor_style,
+            "cursor_mode": self.cursor_mode
         }
-        try:
-            with open(self.config_file, 'w') as f:
-                json.dump(data, f, indent=4)
-        except Exception as e:
-            print(f"Error saving config: {e}")
 
-    def get_screen_resolution(self):
-        with mss.mss() as sct:
-            if self.monitor_index < len(sct.monitors):
-                mon = sct.monitors[self.monitor_index]
-                return (mon["width"], mon["height"])
-            return (1920, 1080) # Fallback
+    def apply_settings(self, data):
+        # Takes a settings_dict() as is, e.g. in the capture engine's worker
+        for key, value in data.items():
+            setattr(self, key, value)
+        self._publish()
 
-    def start_recording(self):
-        if self.running:
-            return
-        
-        timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-        self.current_session_dir = os.path.join(self.output_dir, f"session_{timestamp}")
-        os.makedirs(self.current_session_dir, exist_ok=True)
-        
-        self.running = True
-        self.frame_count = 0
-        
-        if self.capture_on_keystroke:
-            self._start_keyboard_listener()
+    def _publish(self):
+        # Swaps in a snapshot of the current settings. A running capture loop
+        # picks it up at its next tick; the lock keeps two threads publishing
+        # at once from swapping in an older snapshot last.
+        with self._settings_lock:
+            self.settings = Settings(self.settings_dict())
 
-        self.recording_thread = threading.Thread(target=self._record_loop)
-        self.recording_thread.start()
-        print(f"Recording started. Saving to {self.current_session_dir}")
+    def save_settings(self):
+        # Returns right away: config.json is written from a timer thread,
+        # with saves in quick succession merged into one write
+        self._publish()
+        self._config_writer.schedule(self.settings)
 
-    def stop_recording(self):
-        self.running = False
-        if self.listener:
-            self.listener.stop()
-            self.listener = None
-        if self.recording_thread:
-            self.recording_thread.join()
-        print("Recording stopped.")
+    def flush_settings(self):
+        # Writes a save that is still waiting on its timer, before exiting
+        self._config_writer.flush()
+
+    def get_screen_resolution(self):
+        return self._resolution
+
+    @property
+    def _resolution(self):
+        # Asking the source for its size opens the screen (an mss handle),
+        # so that waits for the first session, or whatever needs it first
+        if self._screen_size is None:
+            self._screen_size = self.source.resolution
+        return self._screen_size
+
+    def set_engine(self, engine):
+        if engine in ENGINES:
+            self.engine = engine
+            self._publish()
+            return True
+        print(f"Invalid engine: {engine}")
+        return False
 
     def set_fps(self, fps):
         self.fps = max(1, min(fps, 60))
+        self._publish()
+
+    def set_adaptive_fps(self, enabled):
+        self.adaptive_fps = enabled
+        self._publish()
+
+    def set_min_fps(self, fps):
+        self.min_fps = max(1, min(fps, 60))
+        self._publish()
+
+    def set_boost_window(self, seconds):
+        self.boost_window = max(0.1, float(seconds))
+        self._publish()
+
+    def set_pacing(self, policy):
+        if policy in PACING_POLICIES:
+            self.pacing = policy
+            self._publish()
+            return True
+        print(f"Invalid pacing policy: {policy}")
+        return False
 
     def set_sensitivity(self, sensitivity):
         # sensitivity comes in as 0-100 (from UI slider)
@@ -150,47 +314,276 @@ class ScreenRecorder:
         # UI 100 (High Sens) -> Threshold 0 (Capture everything)
         # Simple linear map: Threshold = 50 * (1 - (sensitivity / 100))
         self.sensitivity = sensitivity
+        self._publish()
 
     def set_quality(self, quality):
         self.quality = max(1, min(quality, 100))
+        self._publish()
+
+    def set_encoder(self, encoder):
+        if encoder in ENCODERS:
+            self.encoder = encoder
+            self._publish()
+            return True
+        print(f"Invalid encoder: {encoder}")
+        return False
+
+    def set_jpeg_options(self, subsampling=None, optimize=None, progressive=None):
+        ok = True
+        if subsampling is not None:
+            if subsampling in JPEG_SUBSAMPLING:
+                self.jpeg_subsampling = subsampling
+            else:
+                print(f"Invalid JPEG subsampling: {subsampling}")
+                ok = False
+        if optimize is not None:
+            self.jpeg_optimize = optimize
+        if progressive is not None:
+            self.jpeg_progressive = progressive
+        self._publish()
+        return ok
+
+    def set_writer_threads(self, threads):
+        self.writer_threads = max(1, min(int(threads), 16))
+        self._publish()
+
+    def set_queue_size(self, size):
+        self.queue_size = max(1, int(size))
+        self._publish()
+
+    def set_backpressure(self, policy):
+        if policy in BACKPRESSURE_POLICIES:
+            self.backpressure = policy
+            self._publish()
+            return True
+        print(f"Invalid backpressure policy: {policy}")
+        return False
+
+    def set_storage(self, storage):
+        if storage in STORAGE_MODES:
+            self.storage = storage
+            self._publish()
+            return True
+        print(f"Invalid storage mode: {storage}")
+        return False
+
+    def set_keyframe_interval(self, frames):
+        self.keyframe_interval = max(1, int(frames))
+        self._publish()
+
+    def set_delta_tiles(self, divisions):
+        self.delta_tiles = max(1, int(divisions))
+        self._publish()
+
+    def set_dedup(self, enabled):
+        self.dedup = enabled
+        self._publish()
+
+    def set_collect_stats(self, enabled):
+        self.collect_stats = enabled
+        self._publish()
+
+    def set_zero_copy(self, enabled):
+        self.zero_copy = enabled
+        self._publish()
+
+    def set_proxy_scale(self, scale):
+        self.proxy_scale = max(1, min(int(scale), 16))
+        self._publish()
+
+    def set_safety_check(self, ticks):
+        self.safety_check_ticks = max(0, int(ticks))
+        self._publish()
 
     def set_output_dir(self, path):
         if os.path.isdir(path):
             self.output_dir = path
-        else:
-            print(f"Invalid directory: {path}")
+            self._publish()
+            return True
+        print(f"Invalid directory: {path}")
+        return False
+
+    def set_mouse_triggers(self, click=None, move=None, scroll=None):
+        if click is not None:
+            self.capture_mouse_click = click
+        if move is not None:
+            self.capture_mouse_move = move
+        if scroll is not None:
+            self.capture_mouse_scroll = scroll
+        self._publish()
 
-    def set_tile_divisions(self, divisions):
+    def set_cursor(self, show=None, style=None, size=None):
+        if show is not None:
+            self.show_cursor = show
+        if style is not None:
+            self.cursor_style = style
+        if size is not None:
+            self.cursor_size = max(1, int(size))
+        self._publish()
+
+    def set_cursor_mode(self, mode):
+        if mode in CURSOR_MODES:
+            self.cursor_mode = mode
+            self._publish()
+            return True
+        print(f"Invalid cursor mode: {mode}")
+        return False
+
+    def set_tile_divisions(self, divisions, rows=None):
+        # Columns of the detection grid; rows defaults to the same count
         self.tile_divisions = max(1, int(divisions))
+        self.tile_rows = max(1, int(rows)) if rows else None
+        self._publish()
+
+    def set_ignore_regions(self, specs):
+        # Each spec is X,Y,W,H in screen pixels (or an [x, y, w, h] list); "none" clears
+        areas = []
+        for spec in specs:
+            if spec == "none":
+                areas = []
+                continue
+            try:
+                x, y, w, h = (int(v) for v in (spec.split(",") if isinstance(spec, str) else spec))
+            except ValueError:
+                print(f"Invalid ignore area: {spec}")
+                return False
+            if w > 0 and h > 0:
+                areas.append([x, y, w, h])
+        self.ignore_regions = areas
+        self._publish()
+        return True
+
+    def set_tile_sensitivity(self, specs):
+        # Each spec is ROW,COL=SENSITIVITY for one tile of the detection grid; "none" clears
+        overrides = {}
+        for spec in specs:
+            if spec == "none":
+                overrides = {}
+                continue
+            try:
+                tile, value = spec.split("=")
+                r, c = (int(v) for v in tile.split(","))
+                overrides[f"{r},{c}"] = max(0, min(int(value), 100))
+            except ValueError:
+                print(f"Invalid tile sensitivity: {spec}")
+                return False
+        self.tile_sensitivity = overrides
+        self._publish()
+        return True
+
+    def _tile_thresholds(self, settings):
+        # tile_sensitivity as detector thresholds, keyed by (row, col)
+        thresholds = {}
+        for key, sensitivity in settings.tile_sensitivity.items():
+            r, c = (int(v) for v in key.split(","))
+            thresholds[(r, c)] = self._get_threshold(sensitivity)
+        return thresholds
 
     def get_tile_resolution(self):
         w, h = self._resolution
-        tw = w // self.tile_divisions
-        th = h // self.tile_divisions
-        return tw, th
+        return TileGrid(w, h, self.tile_divisions, self.tile_rows).tile_size()
         
     
     def set_capture_on_keystroke(self, enabled):
         self.capture_on_keystroke = enabled
+        self._publish()
+
+    def set_burst(self, frames=None, fps=None):
+        if frames is not None:
+            self.burst_frames = max(0, int(frames))
+        if fps is not None:
+            self.burst_fps = max(1, min(int(fps), 60))
+        self._publish()
+
+    def set_preroll(self, seconds=None, max_mb=None, scale=None):
+        if seconds is not None:
+            self.preroll_seconds = max(0.0, float(seconds))
+        if max_mb is not None:
+            self.preroll_mb = max(1, int(max_mb))
+        if scale is not None:
+            self.preroll_scale = max(1, min(int(scale), 8))
+        self._publish()
+
+    def set_regions(self, specs):
+        # Each spec is NAME=X,Y,W,H[:SENSITIVITY] or a preset name; "none" clears
+        regions = []
+        for spec in specs:
+            if spec == "none":
+                regions = []
+            elif spec in REGION_PRESETS:
+                regions.append(spec)
+            else:
+                try:
+                    regions.append(parse_region(spec))
+                except ValueError as e:
+                    print(f"Invalid region: {e}")
+                    return False
+        self.regions = regions
+        self._publish()
+        return True
+
+    def _layout_regions(self):
+        # (name, rect, region dict) for every configured region on this screen
+        w, h = self._resolution
+        layout = []
+        names = set()
+        for entry in self.regions:
+            for region in preset_regions(entry, w, h) if isinstance(entry, str) else [entry]:
+                name = region.get("name")
+                rect = clip_region(region, w, h)
+                if name in names:
+                    print(f"Error: duplicate region name {name}, skipped")
+                elif rect is None:
+                    print(f"Error: region {name} is outside the {w}x{h} screen, skipped")
+                else:
+                    names.add(name)
+                    layout.append((name, rect, region))
+        return layout
+
+    def _is_trigger(self, settings, kind, triggers=None):
+        # triggers: a region's own list of trigger kinds, overriding the switches
+        if triggers is not None:
+            return kind in triggers
+        if kind == "key":
+            return settings.capture_on_keystroke
+        if kind == "click":
+            return settings.capture_mouse_click
+        if kind == "scroll":
+            return settings.capture_mouse_scroll
+        return settings.capture_mouse_move
+
+    def _input_event(self, kind, x=None, y=None):
+        # Runs on the listener threads: queue the event, boost the adaptive
+        # rate for any input, and start the follow-up burst right away for
+        # triggers instead of waiting for the next regular tick
+        self.events.push(kind, x, y)
+        scheduler = self.scheduler
+        settings = self.settings
+        if scheduler is not None:
+            scheduler.activity()
+            if settings.burst_frames and self._is_trigger(settings, kind):
+                scheduler.burst(settings.burst_frames + 1, settings.burst_fps)
 
     def _on_press(self, key):
-        self.key_pressed = True
+        self._input_event("key")
 
     def _on_move(self, x, y):
         # Update mouse pos for drawing
         self.mouse_pos = (x, y)
-        if self.capture_mouse_move:
-            self.mouse_triggered = True
+        self._input_event("move", x, y)
 
     def _on_click(self, x, y, button, pressed):
-        if pressed and self.capture_mouse_click:
-            self.mouse_triggered = True
+        if pressed:
+            self._input_event("click", x, y)
 
     def _on_scroll(self, x, y, dx, dy):
-        if self.capture_mouse_scroll:
-            self.mouse_triggered = True
+        self._input_event("scroll", x, y)
 
     def _start_input_listeners(self):
+        # Imported here: pynput needs a display, and synthetic or replayed
+        # sources never start the listeners
+        from pynput import keyboard, mouse
+        
         # Keyboard
         self.key_listener = keyboard.Listener(on_press=self._on_press)
         self.key_listener.start()
@@ -202,35 +595,185 @@ class ScreenRecorder:
             on_scroll=self._on_scroll)
         self.mouse_listener.start()
         
-        # Controller for polling position if needed for drawing immediately
+        # Where the pointer is before it first moves; after that the move
+        # events keep mouse_pos current, so nothing is polled per tick
         self.mouse_controller = mouse.Controller()
+        self.mouse_pos = self.mouse_controller.position
 
     def start_recording(self):
         if self.running:
             return
             
         self.running = True
-        self.key_pressed = False
-        self.mouse_triggered = False
+        self.paused = False
+        self.events.clear()
         self.frame_count = 0
+        self._publish() # attributes assigned directly since the last setter
         
         timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
         self.current_session_dir = os.path.join(self.output_dir, f"session_{timestamp}")
         
         if not os.path.exists(self.current_session_dir):
             os.makedirs(self.current_session_dir)
-            
+        
+        self.stats = PipelineStats(enabled=self.collect_stats)
+        self._region_layout = self._layout_regions() if self.regions else []
+        if self._region_layout:
+            # One output stream per region, each in its own subdirectory
+            self.region_writers = {}
+            for name, rect, _ in self._region_layout:
+                region_dir = os.path.join(self.current_session_dir, name)
+                os.makedirs(region_dir, exist_ok=True)
+                self.region_writers[name] = self._make_writer(region_dir, rect[2], rect[3])
+            self._write_region_layout()
+        else:
+            self.writer = self._make_writer(self.current_session_dir, *self._resolution)
+        
         print(f"Recording started. Saving to {self.current_session_dir}")
         
+        if self.engine == "process" and self._region_layout:
+            print("Regions are recorded by the thread engine")
+        elif self.engine == "process":
+            # Capture, detection and the input listeners run in a worker
+            # process; saved frames come back to self.writer
+            self.engine_worker = ProcessEngine(self)
+            self.scheduler = self.engine_worker.scheduler
+            self.engine_worker.start()
+            return
+        
+        self.scheduler = self._make_scheduler()
         self.recording_thread = threading.Thread(target=self._record_loop)
         self.recording_thread.start()
         
-        self._start_input_listeners()
+        if self.source.interactive:
+            self._start_input_listeners()
+
+    def pause_recording(self):
+        if not self.running or self.paused:
+            return False
+        self.paused = True
+        if self.engine_worker:
+            self.engine_worker.set_paused(True)
+        self.add_marker(kind="pause")
+        return True
+
+    def resume_recording(self):
+        if not self.running or not self.paused:
+            return False
+        self.add_marker(kind="resume")
+        self.paused = False
+        if self.engine_worker:
+            self.engine_worker.set_paused(False)
+        return True
+
+    def add_marker(self, label=None, kind="marker"):
+        # Appends a chapter marker (or a pause/resume) at the current session
+        # time to markers.jsonl; returns the record, or None when not recording
+        if not self.running or self.scheduler is None:
+            return None
+        record = {"t_ns": self.scheduler.elapsed_ns(), "kind": kind}
+        if label:
+            record["label"] = str(label)
+        try:
+            with open(os.path.join(self.current_session_dir, MARKERS_NAME), "a") as f:
+                f.write(json.dumps(record) + "\n")
+        except Exception as e:
+            print(f"Error writing marker: {e}")
+            return None
+        return record
+
+    def _make_writer(self, session_dir, width, height):
+        # Encoding and disk writes run on their own pool so a slow imwrite
+        # never stalls the capture loop
+        sink = None
+        delta_grid = None
+        if self.storage in ("container", "tiles"):
+            sink = ContainerWriter(session_dir)
+        if self.storage == "tiles":
+            delta_grid = TileGrid(width, height, self.delta_tiles)
+        writer = FrameWriter(
+            session_dir,
+            workers=self.writer_threads,
+            queue_size=self.queue_size,
+            policy=self.backpressure,
+            sink=sink,
+            delta_grid=delta_grid,
+            keyframe_interval=self.keyframe_interval,
+            dedup=self.dedup,
+            encoder=get_encoder(self.encoder, self.jpeg_subsampling, self.jpeg_optimize, self.jpeg_progressive),
+            stats=self.stats)
+        writer.start()
+        return writer
+
+    def _write_region_layout(self):
+        # Where each region's stream sits on the screen, for tools that put
+        # the streams back together
+        w, h = self._resolution
+        layout = {
+            "screen": [w, h],
+            "regions": [{"name": name, "x": x, "y": y, "w": rw, "h": rh}
+                        for name, (x, y, rw, rh), _ in self._region_layout],
+        }
+        try:
+            with open(os.path.join(self.current_session_dir, REGIONS_NAME), "w") as f:
+                json.dump(layout, f, indent=4)
+        except Exception as e:
+            print(f"Error writing region layout: {e}")
+
+    def _writers(self):
+        # (region name or None, writer) of every output stream of the session.
+        # Read once: stop_recording() may clear them from another thread.
+        writer = self.writer
+        if writer is not None:
+            return [(None, writer)]
+        return list(self.region_writers.items())
+
+    def _make_scheduler(self):
+        return FrameScheduler(
+            self.fps, self.pacing,
+            min_fps=self.min_fps if self.adaptive_fps else None,
+            boost_s=self.boost_window)
 
     def stop_recording(self):
         self.running = False
         if self.recording_thread:
             self.recording_thread.join()
+            self.recording_thread = None
+        if self.engine_worker:
+            self.engine_worker.stop()
+            self.engine_worker = None
+        
+        # Drain everything still queued, in capture order
+        writers = self._writers()
+        if writers:
+            self.frame_count = 0
+        for name, writer in writers:
+            writer.close()
+            self.frame_count += writer.frame_count
+            label = f"[{name}] " if name else ""
+            if name:
+                print(f"{label}{writer.frame_count} frames")
+            if writer.dropped or writer.degraded:
+                print(f"{label}Writer backpressure: {writer.dropped} frames dropped, {writer.degraded} frames degraded")
+            if writer.duplicates:
+                print(f"{label}Dedup: {writer.duplicates} repeated frames stored as references, "
+                      f"saved ~{writer.encode_ms_saved():.0f} ms encoding and {writer.bytes_saved / 1e6:.1f} MB "
+                      f"(duplicate checks cost {writer.hash_ns / 1e6:.0f} ms)")
+        self.writer = None
+        self.region_writers = {}
+        
+        if self.scheduler:
+            print(f"Pacing: {self.scheduler.ticks} ticks, {self.scheduler.late} late, {self.scheduler.dropped} dropped, "
+                  f"{self.scheduler.effective_fps():.1f} fps effective")
+        
+        stats = self.stats
+        if stats is not None and (stats.counters["prefiltered"] or stats.counters["safety_checks"]):
+            c = stats.counters
+            print(f"Prefilter: {c['prefiltered']} checks decided by the sparse lattice alone, "
+                  f"{c['prefilter_misses']} changes missed in {c['safety_checks']} safety checks")
+        
+        if writers and self.stats is not None and self.stats.enabled:
+            self._write_stats(writers)
         
         if self.key_listener:
             self.key_listener.stop()
@@ -242,127 +785,401 @@ class ScreenRecorder:
             
         print("Recording stopped.")
 
-    def _get_threshold(self):
+    def status_line(self):
+        # Live one-line summary of the running session, for the CLI and GUI
+        if self.stats is None or not self.stats.enabled:
+            return ""
+        line = self.stats.status_line()
+        writers = [writer for _, writer in self._writers()]
+        if writers:
+            line += f" | queue {sum(w.queue_depth for w in writers)}"
+            dropped = sum(w.dropped for w in writers)
+            if dropped:
+                line += f" dropped {dropped}"
+        scheduler = self.scheduler
+        if scheduler is not None and scheduler.min_fps is not None:
+            line += f" | {scheduler.rate:.1f} fps"
+        return line
+
+    def live_stats(self):
+        # The state of the recorder and its running session as plain values,
+        # for the daemon's status and stats stream
+        writers = [writer for _, writer in self._writers()]
+        data = {
+            "running": self.running,
+            "paused": self.paused,
+            "session": self.current_session_dir,
+            "frames": sum(writer.frame_count for writer in writers) if writers else self.frame_count,
+            "queue": sum(writer.queue_depth for writer in writers),
+            "dropped": sum(writer.dropped for writer in writers),
+        }
+        scheduler = self.scheduler
+        if scheduler is not None:
+            data["ticks"] = scheduler.ticks
+            data["late"] = scheduler.late
+            data["fps"] = round(scheduler.rate, 2)
+            data["effective_fps"] = round(scheduler.effective_fps(), 2)
+        stats = self.stats
+        if stats is not None and stats.enabled:
+            data["counters"] = dict(stats.counters)
+            data["reasons"] = dict(stats.reasons)
+            data["status"] = self.status_line()
+        return data
+
+    def _write_stats(self, writers):
+        # Session summary next to the frames: stage timings and frame counters
+        # from the recorder, plus the writer and pacing counters. Region
+        # sessions count frames per stream; saved/skipped are per stream too.
+        scheduler = self.scheduler
+        extra = {
+            "frames_written": sum(writer.frame_count for _, writer in writers),
+            "writer": {
+                "dropped": sum(writer.dropped for _, writer in writers),
+                "degraded": sum(writer.degraded for _, writer in writers),
+                "duplicates": sum(writer.duplicates for _, writer in writers),
+                "bytes_saved": sum(writer.bytes_saved for _, writer in writers),
+            },
+        }
+        if writers[0][0] is not None:
+            extra["regions"] = {name: {"frames_written": writer.frame_count, "dropped": writer.dropped}
+                                for name, writer in writers}
+        if scheduler is not None:
+            extra["pacing"] = {
+                "ticks": scheduler.ticks,
+                "late": scheduler.late,
+                "dropped": scheduler.dropped,
+                "target_fps": scheduler.fps,
+                "min_fps": scheduler.min_fps,
+                "effective_fps": scheduler.effective_fps(),
+            }
+        try:
+            self.stats.write_json(os.path.join(self.current_session_dir, STATS_NAME), extra)
+        except Exception as e:
+            print(f"Error writing stats: {e}")
+
+    def _get_threshold(self, sensitivity=None):
         # Invert sensitivity for threshold calculation
         # Sensitivity 100 -> Threshold 0 (Capture all)
         # Sensitivity 0 -> Threshold ~50 (Capture only drastic changes)
-        return 50 * (1 - (self.sensitivity / 100.0))
+        if sensitivity is None:
+            sensitivity = self.sensitivity
+        return 50 * (1 - (sensitivity / 100.0))
+
+    def _event_records(self, events, scheduler, origin_x, origin_y):
+        # Sidecar form: session-relative time, kind, and the pointer position
+        # relative to the captured area for mouse events
+        records = []
+        for t_ns, kind, x, y in events:
+            record = {"t_ns": scheduler.elapsed_ns(t_ns), "kind": kind}
+            if x is not None:
+                record["x"] = int(x - origin_x)
+                record["y"] = int(y - origin_y)
+            records.append(record)
+        return records
+
+    def _flush_preroll(self, stream, now_ns, quality):
+        # Through the writer like any other frame, so every storage mode and
+        # encoder handles them. They go in still JPEG-compressed and are
+        # decoded on the encoder threads; they don't count against the
+        # writer's queue, so the capture thread never waits on them.
+        stats = self.stats
+        for encoded, meta in stream.preroll.drain(now_ns):
+            submit_ns = time.monotonic_ns()
+            stream.writer.submit(encoded, quality, meta)
+            stats.add("submit", time.monotonic_ns() - submit_ns)
+            stats.count("saved", "preroll")
+
+    def _make_streams(self, settings):
+        # The whole screen into self.writer, or one stream per region; the
+        # pre-roll memory cap is shared between regions
+        def preroll(share=1):
+            if settings.preroll_seconds <= 0:
+                return None
+            return PrerollBuffer(settings.preroll_seconds, max(1, settings.preroll_mb // share), settings.preroll_scale)
+
+        def detector():
+            return ChangeDetector(settings.proxy_scale, settings.safety_check_ticks, self.stats)
+
+        if not self._region_layout:
+            streams = [RegionStream(None, None, self.writer, detector(), preroll())]
+        else:
+            share = len(self._region_layout)
+            streams = [RegionStream(name, rect, self.region_writers[name], detector(), preroll(share),
+                                    region.get("sensitivity"), region.get("triggers"), region.get("tiles"))
+                       for name, rect, region in self._region_layout]
+        if settings.show_cursor and settings.cursor_mode == "metadata" and self.current_session_dir:
+            # Every stream logs the pointer relative to its own area
+            for stream in streams:
+                stream_dir = self.current_session_dir
+                if stream.name is not None:
+                    stream_dir = os.path.join(stream_dir, stream.name)
+                try:
+                    stream.cursor_log = CursorLog(stream_dir)
+                except Exception as e:
+                    print(f"Error opening cursor log: {e}")
+        return streams
 
     def _record_loop(self):
-        prev_frame = None
-        interval = 1.0 / self.fps
+        # Pre-roll, cursor logs and the frame layout are set up from the
+        # settings at the start; the rest follows each tick's snapshot
+        settings = self.settings
+        streams = self._make_streams(settings)
+        scheduler = self.scheduler
+        scheduler.start()
+        # Read once so the frame layout can't change under the detector's reference mid-session
+        zero_copy = settings.zero_copy
+        cursor_mode = settings.cursor_mode
+        stats = self.stats
+        applied = None # the settings snapshot the pacing and tile thresholds come from
+        tile_thresholds = None
+        
+        source = self.source
+        try:
+            source.open()
+        except Exception as e:
+            print(f"Error opening frame source: {e}")
+            self.running = False
+            return
         
-        with mss.mss() as sct:
-            monitor = sct.monitors[self.monitor_index]
+        try:
+            origin_x, origin_y = source.origin
+            spare_raw = None
+            spare_frame = None
             
             while self.running:
-                start_time = time.time()
+                # One settings snapshot per tick: a change made mid-session
+                # (GUI sliders, the engine's pump) applies from the next tick
+                # on, never halfway through one
+                settings = self.settings
+                if settings is not applied:
+                    applied = settings
+                    scheduler.set_fps(settings.fps)
+                    scheduler.set_adaptive(settings.min_fps if settings.adaptive_fps else None, settings.boost_window)
+                    tile_thresholds = self._tile_thresholds(settings) if settings.tile_sensitivity else None
+                
+                # Sleeps until this tick's absolute deadline; unpaced sources
+                # (replay at max speed) run back to back
+                if source.paced:
+                    scheduler.wait()
+                else:
+                    scheduler.advance()
+                
+                if self.paused:
+                    # Input while paused never triggers a save after resuming,
+                    # and frames from before the pause never go out as pre-roll
+                    self.events.clear()
+                    for stream in streams:
+                        stream.pending_events = []
+                        stream.burst_left = 0
+                        if stream.preroll is not None:
+                            stream.preroll.clear()
+                            stream.candidate_proxy = None
+                    if not source.paced:
+                        time.sleep(0.05)
+                    continue
                 
                 # Capture screen
                 try:
-                    sct_img = sct.grab(monitor)
-                    frame = np.array(sct_img)
-                    
-                    if frame.shape[2] == 4:
-                        frame_bgr = cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
+                    # Sources hand over a fresh BGRA buffer per grab, so holding
+                    # on to it as the detector reference (or in the writer
+                    # queue) is safe without a copy. Buffers of skipped frames
+                    # are handed back to be refilled, so an idle screen costs
+                    # no frame allocations.
+                    grab_ns = time.monotonic_ns()
+                    raw = source.grab(spare_raw)
+                    capture_ns = time.monotonic_ns()
+                    if raw is None:
+                        # Replay reached the end of the session
+                        print("Frame source finished.")
+                        self.running = False
+                        break
+                    stats.add("grab", capture_ns - grab_ns)
+                    stats.count("examined")
+                    if zero_copy:
+                        frame = raw
+                        spare_raw = None
                     else:
-                        frame_bgr = frame
-
-                    # Draw Cursor if enabled
-                    if self.show_cursor:
-                        # Get current mouse position (relative to monitor if necessary, but pynput gives global)
-                        # Ensure we map global coordinates to the captured monitor area
-                        mx, my = self.mouse_controller.position
-                        
-                        # Adjust for monitor offset
-                        rel_x = mx - monitor["left"]
-                        rel_y = my - monitor["top"]
-                        
-                        # Draw Cursor
-                        cx, cy = int(rel_x), int(rel_y)
-                        radius = self.cursor_size
-                        color = (0, 255, 255) # Yellow/Cyan (BGR)
-                        thickness = 2
-                        
-                        if self.cursor_style == "dot":
-                            cv2.circle(frame_bgr, (cx, cy), radius, color, -1)
-                            
-                        elif self.cursor_style == "target":
-                            # Circle
-                            cv2.circle(frame_bgr, (cx, cy), radius, color, thickness)
-                            # Crosshair
-                            cv2.line(frame_bgr, (cx - radius - 5, cy), (cx + radius + 5, cy), color, thickness)
-                            cv2.line(frame_bgr, (cx, cy - radius - 5), (cx, cy + radius + 5), color, thickness)
-                            
-                        elif self.cursor_style == "pointer":
-                            # Simple Triangle
-                            pts = np.array([
-                                [cx, cy], 
-                                [cx, cy + int(radius * 1.5)], 
-                                [cx + int(radius * 1.2), cy + int(radius * 1.2)]
-                            ], np.int32)
-                            pts = pts.reshape((-1, 1, 2))
-                            cv2.fillPoly(frame_bgr, [pts], color)
-                    
-                    should_save = False
-                    
-                    # Check Triggers
-                    if self.capture_on_keystroke and self.key_pressed:
-                        should_save = True
-                        self.key_pressed = False 
-                        
-                    if self.mouse_triggered:
-                        should_save = True
-                        self.mouse_triggered = False
+                        frame = cv2.cvtColor(raw, cv2.COLOR_BGRA2BGR, dst=spare_frame)
+                        spare_raw = raw # the BGRA grab itself is never kept
+                        spare_frame = None
+                        stats.add("convert", time.monotonic_ns() - capture_ns)
+
+                    # Draw Cursor if enabled, or log where it is. Positions
+                    # come from the move events (relative to the captured area)
+                    if settings.show_cursor and self.mouse_controller is not None:
+                        cursor_ns = time.monotonic_ns()
+                        rel_x = self.mouse_pos[0] - origin_x
+                        rel_y = self.mouse_pos[1] - origin_y
+                        if cursor_mode == "metadata":
+                            t_ns = scheduler.elapsed_ns(capture_ns)
+                            for stream in streams:
+                                if stream.cursor_log is not None:
+                                    rx, ry = stream.origin()
+                                    stream.cursor_log.log(t_ns, rel_x - rx, rel_y - ry, settings.cursor_style, settings.cursor_size)
+                        else:
+                            draw_cursor(frame, rel_x, rel_y, settings.cursor_style, settings.cursor_size)
+                        stats.add("cursor", time.monotonic_ns() - cursor_ns)
                     
-                    if not should_save:
-                        if prev_frame is None:
-                            should_save = True
+                    # Every input event queued since the last tick, and where
+                    # the pointer is for routing keystrokes to a region
+                    events = self.events.drain()
+                    pointer = (self.mouse_pos[0] - origin_x, self.mouse_pos[1] - origin_y)
+                    kept = False
+                    for stream in streams:
+                        if self._stream_tick(stream, settings, tile_thresholds, frame, events, pointer,
+                                             capture_ns, origin_x, origin_y):
+                            kept = True
+                    if not kept:
+                        # Nothing holds on to the grabbed frame: reuse its buffer
+                        if zero_copy:
+                            spare_raw = frame
                         else:
-                            # Calculate difference
-                            diff = cv2.absdiff(prev_frame, frame_bgr)
-                            gray_diff = cv2.cvtColor(diff, cv2.COLOR_BGR2GRAY)
-                            
-                            # Tile Logic:
-                            # Grid size is simply div x div
-                            grid_w = self.tile_divisions
-                            grid_h = self.tile_divisions
-                            
-                            # Resize diff to grid size using AREA interpolation (averages pixels in the block)
-                            # Note: resizing uint8 to small grid averages values. Small changes (< 1.0 avg) become 0.
-                            # For high sensitivity, this averaging hides details.
-                            
-                            # Special handling for Max Sensitivity (100) or Single Tile
-                            if self.sensitivity == 100:
-                                # Captures single pixel changes regardless of tile size
-                                if cv2.countNonZero(gray_diff) > 0:
-                                    should_save = True
-                            else:
-                                if self.tile_divisions == 1:
-                                    # Use precise mean for full screen
-                                    score = cv2.mean(gray_diff)[0]
-                                else:
-                                    # Use grid approach
-                                    tiled_diff = cv2.resize(gray_diff, (grid_w, grid_h), interpolation=cv2.INTER_AREA)
-                                    score = np.max(tiled_diff)
-                                
-                                threshold = self._get_threshold()
-                                if score > threshold:
-                                    should_save = True
-                            
-                    if should_save:
-                        # Save frame
-                        filename = os.path.join(self.current_session_dir, f"frame_{self.frame_count:05d}.jpg")
-                        # Use Pillow for saving or cv2.imwrite
-                        # cv2.imwrite is faster usually
-                        cv2.imwrite(filename, frame_bgr, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
-                        self.frame_count += 1
-                        prev_frame = frame_bgr
+                            spare_frame = frame
                 except Exception as e:
                     print(f"Error capturing frame: {e}")
+        finally:
+            source.close()
+            for stream in streams:
+                if stream.cursor_log is not None:
+                    stream.cursor_log.close()
+                if stream.preroll is not None:
+                    stream.preroll.close()
 
-                # Sleep to maintain FPS
-                elapsed = time.time() - start_time
-                sleep_time = max(0, interval - elapsed)
-                time.sleep(sleep_time)
+    def _stream_events(self, stream, events, pointer, origin_x, origin_y):
+        # A region's share of the input: pointer events inside it, and
+        # keystrokes while the pointer is over it
+        if stream.rect is None:
+            return events
+        result = []
+        for event in events:
+            _, _, x, y = event
+            at = pointer if x is None else (x - origin_x, y - origin_y)
+            if stream.contains(*at):
+                result.append(event)
+        return result
 
+    def _stream_tick(self, stream, settings, tile_thresholds, frame, events, pointer, capture_ns, origin_x, origin_y):
+        # Triggers, change detection and saving for one output stream, with
+        # the tick's settings snapshot. Returns True when the stream keeps the
+        # grabbed frame itself (whole-screen saves aren't copied), so its
+        # buffer can't be refilled.
+        scheduler = self.scheduler
+        stats = self.stats
+        detector = stream.detector
+        preroll = stream.preroll
+        image = stream.view(frame)
+        sensitivity = settings.sensitivity if stream.sensitivity is None else stream.sensitivity
+        
+        should_save = False
+        reason = None
+        
+        # Check Triggers: the stream's input events since the last tick
+        events = self._stream_events(stream, events, pointer, origin_x, origin_y)
+        if events:
+            for _, kind, _, _ in events:
+                if self._is_trigger(settings, kind, stream.triggers):
+                    should_save = True
+                    if kind == "key":
+                        reason = "key"
+                    else:
+                        reason = reason or "mouse"
+            # Kept for the next saved frame's sidecar record; bounded
+            # in case nothing gets saved for a long time
+            stream.pending_events = coalesce_moves(stream.pending_events + events)[-MAX_LOGGED_EVENTS:]
+        
+        detect_ns = time.monotonic_ns()
+        if not should_save:
+            # Proxy diff first, exact full-res score only where it flags.
+            # Ignore areas are in screen pixels; per-tile sensitivities
+            # refer to the whole-screen grid.
+            ignore = settings.ignore_regions
+            if stream.rect is not None:
+                tile_thresholds = None
+                if ignore:
+                    rx, ry = stream.origin()
+                    ignore = [(x - rx, y - ry, w, h) for x, y, w, h in ignore]
+            detector.configure(stream.tiles or settings.tile_divisions, None if stream.tiles else settings.tile_rows,
+                               settings.proxy_scale, settings.safety_check_ticks, ignore, tile_thresholds)
+            if detector.is_changed(image, sensitivity, self._get_threshold(sensitivity)):
+                should_save = True
+                reason = "initial" if detector.reference is None else "change"
+        
+        # The ticks right after a trigger save anything that differs
+        # at all from the last saved frame, so the result of a burst
+        # of typing is captured even below the sensitivity threshold
+        if reason in ("key", "mouse"):
+            stream.burst_left = settings.burst_frames
+        elif stream.burst_left > 0:
+            stream.burst_left -= 1
+            if not should_save and detector.is_changed(image, 100, 0):
+                should_save = True
+                reason = "burst"
+                
+        detect_elapsed = time.monotonic_ns() - detect_ns
+        
+        # Unsaved frames from just before a trigger or a change go
+        # out first, so the stream stays in capture order
+        if should_save and preroll is not None:
+            if reason in PREROLL_REASONS and len(preroll):
+                self._flush_preroll(stream, capture_ns, settings.quality)
+            else:
+                preroll.clear()
+            stream.candidate_proxy = None
+        
+        # A region is a view into the grabbed frame, whose buffer is
+        # refilled next tick: the stream keeps its own copy
+        saved = image
+        if should_save and stream.rect is not None:
+            saved = image.copy()
+                
+        # Triggers force a save even when nothing on screen
+        # changed; such repeats are written as references
+        duplicate_of, content_key = None, None
+        if should_save and reason in ("key", "mouse"):
+            dedup_ns = time.monotonic_ns()
+            duplicate_of, content_key = stream.writer.find_duplicate(saved)
+            detect_elapsed += time.monotonic_ns() - dedup_ns
+        stats.add("detect", detect_elapsed)
+        
+        if should_save:
+            submit_ns = time.monotonic_ns()
+            # Hand off to the encode/write stage; frame is never
+            # modified after this point, so no copy is needed. BGRA
+            # frames are converted to BGR on the encoder thread.
+            meta = {
+                "t_ns": scheduler.elapsed_ns(capture_ns),
+                "tick": scheduler.ticks - 1,
+                "reason": reason,
+            }
+            if stream.pending_events:
+                rx, ry = stream.origin()
+                meta["events"] = self._event_records(stream.pending_events, scheduler, origin_x + rx, origin_y + ry)
+                stream.pending_events = []
+            stream.writer.submit(saved, settings.quality, meta, content_key, duplicate_of)
+            stats.add("submit", time.monotonic_ns() - submit_ns)
+            scheduler.activity()
+            stats.count("saved", reason)
+            detector.set_reference(saved, image)
+            return saved is frame
+        
+        stats.count("skipped")
+        if preroll is not None:
+            preroll_ns = time.monotonic_ns()
+            # Runs of identical frames are kept once. "Identical" is judged on
+            # the proxy the detector already made this tick, not the full
+            # frame; without a proxy every skipped frame is offered.
+            proxy = detector.last_proxy()
+            previous = stream.candidate_proxy if stream.candidate_proxy is not None else detector.reference_proxy()
+            if proxy is None or previous is None or not np.array_equal(proxy, previous):
+                preroll.push(image, capture_ns, {
+                    "t_ns": scheduler.elapsed_ns(capture_ns),
+                    "tick": scheduler.ticks - 1,
+                    "reason": "preroll",
+                })
+                if proxy is not None:
+                    if stream.candidate_proxy is None or stream.candidate_proxy.shape != proxy.shape:
+                        stream.candidate_proxy = np.empty_like(proxy)
+                    np.copyto(stream.candidate_proxy, proxy)
+            stats.add("preroll", time.monotonic_ns() - preroll_ns)
+        detector.release(image)
+        return False
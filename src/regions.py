@@ -0,0 +1,92 @@
+import re
+
+# Named layouts for --region, laid out on the captured screen at session start
+REGION_PRESETS = ("quadrants", "halves", "thirds")
+
+# Layout of a region session, written next to the region subdirectories
+REGIONS_NAME = "regions.json"
+
+_NAME_RE = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+def parse_region(spec):
+    # NAME=X,Y,W,H[:SENSITIVITY] -> region dict as stored in config.json.
+    # Raises ValueError for anything else.
+    name, sep, rest = spec.partition("=")
+    if not sep or not _NAME_RE.match(name):
+        raise ValueError(f"expected NAME=X,Y,W,H[:SENSITIVITY], got {spec!r}")
+    rect, _, sensitivity = rest.partition(":")
+    values = [int(v) for v in rect.split(",")]
+    if len(values) != 4 or values[2] <= 0 or values[3] <= 0:
+        raise ValueError(f"expected X,Y,W,H with a positive size, got {rect!r}")
+    region = {"name": name, "x": values[0], "y": values[1], "w": values[2], "h": values[3]}
+    if sensitivity:
+        region["sensitivity"] = max(0, min(int(sensitivity), 100))
+    return region
+
+
+def preset_regions(preset, width, height):
+    # The screen split into equal parts; edges absorb odd pixel counts
+    if preset == "quadrants":
+        names, cols, rows = ("top-left", "top-right", "bottom-left", "bottom-right"), 2, 2
+    elif preset == "halves":
+        names, cols, rows = ("left", "right"), 2, 1
+    elif preset == "thirds":
+        names, cols, rows = ("left", "center", "right"), 3, 1
+    else:
+        raise ValueError(f"unknown region preset {preset!r}")
+    xs = [width * i // cols for i in range(cols + 1)]
+    ys = [height * i // rows for i in range(rows + 1)]
+    regions = []
+    for r in range(rows):
+        for c in range(cols):
+            regions.append({"name": names[r * cols + c], "x": xs[c], "y": ys[r],
+                            "w": xs[c + 1] - xs[c], "h": ys[r + 1] - ys[r]})
+    return regions
+
+
+def clip_region(region, width, height):
+    # (x, y, w, h) of the part of the region that is on screen, or None
+    x0 = max(0, int(region["x"]))
+    y0 = max(0, int(region["y"]))
+    x1 = min(width, int(region["x"]) + int(region["w"]))
+    y1 = min(height, int(region["y"]) + int(region["h"]))
+    if x1 <= x0 or y1 <= y0:
+        return None
+    return x0, y0, x1 - x0, y1 - y0
+
+
+class RegionStream:
+    # Capture-loop state of one output stream: the whole screen (rect None)
+    # or one named region of it, with its own change detector, writer,
+    # trigger burst, pre-roll buffer and pending input events
+    def __init__(self, name, rect, writer, detector, preroll=None, sensitivity=None, triggers=None, tiles=None):
+        self.name = name
+        self.rect = rect
+        self.writer = writer
+        self.detector = detector
+        self.preroll = preroll
+        self.sensitivity = sensitivity # None = the recorder's
+        self.triggers = triggers       # None = the recorder's trigger switches
+        self.tiles = tiles             # None = the recorder's detection grid
+        self.burst_left = 0
+        self.pending_events = []
+        self.candidate_proxy = None    # detector proxy of the last frame put in pre-roll
+        self.cursor_log = None         # CursorLog when the cursor is recorded as metadata
+
+    def view(self, frame):
+        # The region's pixels, as a view into the grabbed frame
+        if self.rect is None:
+            return frame
+        x, y, w, h = self.rect
+        return frame[y:y + h, x:x + w]
+
+    def contains(self, x, y):
+        # Pointer position relative to the captured area
+        if self.rect is None:
+            return True
+        rx, ry, w, h = self.rect
+        return rx <= x < rx + w and ry <= y < ry + h
+
+    def origin(self):
+        return (0, 0) if self.rect is None else self.rect[:2]
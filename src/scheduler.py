@@ -0,0 +1,157 @@
+import time
+import threading
+
+# What to do when the loop overruns one or more whole frame slots:
+# skip    -> jump to the current slot and count the missed ones as dropped
+# catchup -> run the missed slots back to back until the loop is on time again
+PACING_POLICIES = ("skip", "catchup")
+
+
+class FrameScheduler:
+    # Paces the capture loop against absolute deadlines on the monotonic clock
+    # (start + n * interval), so an overrun in one tick doesn't push every
+    # later tick back and wall-clock jumps don't affect pacing.
+    #
+    # Adaptive mode (min_fps set): fps is the maximum rate. activity() jumps
+    # to it and holds it for the boost window; after that the rate halves
+    # every further boost window without activity, down to min_fps.
+    #
+    # burst() runs a given number of ticks at a higher rate on top of either
+    # mode, e.g. right after a keystroke.
+    def __init__(self, fps, policy="skip", min_fps=None, boost_s=2.0):
+        self.policy = policy if policy in PACING_POLICIES else "skip"
+        self.fps = None
+        self.rate = None
+        self.interval_ns = 0
+        self.set_fps(fps)
+        self.set_adaptive(min_fps, boost_s)
+        self.start_ns = None
+        self._deadline = None
+        self._last_deadline = None
+        self._last_activity_ns = None
+        self._burst_left = 0
+        self._burst_interval_ns = 0
+        self._wake = threading.Event()
+
+        # Session counters
+        self.ticks = 0
+        self.late = 0
+        self.dropped = 0
+
+    def set_fps(self, fps):
+        fps = max(1, fps)
+        if fps != self.fps:
+            self.fps = fps
+            self._set_rate(fps)
+
+    def set_adaptive(self, min_fps=None, boost_s=2.0):
+        # min_fps=None switches adaptive mode off
+        self.min_fps = min(max(1, min_fps), self.fps) if min_fps else None
+        self.boost_ns = int(max(0.1, boost_s) * 1_000_000_000)
+        if self.min_fps is None and self.rate != self.fps:
+            self._set_rate(self.fps)
+
+    def _set_rate(self, fps):
+        self.rate = fps
+        self.interval_ns = int(1_000_000_000 / fps)
+        # A tick is late once it starts more than a quarter slot after its deadline
+        self.late_tolerance_ns = self.interval_ns // 4
+
+    def start(self):
+        self.start_ns = time.monotonic_ns()
+        self._deadline = self.start_ns
+        self._last_deadline = self.start_ns
+        self._last_activity_ns = self.start_ns
+        self._burst_left = 0
+        self.ticks = 0
+        self.late = 0
+        self.dropped = 0
+
+    def activity(self):
+        # A detected change or an input event. Also called from the input
+        # listener threads: a wait() in progress is cut short so the next tick
+        # comes one full-rate interval after the previous one (or right away),
+        # not at the end of a long idle slot.
+        self._last_activity_ns = time.monotonic_ns()
+        if self.min_fps is None or self._deadline is None:
+            return
+        if self.rate != self.fps:
+            self._set_rate(self.fps)
+        soon = max(self._last_deadline + self.interval_ns, time.monotonic_ns())
+        if soon < self._deadline:
+            self._deadline = soon
+            self._wake.set()
+
+    def burst(self, ticks, fps):
+        # The next `ticks` ticks run at `fps` when that is faster than the
+        # current rate. Like activity(), safe to call from another thread.
+        interval = int(1_000_000_000 / max(1, fps))
+        if ticks <= 0 or interval >= self.interval_ns or self._deadline is None:
+            return
+        self._burst_interval_ns = interval
+        self._burst_left = ticks
+        soon = max(self._last_deadline + interval, time.monotonic_ns())
+        if soon < self._deadline:
+            self._deadline = soon
+            self._wake.set()
+
+    def _update_rate(self, now):
+        idle = now - self._last_activity_ns - self.boost_ns
+        rate = self.fps if idle <= 0 else max(self.min_fps, self.fps * 0.5 ** (idle / self.boost_ns))
+        if rate != self.rate:
+            self._set_rate(rate)
+
+    def wait(self):
+        # Blocks until the next slot and returns its deadline (monotonic ns)
+        if self._deadline is None:
+            self.start()
+
+        now = time.monotonic_ns()
+        if self.min_fps is not None:
+            self._update_rate(now)
+        if now < self._deadline:
+            while True:
+                # Cleared before the deadline is read, so an activity() that
+                # pulls it in from another thread always cuts the wait short
+                self._wake.clear()
+                remaining = self._deadline - time.monotonic_ns()
+                if remaining <= 0:
+                    break
+                self._wake.wait(remaining / 1e9)
+        else:
+            lateness = now - self._deadline
+            if lateness > self.late_tolerance_ns:
+                self.late += 1
+            if self.policy == "skip" and lateness >= self.interval_ns:
+                missed = lateness // self.interval_ns
+                self.dropped += missed
+                self._deadline += missed * self.interval_ns
+
+        deadline = self._deadline
+        self._last_deadline = deadline
+        if self._burst_left > 0:
+            self._burst_left -= 1
+            self._deadline += min(self._burst_interval_ns, self.interval_ns)
+        else:
+            self._deadline += self.interval_ns
+        self.ticks += 1
+        return deadline
+
+    def advance(self):
+        # Counts a tick without waiting, for sources that aren't paced
+        if self._deadline is None:
+            self.start()
+        self.ticks += 1
+        return time.monotonic_ns()
+
+    def elapsed_ns(self, timestamp_ns=None):
+        if self.start_ns is None:
+            return 0
+        if timestamp_ns is None:
+            timestamp_ns = time.monotonic_ns()
+        return timestamp_ns - self.start_ns
+
+    def effective_fps(self):
+        # Ticks actually run per second of the session so far
+        elapsed = self.elapsed_ns()
+        return self.ticks / (elapsed / 1e9) if elapsed > 0 else 0.0
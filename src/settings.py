@@ -0,0 +1,103 @@
+import os
+import json
+import tempfile
+import threading
+from types import MappingProxyType
+
+# Saves closer together than this are merged into one config.json write
+SAVE_DELAY_S = 0.5
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _thaw(value):
+    if isinstance(value, MappingProxyType):
+        return {k: _thaw(v) for k, v in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(v) for v in value]
+    return value
+
+
+class Settings:
+    # Read-only snapshot of a recorder's settings_dict(). The recorder swaps
+    # in a new one whenever a setting changes; the capture loop takes the
+    # current one once per tick, so a tick never sees half an update. Lists
+    # and dicts are frozen into tuples and read-only mappings.
+    __slots__ = ("_values",)
+
+    def __init__(self, values):
+        object.__setattr__(self, "_values", {k: _freeze(v) for k, v in values.items()})
+
+    def __getattr__(self, name):
+        try:
+            return self._values[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __setattr__(self, name, value):
+        raise AttributeError("settings snapshots are read-only")
+
+    def as_dict(self):
+        # Plain lists and dicts again, for json and apply_settings()
+        return {k: _thaw(v) for k, v in self._values.items()}
+
+
+class ConfigWriter:
+    # Writes settings to config.json on a timer thread, so the GUI never
+    # waits on the disk. The first save starts a SAVE_DELAY_S timer and later
+    # ones only replace what it will write, so dragging a slider costs one
+    # write. Each write goes to a temp file that is renamed over the config:
+    # a crash mid-write leaves the previous file, never half of one.
+    def __init__(self, path, delay=SAVE_DELAY_S):
+        self.path = path
+        self.delay = delay
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock() # one write at a time, in order
+        self._pending = None
+        self._timer = None
+
+    def schedule(self, settings):
+        with self._lock:
+            self._pending = settings
+            if self._timer is None:
+                # Not a daemon: a save scheduled just before exit still lands
+                self._timer = threading.Timer(self.delay, self.flush)
+                self._timer.name = "gsr-config-writer"
+                self._timer.start()
+
+    def flush(self):
+        # Writes a pending save now; also what the timer runs
+        with self._write_lock:
+            with self._lock:
+                settings, self._pending = self._pending, None
+                timer, self._timer = self._timer, None
+            if timer is not None and timer is not threading.current_thread():
+                timer.cancel()
+            if settings is not None:
+                self._write(settings.as_dict())
+
+    def _write(self, data):
+        tmp_path = None
+        try:
+            directory = os.path.dirname(self.path) or "."
+            fd, tmp_path = tempfile.mkstemp(prefix=".config-", suffix=".tmp", dir=directory)
+            with os.fdopen(fd, "w") as f:
+                json.dump(data, f, indent=4)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            tmp_path = None
+        except Exception as e:
+            print(f"Error saving config: {e}")
+        finally:
+            if tmp_path is not None:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
@@ -0,0 +1,268 @@
+import os
+import time
+import numpy as np
+import cv2
+
+# Frame sources for the capture loop. A source is opened once per recording
+# and grab() returns the next frame as a BGRA uint8 array (the layout mss
+# produces), or None once the source is exhausted. Every grab returns a fresh
+# buffer, so the loop can keep frames as detector references or in the writer
+# queue without copying them. grab(out) may fill a frame the loop no longer
+# needs instead, so an idle loop doesn't allocate a new frame every tick.
+#
+#   resolution   (width, height) of the frames
+#   origin       (left, top) of the frames in global pointer coordinates
+#   interactive  frames show the live desktop, so input triggers and the
+#                cursor overlay make sense
+#   paced        grab() should be called on the capture schedule; False means
+#                frames are pushed through as fast as the pipeline takes them
+SYNTHETIC_REGIONS = ("typing", "scrolling", "video")
+REPLAY_SPEEDS = ("recorded", "max")
+
+
+class MssSource:
+    # The live screen of one monitor, through mss
+    interactive = True
+    paced = True
+
+    def __init__(self, monitor_index=1):
+        self.monitor_index = monitor_index
+        self._sct = None
+        self._monitor = None
+
+    def _pick_monitor(self, sct):
+        if self.monitor_index < len(sct.monitors):
+            return sct.monitors[self.monitor_index]
+        return None
+
+    @property
+    def resolution(self):
+        if self._monitor is not None:
+            return self._monitor["width"], self._monitor["height"]
+        import mss
+        with mss.mss() as sct:
+            mon = self._pick_monitor(sct)
+        if mon is None:
+            return (1920, 1080) # Fallback
+        return mon["width"], mon["height"]
+
+    @property
+    def origin(self):
+        if self._monitor is None:
+            return 0, 0
+        return self._monitor["left"], self._monitor["top"]
+
+    def open(self):
+        import mss
+        self._sct = mss.mss()
+        self._monitor = self._pick_monitor(self._sct) or self._sct.monitors[0]
+
+    def grab(self, out=None):
+        sct_img = self._sct.grab(self._monitor)
+        # View straight onto the BGRA bytes mss just grabbed. mss allocates a
+        # fresh buffer per grab, so holding on to it is safe; copying it into
+        # `out` would only add a pass over the frame, so out is ignored.
+        return np.frombuffer(sct_img.raw, dtype=np.uint8).reshape(sct_img.height, sct_img.width, 4)
+
+    def close(self):
+        if self._sct is not None:
+            self._sct.close()
+            self._sct = None
+        self._monitor = None
+
+
+class SyntheticSource:
+    # Scripted desktop activity, deterministic per seed and frame number:
+    #   typing     glyphs appear one at a time in an editor pane
+    #   scrolling  a document pane scrolls in bursts, then rests
+    #   video      a player pane changes every frame
+    # Frames outside the active regions never change, like a real desktop.
+    interactive = False
+    paced = True
+
+    def __init__(self, width=1920, height=1080, regions=SYNTHETIC_REGIONS, seed=0, frames=None):
+        self.width = width
+        self.height = height
+        self.regions = [r for r in regions if r in SYNTHETIC_REGIONS]
+        self.seed = seed
+        self.frames = frames # stop after this many frames (None = endless)
+        self.resolution = (width, height)
+        self.origin = (0, 0)
+        self._canvas = None
+        self._n = 0
+
+    def open(self):
+        w, h = self.width, self.height
+        rng = np.random.default_rng(self.seed)
+        self._rng = rng
+        canvas = np.full((h, w, 4), 255, dtype=np.uint8)
+        canvas[: h // 20, :, :3] = (70, 62, 58)               # title bar
+        canvas[h // 20:, : w // 6, :3] = (48, 40, 36)         # sidebar
+        self._canvas = canvas
+        self._n = 0
+
+        # Pane layout: editor top-left, document bottom-left, player on the right
+        top = h // 20
+        mid = top + (h - top) // 2
+        split = w * 3 // 5
+        self._typing = (w // 6 + 8, top + 8, split - 8, mid - 8)
+        self._scroll = (w // 6 + 8, mid + 8, split - 8, h - 8)
+        self._video = (split + 8, top + 8, w - 8, mid)
+        self._line_h = max(6, h // 60)
+        self._glyph_w = max(3, self._line_h // 2)
+        self._caret = [self._typing[0], self._typing[1]]
+
+        # The document that scrolls by: rows of text-like runs
+        x0, y0, x1, y1 = self._scroll
+        doc = np.full((2 * (y1 - y0), x1 - x0, 3), 250, dtype=np.uint8)
+        for y in range(0, doc.shape[0] - self._line_h, self._line_h + 4):
+            length = int(rng.integers(doc.shape[1] // 4, doc.shape[1]))
+            doc[y:y + self._line_h, :length] = 60
+        self._doc = doc
+        self._doc_offset = 0
+        canvas[y0:y1, x0:x1, :3] = doc[: y1 - y0]
+
+    def grab(self, out=None):
+        if self.frames is not None and self._n >= self.frames:
+            return None
+        n = self._n
+        self._n += 1
+        if "typing" in self.regions and n % 3 == 0:
+            self._type_glyph()
+        if "scrolling" in self.regions and n % 60 < 15:
+            self._scroll_step()
+        if "video" in self.regions:
+            self._video_frame(n)
+        if out is not None and out.shape == self._canvas.shape:
+            np.copyto(out, self._canvas)
+            return out
+        return self._canvas.copy()
+
+    def _type_glyph(self):
+        x0, y0, x1, y1 = self._typing
+        cx, cy = self._caret
+        if cx + self._glyph_w >= x1:
+            cx, cy = x0, cy + self._line_h + 4
+        if cy + self._line_h >= y1:
+            # Page full: clear the editor and start over
+            self._canvas[y0:y1, x0:x1, :3] = 255
+            cx, cy = x0, y0
+        if self._rng.random() > 0.15: # the rest are spaces
+            self._canvas[cy:cy + self._line_h, cx:cx + self._glyph_w - 1, :3] = 30
+        self._caret = [cx + self._glyph_w, cy]
+
+    def _scroll_step(self):
+        x0, y0, x1, y1 = self._scroll
+        rows = y1 - y0
+        self._doc_offset = (self._doc_offset + max(1, self._line_h // 2)) % (self._doc.shape[0] - rows)
+        self._canvas[y0:y1, x0:x1, :3] = self._doc[self._doc_offset:self._doc_offset + rows]
+
+    def _video_frame(self, n):
+        x0, y0, x1, y1 = self._video
+        w, h = x1 - x0, y1 - y0
+        # A moving gradient plus a bouncing block, cheap but never the same twice
+        ramp = ((np.arange(w, dtype=np.uint16) + n * 7) % 256).astype(np.uint8)
+        pane = self._canvas[y0:y1, x0:x1]
+        pane[:, :, 0] = ramp
+        pane[:, :, 1] = ramp[::-1]
+        pane[:, :, 2] = (n * 3) % 256
+        bx = (n * 11) % max(1, w - h // 4)
+        pane[h // 3:h // 3 + h // 4, bx:bx + h // 4, :3] = 255
+
+    def close(self):
+        self._canvas = None
+
+
+class ReplaySource:
+    # Streams a recorded session (JPEG sequence or container) back through
+    # the pipeline. "recorded" speed shows each frame from its original
+    # capture time on the capture schedule; "max" hands over one recorded
+    # frame per grab, as fast as the pipeline takes them.
+    interactive = False
+
+    def __init__(self, session_dir, speed="recorded", region=None):
+        self.session_dir = session_dir
+        self.speed = speed if speed in REPLAY_SPEEDS else "recorded"
+        self.paced = self.speed == "recorded"
+        self.region = region
+        self.origin = (0, 0)
+        self._frames = None
+        self._next = None
+        self._resolution = None
+
+    @property
+    def resolution(self):
+        if self._resolution is None:
+            from export import session_frames
+            frames = session_frames(self.session_dir, self.region)
+            first = next(frames, None)
+            frames.close()
+            self._resolution = (first[2].shape[1], first[2].shape[0]) if first else (1920, 1080)
+        return self._resolution
+
+    def open(self):
+        from export import session_frames
+        if not os.path.isdir(self.session_dir):
+            raise FileNotFoundError(f"No such session: {self.session_dir}")
+        self._frames = session_frames(self.session_dir, self.region)
+        self._next = next(self._frames, None)
+        self._t0 = self._next[0] if self._next is not None and self._next[0] is not None else 0
+        self._start_ns = None
+
+    def grab(self, out=None):
+        if self._next is None:
+            return None
+        if self._start_ns is None:
+            self._start_ns = time.monotonic_ns()
+        if self.speed == "max":
+            return self._advance(out)
+
+        # Recorded speed: show the latest frame whose capture time has passed.
+        # Frames without a recorded time advance one per grab.
+        elapsed = time.monotonic_ns() - self._start_ns
+        frame = self._advance(out)
+        while self._next is not None and self._next[0] is not None and self._next[0] - self._t0 <= elapsed:
+            frame = self._advance(frame)
+        return frame
+
+    def _advance(self, out=None):
+        # Converted right away: container frames are updated in place by the
+        # next one, and the loop expects the same BGRA layout as mss
+        _, _, image = self._next
+        self._next = next(self._frames, None)
+        if out is not None and out.shape[:2] != image.shape[:2]:
+            out = None
+        return cv2.cvtColor(image, cv2.COLOR_BGR2BGRA, dst=out)
+
+    def close(self):
+        if self._frames is not None:
+            self._frames.close()
+            self._frames = None
+
+
+def make_source(spec, monitor_index=1):
+    # CLI source spec:
+    #   screen[:MONITOR]
+    #   synthetic[:WxH[:typing,scrolling,video]]
+    #   replay:SESSION_DIR[:recorded|:max]
+    kind, _, rest = (spec or "screen").partition(":")
+    if kind == "synthetic":
+        width, height = 1920, 1080
+        regions = SYNTHETIC_REGIONS
+        if rest:
+            size, _, names = rest.partition(":")
+            if size:
+                w, h = size.lower().split("x")
+                width, height = int(w), int(h)
+            if names:
+                regions = tuple(names.split(","))
+        return SyntheticSource(width, height, regions)
+    if kind == "replay":
+        speed = "recorded"
+        path, sep, suffix = rest.rpartition(":")
+        if sep and suffix in REPLAY_SPEEDS:
+            rest, speed = path, suffix
+        return ReplaySource(rest, speed)
+    if kind == "screen":
+        return MssSource(int(rest) if rest else monitor_index)
+    raise ValueError(f"Unknown frame source: {spec}")
@@ -0,0 +1,124 @@
+import json
+import time
+import threading
+import numpy as np
+
+# Pipeline stages timed by PipelineStats:
+#   grab     frame source grab (screen capture)
+#   convert  BGRA -> BGR conversion (only when zero-copy is off)
+#   cursor   cursor overlay drawing
+#   detect   change detection and duplicate checks
+#   preroll  keeping an unsaved frame in the pre-roll buffer
+#   submit   hand-off to the writer queue (includes time blocked on backpressure)
+#   encode   frame encoding, on the writer threads
+#   write    sink write and sidecar line, in capture order
+STAGES = ("grab", "convert", "cursor", "detect", "preroll", "submit", "encode", "write")
+
+# Frame counters: every captured frame is examined, then either saved or
+# skipped. The change detector adds how often its sparse lattice alone decided
+# "no change", how many periodic full checks it ran and how many of those
+# found a change the lattice missed.
+COUNTERS = ("examined", "saved", "skipped", "prefiltered", "safety_checks", "prefilter_misses")
+
+STATS_NAME = "stats.json"
+
+
+class PipelineStats:
+    # Per-stage latency samples in preallocated fixed-size rings, so a long
+    # session keeps rolling percentiles without growing, plus running totals
+    # and frame counters for the whole session. Safe to feed from the capture
+    # and writer threads at once. When disabled, add() and count() return
+    # immediately.
+    def __init__(self, capacity=4096, enabled=True):
+        self.capacity = max(1, int(capacity))
+        self.enabled = enabled
+        self.start_ns = time.monotonic_ns()
+        self._lock = threading.Lock()
+        self._samples = {stage: np.zeros(self.capacity, dtype=np.int64) for stage in STAGES}
+        self._counts = dict.fromkeys(STAGES, 0)
+        self._totals = dict.fromkeys(STAGES, 0)
+        self._max = dict.fromkeys(STAGES, 0)
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.reasons = {}
+
+    def add(self, stage, ns):
+        if not self.enabled:
+            return
+        with self._lock:
+            n = self._counts[stage]
+            self._samples[stage][n % self.capacity] = ns
+            self._counts[stage] = n + 1
+            self._totals[stage] += ns
+            if ns > self._max[stage]:
+                self._max[stage] = ns
+
+    def count(self, counter, reason=None):
+        # Only called from the capture thread
+        if not self.enabled:
+            return
+        self.counters[counter] += 1
+        if reason is not None:
+            self.reasons[reason] = self.reasons.get(reason, 0) + 1
+
+    def elapsed_s(self):
+        return (time.monotonic_ns() - self.start_ns) / 1e9
+
+    def percentiles(self, stage, points=(50, 95, 99)):
+        # In milliseconds, over the most recent `capacity` samples
+        with self._lock:
+            n = min(self._counts[stage], self.capacity)
+            recent = self._samples[stage][:n].copy()
+        if not n:
+            return {p: 0.0 for p in points}
+        values = np.percentile(recent, points) / 1e6
+        return {p: float(v) for p, v in zip(points, values)}
+
+    def summary(self):
+        # {stage: {count, mean_ms, p50_ms, p95_ms, p99_ms, max_ms}}
+        result = {}
+        for stage in STAGES:
+            count = self._counts[stage]
+            pct = self.percentiles(stage)
+            result[stage] = {
+                "count": count,
+                "mean_ms": self._totals[stage] / count / 1e6 if count else 0.0,
+                "p50_ms": pct[50],
+                "p95_ms": pct[95],
+                "p99_ms": pct[99],
+                "max_ms": self._max[stage] / 1e6,
+            }
+        return result
+
+    def status_line(self, stages=("grab", "detect", "encode", "write")):
+        # One compact line for the CLI: counters, triggers, rolling p50/p99
+        elapsed = int(self.elapsed_s())
+        c = self.counters
+        parts = [f"{elapsed // 3600:02d}:{elapsed // 60 % 60:02d}:{elapsed % 60:02d}",
+                 f"seen {c['examined']} saved {c['saved']} skipped {c['skipped']}"]
+        if self.reasons:
+            parts.append(" ".join(f"{reason} {n}" for reason, n in sorted(self.reasons.items())))
+        if c["prefiltered"]:
+            parts.append(f"fast path {c['prefiltered'] * 100 // max(1, c['examined'])}% missed {c['prefilter_misses']}")
+        timings = []
+        for stage in stages:
+            if self._counts[stage]:
+                pct = self.percentiles(stage, (50, 99))
+                timings.append(f"{stage} {pct[50]:.1f}/{pct[99]:.1f}")
+        if timings:
+            parts.append("p50/p99 ms " + " ".join(timings))
+        return " | ".join(parts)
+
+    def to_dict(self):
+        return {
+            "elapsed_s": self.elapsed_s(),
+            "counters": dict(self.counters),
+            "reasons": dict(self.reasons),
+            "stages": self.summary(),
+        }
+
+    def write_json(self, path, extra=None):
+        data = self.to_dict()
+        if extra:
+            data.update(extra)
+        with open(path, "w") as f:
+            json.dump(data, f, indent=2)
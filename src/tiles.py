@@ -0,0 +1,276 @@
+import math
+import numpy as np
+import cv2
+
+# Per-tile reductions supported by TileGrid
+TILE_REDUCTIONS = ("mean", "sum", "max")
+
+
+def get_tile_divisors(width, height, min_tile_width=16):
+    # Divisions that split both dimensions evenly, keeping tiles at least
+    # min_tile_width pixels wide. These are the steps the Tile Size slider offers.
+    def get_factors(n):
+        f = set()
+        for i in range(1, int(math.sqrt(n)) + 1):
+            if n % i == 0:
+                f.add(i)
+                f.add(n // i)
+        return f
+
+    common = get_factors(width).intersection(get_factors(height))
+    return sorted(n for n in common if (width // n) >= min_tile_width)
+
+
+def to_gray(image, dst=None):
+    if image.ndim == 2:
+        if dst is not None:
+            np.copyto(dst, image)
+            return dst
+        return image
+    if image.shape[2] == 4:
+        return cv2.cvtColor(image, cv2.COLOR_BGRA2GRAY, dst=dst)
+    return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY, dst=dst)
+
+
+class TileGrid:
+    # Exact per-tile change scoring over a cols x rows grid.
+    #
+    # The frame is processed one band of tile rows at a time: diff, gray,
+    # column sums via cv2.reduce, then a reduceat over the column edges. All
+    # accumulation is integer, so small per-tile averages are never rounded
+    # away, and scoring stops at the first band with a tile over threshold.
+    # Grids don't need to be square and tiles don't need to divide the frame
+    # evenly; the remainder is spread across tiles by integer edges.
+    #
+    # exceeds() diffs into scratch buffers kept on the grid, sized for the
+    # tallest band, so scoring allocates nothing frame-sized. A grid must
+    # not be scored from two threads at once.
+    #
+    # set_masks() adds ignore areas and per-tile thresholds. Ignore areas are
+    # split along tile edges once; scoring then subtracts the diff inside
+    # each piece from its tile's sum and averages over the unmasked pixels,
+    # so the per-frame cost grows with the masked area, not the frame.
+    def __init__(self, width, height, cols, rows=None):
+        self.width = width
+        self.height = height
+        self.cols = max(1, min(int(cols), width))
+        self.rows = max(1, min(int(rows or cols), height))
+
+        self.col_edges = [(i * width) // self.cols for i in range(self.cols + 1)]
+        self.row_edges = [(i * height) // self.rows for i in range(self.rows + 1)]
+        self._col_starts = np.array(self.col_edges[:-1], dtype=np.intp)
+        widths = np.diff(self.col_edges)
+        heights = np.diff(self.row_edges)
+        self.areas = np.outer(heights, widths).astype(np.int64)
+        self._band_height = int(heights.max())
+        self._diff_buf = None
+        self._gray_buf = None
+        self._pieces = None     # per tile row: [(c, x0, y0, x1, y1)] of ignore areas
+        self._open_areas = None # pixels per tile outside the ignore areas
+        self._overrides = None  # per-tile thresholds, NaN = the caller's
+        self._threshold_cache = (None, None)
+
+    @property
+    def masked(self):
+        return self._pieces is not None or self._overrides is not None
+
+    def set_masks(self, ignore=None, thresholds=None):
+        # ignore: (x, y, w, h) areas in frame pixels whose changes never count.
+        # thresholds: {(row, col): threshold} replacing the threshold passed
+        # to exceeds() for those tiles.
+        self._pieces = None
+        self._open_areas = None
+        self._overrides = None
+        self._threshold_cache = (None, None)
+        if ignore:
+            pieces = [[] for _ in range(self.rows)]
+            masked = np.zeros((self.height, self.width), dtype=bool)
+            for x, y, w, h in ignore:
+                x0, y0 = max(0, int(x)), max(0, int(y))
+                x1, y1 = min(self.width, int(x) + int(w)), min(self.height, int(y) + int(h))
+                if x1 > x0 and y1 > y0:
+                    masked[y0:y1, x0:x1] = True
+            # Overlapping areas are merged first, so no pixel is subtracted twice
+            for r in range(self.rows):
+                y0, y1 = self.row_edges[r], self.row_edges[r + 1]
+                for c in range(self.cols):
+                    x0, x1 = self.col_edges[c], self.col_edges[c + 1]
+                    tile = masked[y0:y1, x0:x1]
+                    if not tile.any():
+                        continue
+                    for py0, py1, px0, px1 in _runs(tile):
+                        pieces[r].append((c, x0 + px0, y0 + py0, x0 + px1, y0 + py1))
+            if any(pieces):
+                self._pieces = pieces
+                self._open_areas = self.areas.copy()
+                for r, row in enumerate(pieces):
+                    for c, px0, py0, px1, py1 in row:
+                        self._open_areas[r, c] -= (px1 - px0) * (py1 - py0)
+        if thresholds:
+            overrides = np.full((self.rows, self.cols), np.nan)
+            for (r, c), value in thresholds.items():
+                if 0 <= r < self.rows and 0 <= c < self.cols:
+                    overrides[r, c] = value
+            self._overrides = overrides
+
+    def ignored_tiles(self):
+        # (rows, cols) bool: tiles entirely inside the ignore areas
+        if self._open_areas is None:
+            return np.zeros((self.rows, self.cols), dtype=bool)
+        return self._open_areas == 0
+
+    def ignore_pieces(self):
+        # Every (x0, y0, x1, y1) piece of the ignore areas
+        if self._pieces is None:
+            return []
+        return [piece[1:] for row in self._pieces for piece in row]
+
+    def _thresholds(self, threshold):
+        # Per-tile threshold table for a masked grid, rebuilt only when the
+        # caller's threshold changes. Fully ignored tiles can never exceed.
+        if self._threshold_cache[0] == threshold:
+            return self._threshold_cache[1]
+        table = np.full((self.rows, self.cols), float(threshold))
+        if self._overrides is not None:
+            table = np.where(np.isnan(self._overrides), table, self._overrides)
+        if self._open_areas is not None:
+            table[self._open_areas == 0] = np.inf
+        self._threshold_cache = (threshold, table)
+        return table
+
+    def _scratch(self, frame):
+        # (diff, gray) buffers for this frame layout, reallocated only when it changes
+        shape = (self._band_height, frame.shape[1]) + tuple(frame.shape[2:])
+        if self._diff_buf is None or self._diff_buf.shape != shape:
+            self._diff_buf = np.empty(shape, dtype=frame.dtype)
+            self._gray_buf = np.empty(shape[:2], dtype=frame.dtype)
+        return self._diff_buf, self._gray_buf
+
+    @property
+    def tile_count(self):
+        return self.rows * self.cols
+
+    def tile_size(self):
+        # Nominal tile size; edge tiles may be one pixel larger when uneven
+        return self.width // self.cols, self.height // self.rows
+
+    def tile_bounds(self, r, c):
+        return self.col_edges[c], self.row_edges[r], self.col_edges[c + 1], self.row_edges[r + 1]
+
+    def reduce(self, gray_diff, reduction="mean"):
+        # Full rows x cols table of per-tile scores for a gray diff image
+        out = np.empty((self.rows, self.cols), dtype=np.float64 if reduction == "mean" else np.int64)
+        for r in range(self.rows):
+            out[r] = self._reduce_band(gray_diff[self.row_edges[r]:self.row_edges[r + 1]], r, reduction)
+        return out
+
+    def exceeds(self, reference, frame, threshold, reduction="mean", tiles=None):
+        # True as soon as any tile scores above threshold. With tiles=None the
+        # whole grid is scanned band by band; otherwise only the listed (r, c)
+        # tiles are diffed.
+        if self.masked:
+            return self._exceeds_masked(reference, frame, threshold, tiles)
+        diff_buf, gray_buf = self._scratch(frame)
+        if tiles is None:
+            for r in range(self.rows):
+                y0, y1 = self.row_edges[r], self.row_edges[r + 1]
+                diff = cv2.absdiff(reference[y0:y1], frame[y0:y1], dst=diff_buf[:y1 - y0])
+                gray_diff = to_gray(diff, dst=gray_buf[:y1 - y0])
+                scores = self._reduce_band(gray_diff, r, reduction)
+                if np.any(scores > threshold):
+                    return True
+            return False
+
+        for r, c in tiles:
+            x0, y0, x1, y1 = self.tile_bounds(r, c)
+            diff = cv2.absdiff(reference[y0:y1, x0:x1], frame[y0:y1, x0:x1], dst=diff_buf[:y1 - y0, :x1 - x0])
+            gray_diff = to_gray(diff, dst=gray_buf[:y1 - y0, :x1 - x0])
+            if reduction == "max":
+                score = int(gray_diff.max())
+            else:
+                score = int(cv2.sumElems(gray_diff)[0])
+                if reduction == "mean":
+                    score = score / self.areas[r, c]
+            if score > threshold:
+                return True
+        return False
+
+    def _exceeds_masked(self, reference, frame, threshold, tiles):
+        # Per-tile means over the pixels outside the ignore areas, against the
+        # per-tile thresholds. A mean above 0 means any pixel changed, so the
+        # max reduction (threshold 0) is covered too.
+        table = self._thresholds(threshold)
+        areas = self._open_areas if self._open_areas is not None else self.areas
+        diff_buf, gray_buf = self._scratch(frame)
+        if tiles is None:
+            for r in range(self.rows):
+                y0, y1 = self.row_edges[r], self.row_edges[r + 1]
+                diff = cv2.absdiff(reference[y0:y1], frame[y0:y1], dst=diff_buf[:y1 - y0])
+                gray_diff = to_gray(diff, dst=gray_buf[:y1 - y0])
+                sums = self._reduce_band(gray_diff, r, "sum")
+                if self._pieces is not None:
+                    for c, px0, py0, px1, py1 in self._pieces[r]:
+                        sums[c] -= int(cv2.sumElems(gray_diff[py0 - y0:py1 - y0, px0:px1])[0])
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    if np.any(sums / areas[r] > table[r]):
+                        return True
+            return False
+
+        for r, c in tiles:
+            if table[r, c] == np.inf:
+                continue
+            x0, y0, x1, y1 = self.tile_bounds(r, c)
+            diff = cv2.absdiff(reference[y0:y1, x0:x1], frame[y0:y1, x0:x1], dst=diff_buf[:y1 - y0, :x1 - x0])
+            gray_diff = to_gray(diff, dst=gray_buf[:y1 - y0, :x1 - x0])
+            score = int(cv2.sumElems(gray_diff)[0])
+            if self._pieces is not None:
+                for pc, px0, py0, px1, py1 in self._pieces[r]:
+                    if pc == c:
+                        score -= int(cv2.sumElems(gray_diff[py0 - y0:py1 - y0, px0 - x0:px1 - x0])[0])
+            if score / areas[r, c] > table[r, c]:
+                return True
+        return False
+
+    def changed_tiles(self, reference, frame):
+        # Every tile with any byte difference, across all channels. Used for
+        # tile-delta storage, where even sub-threshold changes must be kept.
+        changed = []
+        for r in range(self.rows):
+            y0, y1 = self.row_edges[r], self.row_edges[r + 1]
+            diff = cv2.absdiff(reference[y0:y1], frame[y0:y1])
+            channels = diff.shape[2] if diff.ndim == 3 else 1
+            col_max = cv2.reduce(diff.reshape(y1 - y0, -1), 0, cv2.REDUCE_MAX)[0]
+            if channels > 1:
+                col_max = col_max.reshape(-1, channels).max(axis=1)
+            tile_max = np.maximum.reduceat(col_max, self._col_starts)
+            changed.extend((r, int(c)) for c in np.nonzero(tile_max)[0])
+        return changed
+
+    def _reduce_band(self, band, r, reduction):
+        if reduction == "max":
+            col_max = cv2.reduce(band, 0, cv2.REDUCE_MAX)[0]
+            return np.maximum.reduceat(col_max, self._col_starts)
+        col_sums = cv2.reduce(band, 0, cv2.REDUCE_SUM, dtype=cv2.CV_32S)[0]
+        sums = np.add.reduceat(col_sums.astype(np.int64), self._col_starts)
+        if reduction == "mean":
+            return sums / self.areas[r]
+        return sums
+
+
+def _runs(mask):
+    # Cover the True pixels of a 2D mask with disjoint (y0, y1, x0, x1)
+    # rectangles: runs of identical rows, split into column spans
+    rects = []
+    h = mask.shape[0]
+    y = 0
+    while y < h:
+        row = mask[y]
+        y_end = y + 1
+        while y_end < h and np.array_equal(mask[y_end], row):
+            y_end += 1
+        if row.any():
+            edges = np.flatnonzero(np.diff(np.concatenate(([0], row.view(np.int8), [0]))))
+            for x0, x1 in zip(edges[::2], edges[1::2]):
+                rects.append((y, y_end, int(x0), int(x1)))
+        y = y_end
+    return rects
@@ -1,15 +1,15 @@
 import sys
+import bisect
 import tkinter as tk
 import customtkinter as ctk
 import os
 from tkinter import filedialog
 from recorder import ScreenRecorder
+from tiles import TileGrid, get_tile_divisors
+from stats import STAGES
+from version import get_version
 
-try:
-    from importlib.metadata import version
-    __version__ = version("gsr")
-except Exception:
-    __version__ = "1.0.3"
+__version__ = get_version()
 
 # ── Color Palette ──────────────────────────────────────────────
 BG_DARK       = "#1a1a2e"     # Main background
@@ -54,23 +54,11 @@ class ScreenRecorderApp(ctk.CTk):
         # ── Initialize Recorder ────────────────────────────────
         self.recorder = ScreenRecorder()
         self.is_recording = False
+        self._status_job = None
         self.screen_w, self.screen_h = self.recorder.get_screen_resolution()
 
         # Tile divisors calculation
-        import math
-        def get_factors(n):
-            f = set()
-            for i in range(1, int(math.sqrt(n)) + 1):
-                if n % i == 0:
-                    f.add(i)
-                    f.add(n // i)
-            return f
-
-        w_factors = get_factors(self.screen_w)
-        h_factors = get_factors(self.screen_h)
-        common = sorted(list(w_factors.intersection(h_factors)))
-        min_tile_width = 16
-        self.divisors = sorted([n for n in common if (self.screen_w // n) >= min_tile_width])
+        self.divisors = get_tile_divisors(self.screen_w, self.screen_h, min_tile_width=16)
         target_width = 960
         best_div = min(self.divisors, key=lambda x: abs((self.screen_w // x) - target_width))
         default_index = self.divisors.index(best_div)
@@ -191,10 +179,35 @@ class ScreenRecorderApp(ctk.CTk):
             1, 60, self.update_fps_lbl, r=2, steps=59
         )
 
+        # Adaptive FPS: the slider above becomes the maximum rate
+        self.check_adaptive = self._make_switch(
+            capture_card, "Adaptive FPS", self.recorder.adaptive_fps, self.toggle_adaptive_fps, r=3, colspan=2
+        )
+
+        # Idle rate and how long a change keeps the full rate; adaptive only
+        self.label_min_fps, self.slider_min_fps, self.val_min_fps = self._make_slider(
+            capture_card, "Min FPS", self.recorder.min_fps,
+            1, 60, self.update_min_fps_lbl, r=4, steps=59
+        )
+        self.label_boost = ctk.CTkLabel(
+            capture_card, text="Boost (s)", font=("Roboto", 13),
+            text_color=TEXT_SECONDARY, anchor="w"
+        )
+        self.label_boost.grid(row=5 + capture_card._content_row_offset, column=0, padx=(12, 6), pady=10, sticky="w")
+        self.entry_boost = ctk.CTkEntry(
+            capture_card, width=70, font=("Roboto", 13),
+            fg_color=SLIDER_BG, border_color=CARD_BORDER, text_color=TEXT_PRIMARY
+        )
+        self.entry_boost.insert(0, f"{self.recorder.boost_window:g}")
+        self.entry_boost.grid(row=5 + capture_card._content_row_offset, column=2, padx=(4, 12), pady=10, sticky="e")
+        self.entry_boost.bind("<Return>", self.update_boost_window)
+        self.entry_boost.bind("<FocusOut>", self.update_boost_window)
+        self._update_fps_label()
+
         # Quality
         self.label_qual, self.slider_qual, self.val_qual = self._make_slider(
             capture_card, "Quality", self.recorder.quality,
-            1, 100, self.update_qual_lbl, r=3, steps=99
+            1, 100, self.update_qual_lbl, r=6, steps=99
         )
 
         # ── Populate Triggers Card (single column of switches) ─
@@ -353,6 +366,22 @@ class ScreenRecorderApp(ctk.CTk):
         )
         self.btn_dir.grid(row=0 + out_offset, column=1, padx=12, pady=(8, 16), sticky="e")
 
+        # Ignore areas: changes inside them never trigger a save
+        self.ignore_var = tk.StringVar(value=self._ignore_text())
+        ignore_label = ctk.CTkLabel(
+            output_card, textvariable=self.ignore_var, text_color=TEXT_SECONDARY,
+            font=("Roboto", 11), anchor="w"
+        )
+        ignore_label.grid(row=1 + out_offset, column=0, padx=12, pady=(0, 16), sticky="ew")
+
+        self.btn_ignore = ctk.CTkButton(
+            output_card, text="Ignore Areas…", width=90, height=28,
+            command=self.edit_ignore_areas,
+            fg_color=CARD_BORDER, hover_color=SLIDER_BG,
+            font=("Roboto", 12), corner_radius=6
+        )
+        self.btn_ignore.grid(row=1 + out_offset, column=1, padx=12, pady=(0, 16), sticky="e")
+
         # ── Record Button (fixed at bottom) ────────────────────
         self.btn_record = ctk.CTkButton(
             self, text="START RECORDING", command=self.toggle_recording,
@@ -471,6 +500,7 @@ class ScreenRecorderApp(ctk.CTk):
         if self.is_recording:
             self.stop_recording()
         self.recorder.save_settings()
+        self.recorder.flush_settings()
         self.quit()
 
     def toggle_recording(self):
@@ -485,8 +515,31 @@ class ScreenRecorderApp(ctk.CTk):
         self.btn_record.configure(text="STOP RECORDING", fg_color=ACCENT_RED, hover_color=ACCENT_RED_H)
         self.status_var.set("Recording…")
         self.label_status.configure(text_color=ACCENT_RED)
+        self._status_job = self.after(1000, self._poll_status)
+
+    def _poll_status(self):
+        # Live frame counters and the slowest stage's rolling p99
+        self._status_job = None
+        if not self.is_recording:
+            return
+        stats = self.recorder.stats
+        if stats is not None and stats.enabled:
+            counters = stats.counters
+            text = f"Recording… {counters['saved']} saved / {counters['examined']} seen"
+            p99 = {stage: stats.percentiles(stage, (99,))[99] for stage in STAGES}
+            slowest = max(p99, key=p99.get)
+            if p99[slowest]:
+                text += f" · {slowest} p99 {p99[slowest]:.0f} ms"
+            scheduler = self.recorder.scheduler
+            if scheduler is not None and scheduler.min_fps is not None:
+                text += f" · {scheduler.rate:.0f} fps"
+            self.status_var.set(text)
+        self._status_job = self.after(1000, self._poll_status)
 
     def stop_recording(self):
+        if self._status_job is not None:
+            self.after_cancel(self._status_job)
+            self._status_job = None
         self.recorder.stop_recording()
         self.is_recording = False
         self.btn_record.configure(text="START RECORDING", fg_color=ACCENT_GREEN, hover_color=ACCENT_GREEN_H)
@@ -529,21 +582,64 @@ class ScreenRecorderApp(ctk.CTk):
             self.recorder.set_output_dir(directory)
             self.dir_var.set(directory)
 
+    def _ignore_text(self):
+        count = len(self.recorder.ignore_regions)
+        text = f"Ignored areas: {count}" if count else "No ignored areas"
+        tiles = len(self.recorder.tile_sensitivity)
+        return text + (f" · {tiles} tiles with their own sensitivity" if tiles else "")
+
+    def edit_ignore_areas(self):
+        if self.is_recording:
+            self.status_var.set("Stop recording to edit ignore areas")
+            return
+        IgnoreAreaEditor(self, self.recorder, on_save=lambda: self.ignore_var.set(self._ignore_text()))
+
     def toggle_key_capture(self):
         enabled = bool(self.check_key.get())
         self.recorder.set_capture_on_keystroke(enabled)
         self.recorder.save_settings()
 
+    def toggle_adaptive_fps(self):
+        self.recorder.set_adaptive_fps(bool(self.check_adaptive.get()))
+        self._update_fps_label()
+        self.recorder.save_settings()
+
+    def _update_fps_label(self):
+        self.label_fps.configure(text="Max FPS" if self.recorder.adaptive_fps else "FPS")
+        # Min FPS and the boost window only mean something while adaptive
+        for widget in (self.label_min_fps, self.slider_min_fps, self.val_min_fps, self.label_boost, self.entry_boost):
+            if self.recorder.adaptive_fps:
+                widget.grid()
+            else:
+                widget.grid_remove()
+        self._fit_height()
+
+    def _fit_height(self):
+        # The window isn't resizable: grow or shrink it to the rows shown
+        self.update_idletasks()
+        height = max(580, self.winfo_reqheight())
+        self.minsize(450, height)
+        self.geometry(f"550x{height}")
+
+    def update_boost_window(self, event=None):
+        try:
+            self.recorder.set_boost_window(float(self.entry_boost.get()))
+            self.recorder.save_settings()
+        except ValueError:
+            self.status_var.set("Boost window must be a number of seconds")
+        self.entry_boost.delete(0, "end")
+        self.entry_boost.insert(0, f"{self.recorder.boost_window:g}")
+
     def toggle_mouse_click(self):
-        self.recorder.capture_mouse_click = bool(self.check_click.get())
+        self.recorder.set_mouse_triggers(click=bool(self.check_click.get()))
         self.recorder.save_settings()
 
     def toggle_mouse_scroll(self):
-        self.recorder.capture_mouse_scroll = bool(self.check_scroll.get())
+        self.recorder.set_mouse_triggers(scroll=bool(self.check_scroll.get()))
         self.recorder.save_settings()
 
     def toggle_mouse_move(self):
-        self.recorder.capture_mouse_move = bool(self.check_move.get())
+        self.recorder.set_mouse_triggers(move=bool(self.check_move.get()))
         self.recorder.save_settings()
 
 
@@ -551,6 +647,7 @@ class ScreenRecorderApp(ctk.CTk):
         sens = int(value)
         self.val_sens.configure(text=str(sens))
         self.recorder.set_sensitivity(sens)
+        self.recorder.save_settings()
 
     def update_tile_lbl(self, value):
         index = int(value + 0.5)
@@ -560,31 +657,227 @@ class ScreenRecorderApp(ctk.CTk):
         self.recorder.set_tile_divisions(divs)
         tw, th = self.recorder.get_tile_resolution()
         self.val_tile.configure(text=f"{tw}×{th}")
+        self.recorder.save_settings()
 
     def update_fps_lbl(self, value):
         fps = int(value)
         self.val_fps.configure(text=str(fps))
         self.recorder.set_fps(fps)
+        self.recorder.save_settings()
+
+    def update_min_fps_lbl(self, value):
+        fps = int(value)
+        self.val_min_fps.configure(text=str(fps))
+        self.recorder.set_min_fps(fps)
+        self.recorder.save_settings()
 
     def update_qual_lbl(self, value):
         qual = int(value)
         self.val_qual.configure(text=f"{qual}%")
         self.recorder.set_quality(qual)
+        self.recorder.save_settings()
 
     def update_csize_lbl(self, value):
         size = int(value)
         self.val_csize.configure(text=str(size))
-        self.recorder.cursor_size = size
+        self.recorder.set_cursor(size=size)
         self.recorder.save_settings()
 
     def update_cstyle(self, icon):
         style = self._cursor_icon_map.get(icon, "dot")
         if style == "none":
-            self.recorder.show_cursor = False
+            self.recorder.set_cursor(show=False)
+        else:
+            self.recorder.set_cursor(show=True, style=style)
+        self.recorder.save_settings()
+
+
+class IgnoreAreaEditor(ctk.CTkToplevel):
+    # A screenshot with the recorder's ignore areas drawn over it: drag to
+    # add an area, right-click one to remove it. In tile mode the detection
+    # grid is shown instead: click a tile to give it the slider's
+    # sensitivity, right-click it to go back to the global one.
+    MAX_WIDTH = 960
+    HINTS = {
+        "Areas": "Drag to add an area · right-click an area to remove it",
+        "Tiles": "Click a tile to set its sensitivity · right-click to reset it",
+    }
+
+    def __init__(self, master, recorder, on_save=None):
+        super().__init__(master)
+        self.title("Ignore Areas")
+        self.configure(fg_color=BG_DARK)
+        self.recorder = recorder
+        self.on_save = on_save
+        self.areas = [list(area) for area in recorder.ignore_regions]
+        self.tile_sensitivity = dict(recorder.tile_sensitivity)
+        self.mode = "Areas"
+
+        w, h = recorder.get_screen_resolution()
+        self.grid_tiles = TileGrid(w, h, recorder.tile_divisions, recorder.tile_rows)
+        self.scale = min(1.0, self.MAX_WIDTH / w)
+        view_w, view_h = int(w * self.scale), int(h * self.scale)
+        self.canvas = tk.Canvas(self, width=view_w, height=view_h, bg=CARD_BG, highlightthickness=0)
+        self.canvas.grid(row=0, column=0, columnspan=3, padx=12, pady=(12, 6))
+        self._photo = self._screenshot(view_w, view_h)
+        if self._photo is not None:
+            self.canvas.create_image(0, 0, image=self._photo, anchor="nw")
+
+        self.hint_var = tk.StringVar(value=self.HINTS[self.mode])
+        hint = ctk.CTkLabel(
+            self, textvariable=self.hint_var,
+            font=("Roboto", 11), text_color=TEXT_SECONDARY
+        )
+        hint.grid(row=1, column=0, padx=12, pady=(0, 8), sticky="w")
+        ctk.CTkButton(self, text="Clear", width=80, command=self.clear,
+                      fg_color=CARD_BORDER, hover_color=SLIDER_BG).grid(row=1, column=1, padx=4, pady=(0, 8))
+        ctk.CTkButton(self, text="Save", width=80, command=self.save,
+                      fg_color=ACCENT_GREEN, hover_color=ACCENT_GREEN_H).grid(row=1, column=2, padx=(4, 12), pady=(0, 8))
+
+        # Areas or per-tile sensitivity, and the value a clicked tile gets
+        tools = ctk.CTkFrame(self, fg_color="transparent")
+        tools.grid(row=2, column=0, columnspan=3, padx=12, pady=(0, 12), sticky="ew")
+        self.seg_mode = ctk.CTkSegmentedButton(
+            tools, values=list(self.HINTS), command=self.set_mode,
+            selected_color=ACCENT_GREEN, selected_hover_color=ACCENT_GREEN_H,
+            unselected_color=CARD_BG, unselected_hover_color=SLIDER_BG,
+        )
+        self.seg_mode.set(self.mode)
+        self.seg_mode.pack(side="left")
+        self.tile_sens_var = tk.StringVar(value=f"Tile sensitivity: {recorder.sensitivity}")
+        ctk.CTkLabel(tools, textvariable=self.tile_sens_var, font=("Roboto", 11),
+                     text_color=TEXT_SECONDARY).pack(side="left", padx=(16, 6))
+        self.slider_tile_sens = ctk.CTkSlider(
+            tools, from_=0, to=100, number_of_steps=100, command=self._on_tile_sens,
+            fg_color=SLIDER_BG, progress_color=ACCENT_GREEN,
+            button_color=SLIDER_BTN, button_hover_color="#ffffff",
+            height=16, corner_radius=8
+        )
+        self.slider_tile_sens.set(recorder.sensitivity)
+        self.slider_tile_sens.pack(side="left", fill="x", expand=True)
+
+        self._start = None
+        self._rubber = None
+        self.canvas.bind("<ButtonPress-1>", self._on_press)
+        self.canvas.bind("<B1-Motion>", self._on_drag)
+        self.canvas.bind("<ButtonRelease-1>", self._on_release)
+        self.canvas.bind("<Button-3>", self._on_remove)
+        self._redraw()
+        self.grab_set()
+
+    def _screenshot(self, width, height):
+        try:
+            from PIL import Image, ImageTk
+            import cv2
+            source = self.recorder.source
+            source.open()
+            try:
+                frame = source.grab()
+            finally:
+                source.close()
+            if frame is None:
+                return None
+            rgb = cv2.cvtColor(frame, cv2.COLOR_BGRA2RGB)
+            return ImageTk.PhotoImage(Image.fromarray(rgb).resize((width, height)))
+        except Exception as e:
+            print(f"Error taking screenshot: {e}")
+            return None
+
+    def _redraw(self):
+        self.canvas.delete("area")
+        s = self.scale
+        for x, y, w, h in self.areas:
+            self.canvas.create_rectangle(x * s, y * s, (x + w) * s, (y + h) * s,
+                                         outline=ACCENT_RED, width=2, stipple="gray25",
+                                         fill=ACCENT_RED, tags="area")
+        if self.mode != "Tiles":
+            return
+        grid = self.grid_tiles
+        for r in range(grid.rows):
+            for c in range(grid.cols):
+                x0, y0, x1, y1 = grid.tile_bounds(r, c)
+                sensitivity = self.tile_sensitivity.get(f"{r},{c}")
+                self.canvas.create_rectangle(x0 * s, y0 * s, x1 * s, y1 * s,
+                                             outline=TEXT_SECONDARY if sensitivity is None else ACCENT_GREEN,
+                                             width=1 if sensitivity is None else 2, tags="area")
+                if sensitivity is not None:
+                    self.canvas.create_text((x0 + x1) * s / 2, (y0 + y1) * s / 2, text=str(sensitivity),
+                                            fill=ACCENT_GREEN, font=("Roboto", 14, "bold"), tags="area")
+
+    def set_mode(self, mode):
+        self.mode = mode
+        self.hint_var.set(self.HINTS[mode])
+        self._redraw()
+
+    def _on_tile_sens(self, value):
+        self.tile_sens_var.set(f"Tile sensitivity: {int(value)}")
+
+    def _tile_at(self, event):
+        grid = self.grid_tiles
+        c = bisect.bisect_right(grid.col_edges, event.x / self.scale) - 1
+        r = bisect.bisect_right(grid.row_edges, event.y / self.scale) - 1
+        if 0 <= r < grid.rows and 0 <= c < grid.cols:
+            return f"{r},{c}"
+        return None
+
+    def _on_press(self, event):
+        if self.mode == "Tiles":
+            tile = self._tile_at(event)
+            if tile is not None:
+                self.tile_sensitivity[tile] = int(self.slider_tile_sens.get())
+                self._redraw()
+            return
+        self._start = (event.x, event.y)
+        self._rubber = self.canvas.create_rectangle(event.x, event.y, event.x, event.y,
+                                                    outline=ACCENT_GREEN, width=2)
+
+    def _on_drag(self, event):
+        if self._rubber is not None:
+            x0, y0 = self._start
+            self.canvas.coords(self._rubber, x0, y0, event.x, event.y)
+
+    def _on_release(self, event):
+        if self._rubber is None:
+            return
+        self.canvas.delete(self._rubber)
+        self._rubber = None
+        x0, y0 = self._start
+        x0, x1 = sorted((x0, event.x))
+        y0, y1 = sorted((y0, event.y))
+        if x1 - x0 < 3 or y1 - y0 < 3:
+            return # a click, not a drag
+        s = self.scale
+        self.areas.append([int(x0 / s), int(y0 / s), int((x1 - x0) / s), int((y1 - y0) / s)])
+        self._redraw()
+
+    def _on_remove(self, event):
+        if self.mode == "Tiles":
+            self.tile_sensitivity.pop(self._tile_at(event), None)
+            self._redraw()
+            return
+        s = self.scale
+        x, y = event.x / s, event.y / s
+        for area in reversed(self.areas):
+            ax, ay, aw, ah = area
+            if ax <= x < ax + aw and ay <= y < ay + ah:
+                self.areas.remove(area)
+                break
+        self._redraw()
+
+    def clear(self):
+        if self.mode == "Tiles":
+            self.tile_sensitivity = {}
         else:
-            self.recorder.show_cursor = True
-            self.recorder.cursor_style = style
+            self.areas = []
+        self._redraw()
+
+    def save(self):
+        self.recorder.set_ignore_regions(self.areas)
+        self.recorder.set_tile_sensitivity([f"{tile}={value}" for tile, value in self.tile_sensitivity.items()] or ["none"])
         self.recorder.save_settings()
+        if self.on_save is not None:
+            self.on_save()
+        self.destroy()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,30 @@
+import os
+
+# The version gsr reports: --version, the GUI title and bench reports. Only
+# the standard library, so importing it costs main.py nothing at startup.
+
+def _source_version():
+    # Running from a source checkout: the version in pyproject.toml
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "pyproject.toml")
+    try:
+        with open(path) as f:
+            for line in f:
+                key, sep, value = line.partition("=")
+                if sep and key.strip() == "version":
+                    return value.strip().strip('"')
+    except OSError:
+        pass
+    return None
+
+def get_version():
+    # A source checkout reports its own pyproject.toml, not whatever gsr is
+    # installed alongside it. importlib.metadata is imported here, not at
+    # the top: it is only worth its import time when the version is asked for.
+    source = _source_version()
+    if source:
+        return source
+    try:
+        from importlib.metadata import version
+        return version("gsr")
+    except Exception:
+        return "unknown"
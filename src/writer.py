@@ -0,0 +1,369 @@
+import os
+import json
+import time
+import shutil
+import threading
+import collections
+import cv2
+from dedup import DUPLICATE_PREVIOUS, HashIndex, frame_key, frame_hash
+from encoders import get_encoder
+from preroll import EncodedFrame
+
+# Backpressure policies for when the encoders fall behind the capture loop:
+# block   -> capture thread waits for a free queue slot (never loses frames)
+# drop    -> the oldest frame still waiting for an encoder is discarded
+# degrade -> encoder quality is lowered as the queue fills, then blocks when full
+BACKPRESSURE_POLICIES = ("block", "drop", "degrade")
+
+# Per-frame sidecar written next to the frames, one JSON object per saved frame
+SIDECAR_NAME = "frames.jsonl"
+
+
+class SequenceSink:
+    # One numbered image file per frame, the layout NLEs import directly
+    def __init__(self, session_dir, extension=".jpg"):
+        self.session_dir = session_dir
+        self.extension = extension
+        self.frame_count = 0
+
+    def write(self, data, meta):
+        frame = self.frame_count
+        name = f"frame_{frame:05d}{self.extension}"
+        with open(os.path.join(self.session_dir, name), "wb") as f:
+            f.write(data)
+        self.frame_count += 1
+        return frame, {"file": name}
+
+    def write_duplicate(self, target, meta):
+        # The sequence must stay gapless for NLE import, so a repeated frame
+        # still gets its own name, as a hard link to the original where possible
+        frame = self.frame_count
+        name = f"frame_{frame:05d}{self.extension}"
+        source = os.path.join(self.session_dir, target[1]["file"])
+        path = os.path.join(self.session_dir, name)
+        try:
+            os.link(source, path)
+        except OSError:
+            shutil.copyfile(source, path)
+        self.frame_count += 1
+        return frame, {"file": name, "duplicate_of": target[0]}
+
+    def close(self):
+        pass
+
+
+class FrameWriter:
+    def __init__(self, session_dir, workers=2, queue_size=8, policy="block", min_quality=50, sink=None,
+                 delta_grid=None, keyframe_interval=30, dedup=False, encoder=None, stats=None):
+        self.session_dir = session_dir
+        # Optional PipelineStats fed with encode and write latencies
+        self.stats = stats
+        self.encoder = encoder if encoder is not None else get_encoder()
+        # Where encoded frames end up: an image sequence unless told otherwise
+        self.sink = sink if sink is not None else SequenceSink(session_dir, self.encoder.extension)
+        # Tile-delta mode: between keyframes, only tiles of delta_grid that differ
+        # from the previous frame are encoded
+        self.delta_grid = delta_grid
+        self.keyframe_interval = max(1, int(keyframe_interval))
+        self.workers = max(1, int(workers))
+        self.queue_size = max(1, int(queue_size))
+        self.policy = policy if policy in BACKPRESSURE_POLICIES else "block"
+        self.min_quality = min_quality
+        # Content hashes of written frames, so a repeated screen can be stored
+        # as a reference to the earlier frame instead of being encoded again
+        self.hashes = HashIndex() if dedup else None
+
+        self._threads = []
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._pending = collections.deque()  # (seq, frame, quality, meta, prev, hash, duplicate_of) waiting for an encoder
+        self._pending_frames = 0             # of those, full frames: what queue_size bounds
+        self._encoded = {}                   # seq -> (payload, meta, (key, hash), duplicate, source), or None if dropped/failed
+        self._sidecar = None
+        self._next_seq = 0
+        self._next_write = 0
+        self._closing = False
+        self._last_submitted = None          # (seq, frame) the next delta is taken against
+        self._lost = set()                   # seqs that were dropped or failed to encode, from the last one dequeued on
+        self._since_keyframe = None
+        self._prev_written = None            # (seq, target) of the last frame written
+
+        # Session counters
+        self.frame_count = 0
+        self.dropped = 0
+        self.degraded = 0
+        self.duplicates = 0
+        self.bytes_saved = 0
+        self.encode_ns = 0                   # total time spent encoding, for the average cost of a frame
+        self.encoded = 0
+        self.hash_ns = 0                     # capture-thread time spent checking for duplicates
+
+    def start(self):
+        self._sidecar = open(os.path.join(self.session_dir, SIDECAR_NAME), "a")
+        for i in range(self.workers):
+            t = threading.Thread(target=self._encode_loop, name=f"gsr-writer-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    @property
+    def queue_depth(self):
+        return len(self._pending)
+
+    def find_duplicate(self, frame):
+        # Capture-thread check for trigger-forced frames. Returns
+        # (duplicate_of, content_key) to pass on to submit(). A frame identical
+        # to the one submitted just before it (the common case: a modifier key
+        # or a click on something inert) is caught with an exact compare; older
+        # repeats are looked up by frame_key() in the index of written frames.
+        # Such a match is only a candidate: the encoder thread confirms it
+        # against the full frame_hash() before writing a reference.
+        if self.hashes is None:
+            return None, None
+        start = time.perf_counter_ns()
+        try:
+            prev = self._last_submitted
+            if (prev is not None and prev[1].shape == frame.shape
+                    and cv2.norm(prev[1], frame, cv2.NORM_INF) == 0):
+                return DUPLICATE_PREVIOUS, None
+            content_key = frame_key(frame)
+            return self.hashes.get(content_key), content_key
+        finally:
+            self.hash_ns += time.perf_counter_ns() - start
+
+    def submit(self, frame, quality, meta=None, content_key=None, duplicate_of=None):
+        # meta is recorded in the sidecar for this frame (capture time, tick, ...).
+        # duplicate_of comes from find_duplicate(): such frames are written as a
+        # reference to the frame they repeat, once confirmed. An
+        # EncodedFrame (pre-roll) is decoded by the encoder and always stored
+        # whole; it is small until then, so it never waits for a slot.
+        encoded = isinstance(frame, EncodedFrame)
+        with self._cond:
+            if encoded:
+                pass
+            elif self.policy == "drop":
+                while self._pending_frames >= self.queue_size:
+                    item = self._pending.popleft()
+                    if not isinstance(item[1], EncodedFrame):
+                        self._pending_frames -= 1
+                    self._encoded[item[0]] = None
+                    self._lost.add(item[0])
+                    self.dropped += 1
+            else:
+                if self.policy == "degrade":
+                    quality = self._degraded_quality(quality)
+                while self._pending_frames >= self.queue_size and not self._closing:
+                    self._cond.wait()
+
+            seq = self._next_seq
+            self._next_seq += 1
+            self._pending.append((seq, frame, quality, meta, self._last_submitted, content_key, duplicate_of))
+            if not encoded:
+                self._pending_frames += 1
+            # Nothing to take a delta against, or to compare a repeat with,
+            # until the pre-roll frame is decoded
+            self._last_submitted = None if encoded else (seq, frame)
+            self._cond.notify_all()
+
+    def close(self):
+        # Let the encoders finish everything that was queued, then flush in order
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        for t in self._threads:
+            t.join()
+        self._threads = []
+        self._flush()
+        self.sink.close()
+        if self._sidecar:
+            self._sidecar.close()
+            self._sidecar = None
+
+    def _degraded_quality(self, quality):
+        # Scale quality down linearly once the queue is more than half full
+        fill = self._pending_frames / self.queue_size
+        if fill <= 0.5 or quality <= self.min_quality:
+            return quality
+        self.degraded += 1
+        scale = (fill - 0.5) * 2
+        return int(quality - (quality - self.min_quality) * scale)
+
+    def _encode_loop(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closing:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                seq, frame, quality, meta, prev, content_key, duplicate_of = self._pending.popleft()
+                encoded = isinstance(frame, EncodedFrame)
+                if not encoded:
+                    self._pending_frames -= 1
+                # Frames leave the queue in seq order, so a dropped previous frame
+                # is already known here. One whose encode is still running on
+                # another thread may yet fail: _flush() catches that.
+                delta_ref = None
+                if duplicate_of == DUPLICATE_PREVIOUS:
+                    # Nothing to encode; resolved against the written frames in _flush
+                    self._encoded[seq] = (None, meta, None, (duplicate_of, frame, quality), None)
+                elif duplicate_of is not None:
+                    # An index candidate: a reference if the hash below confirms
+                    # it, otherwise stored whole
+                    pass
+                elif self.delta_grid is not None:
+                    if (encoded or prev is None or prev[0] in self._lost or self._since_keyframe is None
+                            or self._since_keyframe + 1 >= self.keyframe_interval):
+                        self._since_keyframe = 0
+                    else:
+                        self._since_keyframe += 1
+                        delta_ref = prev[1]
+                # Later frames only ever look back one seq from here on
+                self._lost = {s for s in self._lost if s >= seq}
+                # A slot just freed up for a blocked producer
+                self._cond.notify_all()
+
+            if duplicate_of == DUPLICATE_PREVIOUS:
+                self._flush()
+                continue
+
+            data = None
+            indexed = None
+            repeats = None
+            try:
+                if encoded:
+                    frame = frame.decode()
+                    if frame is None:
+                        raise ValueError("unreadable pre-roll frame")
+                if self.hashes is not None:
+                    # Hashed here rather than on the capture thread; trigger-forced
+                    # frames arrive with their key from find_duplicate()
+                    indexed = (frame_key(frame) if content_key is None else content_key, frame_hash(frame))
+                    if duplicate_of is not None and duplicate_of[0] == indexed[1]:
+                        repeats = duplicate_of[1]
+                start = time.perf_counter_ns()
+                if repeats is None:
+                    if delta_ref is not None:
+                        data = self._encode_delta(frame, delta_ref, quality)
+                    else:
+                        data = self._encode(frame, quality)
+                elapsed = time.perf_counter_ns() - start
+            except Exception as e:
+                data = None
+                print(f"Error encoding frame: {e}")
+
+            with self._cond:
+                if repeats is not None:
+                    self._encoded[seq] = (None, meta, None, (repeats, frame, quality), None)
+                elif data is None:
+                    self._lost.add(seq)
+                    self._encoded[seq] = None
+                else:
+                    # A delta keeps its frame, to be encoded whole if the
+                    # frame it was taken against is never written
+                    source = (frame, quality) if delta_ref is not None else None
+                    self._encoded[seq] = (data, meta, indexed, None, source)
+                    self.encode_ns += elapsed
+                    self.encoded += 1
+            if data is not None and repeats is None and self.stats is not None:
+                self.stats.add("encode", elapsed)
+            self._flush()
+
+    def _encode(self, frame, quality):
+        # Zero-copy captures arrive as raw BGRA; the encoder converts only
+        # the frames that get saved
+        return self.encoder.encode(frame, quality)
+
+    def _encode_delta(self, frame, reference, quality):
+        # A list of (x, y, payload) for the tiles that differ from the previous
+        # frame; an empty list means the frame repeats the previous one
+        tiles = []
+        for r, c in self.delta_grid.changed_tiles(reference, frame):
+            x0, y0, x1, y1 = self.delta_grid.tile_bounds(r, c)
+            buf = self._encode(frame[y0:y1, x0:x1], quality)
+            if buf is None:
+                return None
+            tiles.append((x0, y0, buf))
+        return tiles
+
+    def _flush(self):
+        # Writes are serialized and strictly in capture order, so frame numbers
+        # stay gapless even when encoders finish out of order or frames are dropped.
+        with self._write_lock:
+            while True:
+                with self._cond:
+                    if self._next_write not in self._encoded:
+                        return
+                    entry = self._encoded.pop(self._next_write)
+                    self._next_write += 1
+                if entry is None:
+                    continue
+
+                seq = self._next_write - 1
+                data, meta, indexed, duplicate, source = entry
+                start = time.perf_counter_ns()
+                try:
+                    target = None
+                    if source is not None and (self._prev_written is None or self._prev_written[0] != seq - 1):
+                        # The frame this delta was taken against failed after
+                        # the delta was queued: store this one as a keyframe
+                        data = self._encode(source[0], source[1])
+                        if data is None:
+                            with self._cond:
+                                self._lost.add(seq)
+                            continue
+                        with self._cond:
+                            # The cadence counts from this keyframe: only the
+                            # frames dequeued after it are deltas since
+                            since = (self._pending[0][0] if self._pending else self._next_seq) - 1 - seq
+                            if self._since_keyframe is not None:
+                                self._since_keyframe = min(self._since_keyframe, since)
+                    if duplicate is not None:
+                        target = self._resolve_duplicate(seq, duplicate[0])
+                        if target is None:
+                            # The frame it repeats never made it to disk
+                            data = self._encode(duplicate[1], duplicate[2])
+                            if data is None:
+                                with self._cond:
+                                    self._lost.add(seq)
+                                continue
+
+                    if target is not None:
+                        frame, location = self.sink.write_duplicate(target, meta)
+                        self.duplicates += 1
+                        self.bytes_saved += target[2]
+                    else:
+                        frame, location = self.sink.write(data, meta)
+                        # Duplicates point at the original, never at another duplicate
+                        target = (frame, location, self._payload_size(data))
+                        if indexed is not None:
+                            self.hashes.add(indexed[0], indexed[1], target)
+                    self._prev_written = (seq, target)
+
+                    record = {"frame": frame}
+                    record.update(location)
+                    if meta:
+                        record.update(meta)
+                    self._sidecar.write(json.dumps(record) + "\n")
+                    self.frame_count += 1
+                    if self.stats is not None:
+                        self.stats.add("write", time.perf_counter_ns() - start)
+                except Exception as e:
+                    print(f"Error writing frame: {e}")
+
+    def _resolve_duplicate(self, seq, duplicate_of):
+        if duplicate_of == DUPLICATE_PREVIOUS:
+            if self._prev_written is not None and self._prev_written[0] == seq - 1:
+                return self._prev_written[1]
+            return None
+        return duplicate_of
+
+    @staticmethod
+    def _payload_size(data):
+        if isinstance(data, list):
+            return sum(len(buf) for _, _, buf in data)
+        return len(data)
+
+    def encode_ms_saved(self):
+        # Estimated from the average cost of the frames that were encoded
+        if not self.encoded:
+            return 0.0
+        return self.duplicates * self.encode_ns / self.encoded / 1e6